@@ -1,7 +1,64 @@
+import queue
+import bisect
+import threading
 import tkinter as tk
-from tkinter import messagebox, simpledialog
+from tkinter import messagebox, simpledialog, ttk
 from secure_safe import SecureSafe
-import pyperclip
+
+# How often (ms) the Tk loop checks for results from the worker thread.
+POLL_INTERVAL = 20
+# Rows shown by the entry browser, and the pause (ms) after a keystroke before filtering.
+VISIBLE_ROWS = 12
+SEARCH_DEBOUNCE = 120
+
+
+class EntryIndex:
+    """Sorted (website, username) rows with lower-cased keys for as-you-type filtering."""
+
+    def __init__(self, passwords):
+        self.rows = sorted(
+            (website, entry["username"])
+            for website, entries in passwords.items()
+            for entry in entries
+        )
+        self.keys = [self.key(*row) for row in self.rows]
+        self.last_query = ""
+        self.last_matches = None
+
+    @staticmethod
+    def key(website, username):
+        return f"{website}\t{username}".lower()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, website, username):
+        position = bisect.bisect(self.rows, (website, username))
+        self.rows.insert(position, (website, username))
+        self.keys.insert(position, self.key(website, username))
+        self.last_matches = None
+
+    def remove(self, website, username):
+        position = bisect.bisect_left(self.rows, (website, username))
+        if position < len(self.rows) and self.rows[position] == (website, username):
+            del self.rows[position]
+            del self.keys[position]
+        self.last_matches = None
+
+    def search(self, query):
+        """Returns the row numbers whose website or username contains ``query``."""
+        query = query.strip().lower()
+        if not query:
+            return range(len(self.rows))
+        # Typing usually extends the previous query, so only its matches need rechecking
+        if self.last_matches is not None and self.last_query in query:
+            candidates = self.last_matches
+        else:
+            candidates = range(len(self.keys))
+        keys = self.keys
+        matches = [row for row in candidates if query in keys[row]]
+        self.last_query, self.last_matches = query, matches
+        return matches
 
 
 class SecureSafeGUI:
@@ -9,6 +66,18 @@ class SecureSafeGUI:
         self.root = root
         self.root.title("SecureSafe Password Manager")
 
+        # Vault work runs on a worker thread; results come back through this queue
+        self.busy = False
+        self.results = queue.Queue()
+        self.buttons = []
+
+        # Entry browser state: the index, the filtered rows and the first visible one
+        self.index = None
+        self.matches = []
+        self.offset = 0
+        self.listbox = None
+        self.pending_search = None
+
         # Initialize UI elements
         self.website_entry = tk.Entry(self.root)
         self.username_entry = tk.Entry(self.root)
@@ -18,16 +87,70 @@ class SecureSafeGUI:
         self.master_entry = tk.Entry(root, show="*")
         self.master_entry.pack()
 
-        tk.Button(root, text="Login", command=self.authenticate).pack()
+        self.add_button("Login", self.authenticate)
+        self.progress = ttk.Progressbar(root, mode="indeterminate")
+
+    def add_button(self, text, command):
+        button = tk.Button(self.root, text=text, command=command)
+        button.pack()
+        self.buttons.append(button)
+        return button
+
+    def run_in_background(self, work, on_done):
+        """Runs ``work`` off the Tk thread and passes its result to ``on_done`` on it."""
+        self.set_busy(True)
+
+        def runner():
+            try:
+                self.results.put((on_done, work(), None))
+            except Exception as e:
+                self.results.put((on_done, None, e))
+
+        threading.Thread(target=runner, daemon=True).start()
+        self.root.after(POLL_INTERVAL, self.poll_results)
+
+    def poll_results(self):
+        try:
+            on_done, result, error = self.results.get_nowait()
+        except queue.Empty:
+            self.root.after(POLL_INTERVAL, self.poll_results)
+            return
+        self.set_busy(False)
+        if error is not None:
+            messagebox.showerror("Error", str(error))
+            return
+        on_done(result)
+
+    def set_busy(self, busy):
+        """Disables the buttons and shows the progress bar while work is in flight."""
+        self.busy = busy
+        state = tk.DISABLED if busy else tk.NORMAL
+        for button in self.buttons:
+            button.config(state=state)
+        if busy:
+            self.progress.pack(fill=tk.X)
+            self.progress.start(10)
+        else:
+            self.progress.stop()
+            self.progress.pack_forget()
 
     def authenticate(self):
         master_password = self.master_entry.get()
-        self.safe = SecureSafe(master_password)
+        self.run_in_background(lambda: self.open_vault(master_password), self.unlocked)
+
+    def open_vault(self, master_password):
+        """Unlocks the vault and indexes it for the browser (runs on the worker)."""
+        safe = SecureSafe(master_password)
+        return safe, EntryIndex(safe.passwords)
+
+    def unlocked(self, result):
+        self.safe, self.index = result
         self.load_main_ui()
 
     def load_main_ui(self):
         for widget in self.root.winfo_children():
             widget.destroy()
+        self.buttons = []
 
         tk.Label(self.root, text="Website:").pack()
         self.website_entry = tk.Entry(self.root)
@@ -41,16 +164,95 @@ class SecureSafeGUI:
         self.password_entry = tk.Entry(self.root)
         self.password_entry.pack()
 
-        tk.Button(self.root, text="Store Password", command=self.store_password).pack()
-        tk.Button(
-            self.root, text="Retrieve Password", command=self.retrieve_password
-        ).pack()
-        tk.Button(
-            self.root, text="Generate Password", command=self.generate_password
-        ).pack()
-        tk.Button(
-            self.root, text="Delete Password", command=self.delete_password
-        ).pack()  # New delete button
+        self.add_button("Store Password", self.store_password)
+        self.add_button("Retrieve Password", self.retrieve_password)
+        self.add_button("Generate Password", self.generate_password)
+        self.add_button("Delete Password", self.delete_password)
+        self.progress = ttk.Progressbar(self.root, mode="indeterminate")
+        self.build_browser()
+
+    def build_browser(self):
+        """Adds the search box and a list that only ever holds the visible rows."""
+        tk.Label(self.root, text="Search:").pack()
+        self.search_entry = tk.Entry(self.root)
+        self.search_entry.pack()
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+
+        frame = tk.Frame(self.root)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.listbox = tk.Listbox(frame, height=VISIBLE_ROWS, width=50)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(frame, command=self.scroll_browser)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox.bind("<<ListboxSelect>>", self.select_row)
+        self.listbox.bind("<MouseWheel>", self.wheel_browser)
+        self.listbox.bind("<Button-4>", lambda _: self.scroll_browser("scroll", -1))
+        self.listbox.bind("<Button-5>", lambda _: self.scroll_browser("scroll", 1))
+        self.offset = 0
+        self.run_search()
+
+    def schedule_search(self, _event=None):
+        """Debounces keystrokes so filtering runs once typing pauses."""
+        if self.pending_search is not None:
+            self.root.after_cancel(self.pending_search)
+        self.pending_search = self.root.after(SEARCH_DEBOUNCE, self.run_search)
+
+    def run_search(self):
+        self.pending_search = None
+        if self.index is None or self.listbox is None:
+            return
+        self.matches = self.index.search(self.search_entry.get())
+        self.offset = 0
+        self.render_browser()
+
+    def render_browser(self):
+        """Fills the listbox with the rows at the current offset and syncs the scrollbar."""
+        total = len(self.matches)
+        self.offset = max(0, min(self.offset, total - VISIBLE_ROWS))
+        visible = self.matches[self.offset : self.offset + VISIBLE_ROWS]
+        self.listbox.delete(0, tk.END)
+        for row in visible:
+            website, username = self.index.rows[row]
+            self.listbox.insert(tk.END, f"{website} — {username}")
+        if total:
+            self.scrollbar.set(
+                self.offset / total, (self.offset + len(visible)) / total
+            )
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_browser(self, action, amount, unit="units"):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", count, units|pages)."""
+        if action == "moveto":
+            self.offset = int(float(amount) * len(self.matches))
+        else:
+            step = VISIBLE_ROWS if unit == "pages" else 1
+            self.offset += int(amount) * step
+        self.render_browser()
+
+    def wheel_browser(self, event):
+        self.scroll_browser("scroll", -1 if event.delta > 0 else 1)
+        return "break"
+
+    def select_row(self, _event=None):
+        """Copies the selected row into the website and username fields."""
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        website, username = self.index.rows[self.matches[self.offset + selection[0]]]
+        self.website_entry.delete(0, tk.END)
+        self.website_entry.insert(0, website)
+        self.username_entry.delete(0, tk.END)
+        self.username_entry.insert(0, username)
+
+    def index_changed(self, update, website, username):
+        """Applies a store or delete to the browser index and redraws it."""
+        update(website, username)
+        if self.listbox is not None:
+            offset = self.offset
+            self.matches = self.index.search(self.search_entry.get())
+            self.offset = offset
+            self.render_browser()
 
     def store_password(self):
         website = self.website_entry.get()
@@ -63,7 +265,14 @@ class SecureSafeGUI:
             )
             return
 
-        self.safe.store_password(website, username, password)
+        self.run_in_background(
+            lambda: self.safe.store_password(website, username, password),
+            lambda _: self.stored(website, username),
+        )
+
+    def stored(self, website, username):
+        if self.index is not None:
+            self.index_changed(self.index.add, website, username)
         messagebox.showinfo("Success", "Password stored securely!")
 
     def delete_password(self):
@@ -75,8 +284,12 @@ class SecureSafeGUI:
             messagebox.showerror("Error", "Please enter both website and username.")
             return
 
-        stored_passwords = self.safe.retrieve_password(website)
+        self.run_in_background(
+            lambda: self.safe.retrieve_password(website),
+            lambda stored: self.choose_password_to_delete(website, username, stored),
+        )
 
+    def choose_password_to_delete(self, website, username, stored_passwords):
         if not stored_passwords:
             messagebox.showerror("Error", "No passwords found for this website.")
             return
@@ -106,20 +319,33 @@ class SecureSafeGUI:
 
             if choice and 1 <= choice <= len(filtered_passwords):
                 selected_entry = filtered_passwords[choice - 1]
-                self.safe.delete_password(website, username, selected_entry["password"])
-                messagebox.showinfo(
-                    "Success", f"Deleted password for {username} on {website}!"
+                self.run_in_background(
+                    lambda: self.safe.delete_password(
+                        website, username, selected_entry["password"]
+                    ),
+                    lambda _: self.deleted(
+                        website,
+                        username,
+                        f"Deleted password for {username} on {website}!",
+                    ),
                 )
             else:
                 messagebox.showerror("Error", "Invalid selection.")
         else:
-            self.safe.delete_password(
-                website, username, filtered_passwords[0]["password"]
-            )
-            messagebox.showinfo(
-                "Success", f"Password deleted for {username} on {website}!"
+            self.run_in_background(
+                lambda: self.safe.delete_password(
+                    website, username, filtered_passwords[0]["password"]
+                ),
+                lambda _: self.deleted(
+                    website, username, f"Password deleted for {username} on {website}!"
+                ),
             )
 
+    def deleted(self, website, username, message):
+        if self.index is not None:
+            self.index_changed(self.index.remove, website, username)
+        messagebox.showinfo("Success", message)
+
     def retrieve_password(self):
         """Retrieves passwords for a website and a specific username."""
         website = self.website_entry.get()
@@ -129,7 +355,13 @@ class SecureSafeGUI:
             messagebox.showerror("Error", "Please enter both website and username.")
             return
 
-        stored_passwords = self.safe.retrieve_password(website)
+        self.run_in_background(
+            lambda: self.safe.retrieve_password(website),
+            lambda stored: self.copy_password(username, stored),
+        )
+
+    def copy_password(self, username, stored_passwords):
+        import pyperclip  # Deferred: only copying needs the clipboard
 
         if not stored_passwords:
             messagebox.showerror("Error", "No passwords found for this website.")
@@ -0,0 +1,95 @@
+"""Compares vault encryption throughput: CBC records, AEAD records and one AEAD stream.
+
+Each mode encrypts and then decrypts the same synthetic vault in memory,
+so the numbers isolate the cipher and per-record overhead from disk I/O.
+
+Usage: python benchmarks/bench_cipher.py --entries 100000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from secure_safe import (  # noqa: E402
+    CIPHER_CBC,
+    CIPHER_XCHACHA,
+    Entry,
+    dump_json,
+    load_entries,
+    worker_safe,
+)
+
+MODES = ("cbc_records", "aead_records", "aead_stream")
+
+
+def build(entries):
+    return {
+        f"site{i}.example.com": [Entry(f"user{i}", f"Pass-{i}-{i * 7919 % 10007}")]
+        for i in range(entries)
+    }
+
+
+def round_trip(mode, passwords):
+    """Encrypts then decrypts ``passwords``; returns (encrypt s, decrypt s, result)."""
+    safe = worker_safe(
+        {
+            "key": os.urandom(32),
+            "binary": False,
+            "cipher": CIPHER_CBC if mode == "cbc_records" else CIPHER_XCHACHA,
+        }
+    )
+    start = time.perf_counter()
+    if mode == "aead_stream":
+        blob = safe.encrypt(dump_json(passwords))
+    else:
+        blobs = [
+            (website, safe.encrypt_entries(entries, website))
+            for website, entries in passwords.items()
+        ]
+    encrypted = time.perf_counter()
+    if mode == "aead_stream":
+        result = {
+            website: load_entries(entries)
+            for website, entries in json.loads(safe.decrypt(blob)).items()
+        }
+    else:
+        result = {
+            website: safe.decrypt_entries(blob, website) for website, blob in blobs
+        }
+    return encrypted - start, time.perf_counter() - encrypted, result
+
+
+def run(entries):
+    """One row per mode with encrypt and decrypt throughput."""
+    passwords = build(entries)
+    plaintext_mb = len(dump_json(passwords)) / 1e6
+    rows = []
+    for mode in MODES:
+        encrypt_seconds, decrypt_seconds, result = round_trip(mode, passwords)
+        assert result == passwords
+        rows.append(
+            {
+                "mode": mode,
+                "entries": entries,
+                "encrypt_seconds": encrypt_seconds,
+                "decrypt_seconds": decrypt_seconds,
+                "encrypt_mb_per_sec": plaintext_mb / encrypt_seconds,
+                "decrypt_mb_per_sec": plaintext_mb / decrypt_seconds,
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.entries), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compares opening a JSON vault with opening the memory-mapped binary format.
+
+Usage: python benchmarks/bench_format.py --entries 10000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from secure_safe import SecureSafe  # noqa: E402
+from vault_format import convert_json_to_binary  # noqa: E402
+
+MASTER_PASSWORD = "BenchmarkMasterKey"
+
+
+def timed(function):
+    """Runs ``function`` once and returns (result, seconds)."""
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "passwords.json")
+        binary_path = os.path.join(directory, "vault.ssv")
+        safe = SecureSafe(MASTER_PASSWORD, file=json_path)
+        safe.store_many(
+            (f"site{i}.example.com", f"user{i}", f"Pass-{i}")
+            for i in range(args.entries)
+        )
+        convert_json_to_binary(json_path, binary_path)
+        probe = f"site{args.entries // 2}.example.com"
+
+        _, json_load = timed(lambda: SecureSafe(MASTER_PASSWORD, file=json_path))
+        _, binary_load = timed(lambda: SecureSafe(MASTER_PASSWORD, file=binary_path))
+        lazy, lazy_open = timed(
+            lambda: SecureSafe(MASTER_PASSWORD, file=binary_path, lazy=True)
+        )
+        _, lazy_retrieve = timed(lambda: lazy.retrieve_password(probe))
+
+        print(
+            json.dumps(
+                {
+                    "entries": args.entries,
+                    "json_bytes": os.path.getsize(json_path),
+                    "binary_bytes": os.path.getsize(binary_path),
+                    "json_load_seconds": json_load,
+                    "binary_load_seconds": binary_load,
+                    "binary_lazy_open_seconds": lazy_open,
+                    "binary_lazy_retrieve_seconds": lazy_retrieve,
+                },
+                indent=2,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
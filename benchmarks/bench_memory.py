@@ -0,0 +1,81 @@
+"""Measures the resident memory of a decrypted vault held as dicts or as Entry objects.
+
+Each representation is built in its own process from the same per-website
+JSON that load_passwords decodes, and the RSS growth is reported.
+
+Usage: python benchmarks/bench_memory.py --entries 1000000
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from secure_safe import load_entries  # noqa: E402
+
+MODES = ("dict", "entry")
+# Distinct usernames across the vault; real vaults reuse a handful of emails
+USERNAMES = 1000
+
+
+def rss_kb():
+    """Current resident set size of this process in KiB (Linux)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def build(mode, entries):
+    """Decodes ``entries`` one-entry websites the way load_passwords would."""
+    decode = (
+        json.loads if mode == "dict" else lambda blob: load_entries(json.loads(blob))
+    )
+    passwords = {}
+    for i in range(entries):
+        blob = json.dumps(
+            [
+                {
+                    "username": f"user{i % USERNAMES}@example.com",
+                    "password": f"Pass-{i:08d}-{i * 7919 % 100000:05d}",
+                    "created": 1700000000 + i,
+                    "updated": 1700000000 + i,
+                }
+            ]
+        )
+        passwords[f"site{i}.example.com"] = decode(blob)
+    return passwords
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--single", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        before = rss_kb()
+        passwords = build(args.single, args.entries)
+        print(json.dumps({"mode": args.single, "rss_kb": rss_kb() - before}))
+        del passwords
+        return
+
+    results = []
+    for mode in MODES:
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--single", mode]
+            + ["--entries", str(args.entries)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(json.loads(child.stdout))
+    report = {"entries": args.entries, "results": results}
+    if results[0]["rss_kb"]:
+        report["reduction"] = 1 - results[1]["rss_kb"] / results[0]["rss_kb"]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compares batch password generation with the old per-character loop.
+
+Usage: python benchmarks/bench_passwords.py --count 100000 --length 16
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import string
+import secrets
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from password_generator import generate_passwords, password_entropy  # noqa: E402
+
+ALPHABET = string.ascii_letters + string.punctuation + string.digits
+
+
+def per_char_random(count, length):
+    """The original generator: random.choice once per character (not a CSPRNG)."""
+    return [
+        "".join(random.choice(ALPHABET) for _ in range(length)) for _ in range(count)
+    ]
+
+
+def per_char_secrets(count, length):
+    """The same loop on the CSPRNG, i.e. the naive secure replacement."""
+    return [
+        "".join(secrets.choice(ALPHABET) for _ in range(length)) for _ in range(count)
+    ]
+
+
+def run(count, length):
+    """Returns one row per generator with passwords/second."""
+    results = []
+    for name, generate in (
+        ("per_char_random", per_char_random),
+        ("per_char_secrets", per_char_secrets),
+        ("generate_passwords", lambda n, size: generate_passwords(n, size)),
+        (
+            "generate_passwords_min",
+            lambda n, size: generate_passwords(n, size, min_symbols=1, min_digits=1),
+        ),
+    ):
+        start = time.perf_counter()
+        passwords = generate(count, length)
+        seconds = time.perf_counter() - start
+        assert len(passwords) == count
+        results.append(
+            {
+                "generator": name,
+                "count": count,
+                "length": length,
+                "seconds": seconds,
+                "passwords_per_sec": count / seconds if seconds else None,
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--length", type=int, default=16)
+    args = parser.parse_args()
+
+    report = {
+        "entropy_bits": password_entropy(args.length),
+        "results": run(args.count, args.length),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
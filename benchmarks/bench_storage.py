@@ -0,0 +1,86 @@
+"""Compares point operations across vault storage backends: JSON, binary, sharded and SQLite.
+
+Each backend gets the same synthetic vault, opened lazily, and times
+retrieve, store and delete of single websites with the journal disabled,
+so every store and delete is a real save into the backend.
+
+Usage: python benchmarks/bench_storage.py --entries 100000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from secure_safe import SecureSafe  # noqa: E402
+
+MASTER_PASSWORD = "BenchmarkMasterKey"
+BENCH_KDF = {"name": "pbkdf2", "iterations": 1000}
+BACKENDS = {
+    "json": "passwords.json",
+    "binary": "vault.ssv",
+    "sharded": "vault.shards",
+    "sqlite": "vault.db",
+}
+
+
+def per_call(function, count):
+    start = time.perf_counter()
+    for i in range(count):
+        function(i)
+    return (time.perf_counter() - start) / count
+
+
+def run_backend(backend, entries, operations, directory):
+    path = os.path.join(directory, BACKENDS[backend])
+    safe = SecureSafe(MASTER_PASSWORD, file=path, kdf=BENCH_KDF, journal_limit=None)
+    safe.store_many(
+        (f"site{i}.example.com", f"user{i}", f"Pass-{i}") for i in range(entries)
+    )
+    start = time.perf_counter()
+    safe = SecureSafe(
+        MASTER_PASSWORD, file=path, kdf=BENCH_KDF, journal_limit=None, lazy=True
+    )
+    open_seconds = time.perf_counter() - start
+    step = max(1, entries // operations)
+    return {
+        "backend": backend,
+        "entries": entries,
+        "open_seconds": open_seconds,
+        "retrieve_seconds": per_call(
+            lambda i: safe.retrieve_password(f"site{i * step}.example.com"),
+            operations,
+        ),
+        "store_seconds": per_call(
+            lambda i: safe.store_password(f"new{i}.example.com", "user", "Pass"),
+            operations,
+        ),
+        "delete_seconds": per_call(
+            lambda i: safe.delete_password(f"new{i}.example.com", "user", "Pass"),
+            operations,
+        ),
+    }
+
+
+def run(entries, operations=20):
+    """One row per backend with open time and per-operation latency."""
+    with tempfile.TemporaryDirectory() as directory:
+        return [
+            run_backend(backend, entries, operations, directory) for backend in BACKENDS
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--operations", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.entries, args.operations), indent=2))
+
+
+if __name__ == "__main__":
+    main()
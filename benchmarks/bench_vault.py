@@ -0,0 +1,179 @@
+"""Benchmarks SecureSafe vault operations on synthetic vaults of increasing size.
+
+Each size runs in its own process so peak RSS is measured per size. Results
+are printed (or written) as JSON; pass --compare with an earlier result file
+to see the change per operation between two commits.
+
+Usage: python benchmarks/bench_vault.py --sizes 1000 10000 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from secure_safe import SecureSafe  # noqa: E402
+
+MASTER_PASSWORD = "BenchmarkMasterKey"
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def measure(results, size, operation, function, count=1):
+    """Times ``count`` calls of ``function`` and records one result row."""
+    start = time.perf_counter()
+    for i in range(count):
+        function(i)
+    seconds = time.perf_counter() - start
+    results.append(
+        {
+            "size": size,
+            "operation": operation,
+            "count": count,
+            "seconds": seconds,
+            "ops_per_sec": count / seconds if seconds else None,
+            "peak_rss_kb": peak_rss_kb(),
+        }
+    )
+
+
+def run_size(size, operations=1000, directory=None):
+    """Benchmarks every operation against a vault of ``size`` websites."""
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as workdir:
+        path = os.path.join(workdir, "passwords.json")
+        safe = SecureSafe(MASTER_PASSWORD, file=path)
+        safe.store_many(
+            (f"site{i}.example.com", f"user{i}", f"Pass-{i}-{random.random()}")
+            for i in range(size)
+        )
+        websites = [
+            f"site{random.randrange(size)}.example.com" for _ in range(operations)
+        ]
+        writes = min(operations, 100)
+
+        def load(_):
+            safe.read_vault()
+            safe.passwords = safe.load_passwords()
+
+        def save_one_dirty(i):
+            safe.mark_dirty(websites[i])
+            safe.save_passwords()
+
+        def save_all_dirty(_):
+            safe.dirty.update(safe.passwords)
+            safe.save_passwords()
+
+        measure(results, size, "load_passwords", load)
+        measure(results, size, "save_passwords", save_one_dirty, writes)
+        measure(results, size, "save_passwords_full", save_all_dirty)
+        measure(
+            results,
+            size,
+            "store_password",
+            lambda i: safe.store_password(f"new{i}.example.com", "user", "Pass"),
+            writes,
+        )
+        measure(
+            results,
+            size,
+            "retrieve_password",
+            lambda i: safe.retrieve_password(websites[i]),
+            operations,
+        )
+        measure(
+            results,
+            size,
+            "delete_password",
+            lambda i: safe.delete_password(f"new{i}.example.com", "user", "Pass"),
+            writes,
+        )
+        measure(
+            results,
+            size,
+            "generate_password",
+            lambda _: safe.generate_password(),
+            operations,
+        )
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(baseline, current):
+    """Prints the per-operation change in ops/sec relative to a baseline run."""
+    previous = {(r["size"], r["operation"]): r for r in baseline["results"]}
+    for row in current["results"]:
+        before = previous.get((row["size"], row["operation"]))
+        if before and before["ops_per_sec"] and row["ops_per_sec"]:
+            change = row["ops_per_sec"] / before["ops_per_sec"] - 1
+            print(
+                f"{row['size']:>8} {row['operation']:<20} {change:+8.1%}",
+                file=sys.stderr,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--operations", type=int, default=1000)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        # Child process: benchmark one size and hand the rows back on stdout
+        print(json.dumps(run_size(args.single, args.operations)))
+        return
+
+    results = []
+    for size in args.sizes:
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--single", str(size)]
+            + ["--operations", str(args.operations)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.extend(json.loads(child.stdout))
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Offline breach checks against a local Pwned Passwords SHA-1 dump.
+
+The dump is the "ordered by hash" text file, one "HASH:COUNT" line per
+password, sorted by the uppercase hex SHA-1. It is memory-mapped and
+searched in place, so only the pages a search touches are ever read.
+
+Usage:
+    python breach_check.py pwned-passwords-sha1.txt --build-index
+    python breach_check.py pwned-passwords-sha1.txt --file passwords.json
+    python breach_check.py pwned-passwords-sha1.txt --generate 20
+"""
+
+import os
+import sys
+import mmap
+import struct
+import hashlib
+import argparse
+from array import array
+from getpass import getpass
+from password_generator import generate_passwords
+from secure_safe import SecureSafe
+
+HASH_LENGTH = 40
+# Windows smaller than this are scanned line by line instead of probed.
+SCAN_BYTES = 1024
+# Prefix index: one offset per 4-hex-digit (16-bit) prefix, plus the file size.
+INDEX_MAGIC = b"SSPI"
+INDEX_BITS = 16
+INDEX_HEADER = struct.Struct("<4sQ")  # magic, dump size the offsets belong to
+KEY_SPACE = 1 << 64  # Probes interpolate on the first 64 bits of the hash
+
+
+def sha1_hex(password):
+    return hashlib.sha1(password.encode()).hexdigest().upper().encode()
+
+
+def hash_key(digest):
+    """The first 64 bits of a hex digest as an integer, for interpolation."""
+    return int(digest[:16], 16)
+
+
+class HashDump:
+    """A sorted SHA-1 dump, memory-mapped and searched without loading it.
+
+    Searches interpolate on the hash value, which is uniformly distributed,
+    and fall back to bisection whenever a probe fails to halve the window.
+    With a prefix index (see build_index) each search starts inside its
+    16-bit bucket.
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index = None
+        index_path = index_path or path + ".idx"
+        if os.path.exists(index_path):
+            self.load_index(index_path)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def load_index(self, index_path):
+        with open(index_path, "rb") as f:
+            magic, size = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+            if magic != INDEX_MAGIC or size != self.size:
+                return  # Stale or foreign; searching without it is still correct
+            self.index = array("Q")
+            self.index.frombytes(f.read())
+
+    def build_index(self, index_path=None):
+        """Writes the prefix index next to the dump and starts using it."""
+        offsets = array("Q")
+        position = key_lo = 0
+        for prefix in range(1 << INDEX_BITS):
+            target = b"%04X" % prefix + b"0" * (HASH_LENGTH - 4)
+            if position < self.size:
+                key_lo = hash_key(self.map[position : position + HASH_LENGTH])
+            position = self.lower_bound(target, position, self.size, key_lo)
+            offsets.append(position)
+        offsets.append(self.size)
+        with open(index_path or self.path + ".idx", "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, self.size))
+            f.write(offsets.tobytes())
+        self.index = offsets
+
+    def bucket(self, digest):
+        """Byte window and key bounds that must contain ``digest`` if it is present."""
+        if self.index is None:
+            return 0, self.size, 0, KEY_SPACE
+        prefix = int(digest[:4], 16)
+        shift = 64 - INDEX_BITS
+        return (
+            self.index[prefix],
+            self.index[prefix + 1],
+            prefix << shift,
+            (prefix + 1) << shift,
+        )
+
+    def line_start(self, offset, lo):
+        """Start of the line containing ``offset``, given that ``lo`` starts a line."""
+        newline = self.map.rfind(b"\n", lo, offset)
+        return lo if newline < 0 else newline + 1
+
+    def next_line(self, start):
+        newline = self.map.find(b"\n", start)
+        return self.size if newline < 0 else newline + 1
+
+    def lower_bound(self, target, lo, hi, key_lo=0, key_hi=KEY_SPACE):
+        """Offset of the first line in [lo, hi) whose hash is >= ``target``, else ``hi``.
+
+        ``lo`` must start a line; every hash before it is < target and every
+        hash at or after ``hi`` is >= target.
+        """
+        key = hash_key(target)
+        interpolate = True
+        while hi - lo > SCAN_BYTES:
+            width = hi - lo
+            if interpolate and key_hi > key_lo:
+                probe = lo + (key - key_lo) * width // (key_hi - key_lo)
+                probe = min(max(probe, lo), hi - 1)
+            else:
+                probe = lo + width // 2
+            start = self.line_start(probe, lo)
+            digest = self.map[start : start + HASH_LENGTH]
+            if digest < target:
+                lo, key_lo = self.next_line(start), hash_key(digest)
+            else:
+                if start == lo:
+                    return lo
+                hi, key_hi = start, hash_key(digest)
+            # Interpolation only pays while it keeps halving the window
+            interpolate = hi - lo <= width // 2
+        while lo < hi and self.map[lo : lo + HASH_LENGTH] < target:
+            lo = self.next_line(lo)
+        return min(lo, hi)
+
+    def count_at(self, offset, digest):
+        """Breach count of the line at ``offset`` if it holds ``digest``, else 0."""
+        if self.map[offset : offset + HASH_LENGTH] != digest:
+            return 0
+        end = self.next_line(offset)
+        return int(self.map[offset + HASH_LENGTH + 1 : end].strip() or 1)
+
+    def lookup(self, digest):
+        """How often the uppercase hex SHA-1 ``digest`` appears in breaches (0 if never)."""
+        lo, hi, key_lo, key_hi = self.bucket(digest)
+        return self.count_at(self.lower_bound(digest, lo, hi, key_lo, key_hi), digest)
+
+    def lookup_many(self, digests):
+        """Looks up many digests in one forward sweep; returns {digest: count}.
+
+        Digests are searched in sorted order and each search starts where
+        the previous one ended, so the file is read front to back once.
+        """
+        counts = {}
+        position = 0
+        for digest in sorted(set(digests)):
+            lo, hi, key_lo, key_hi = self.bucket(digest)
+            if position > lo and position < self.size:
+                # Resume after the previous hit, which bounds the keys from below
+                lo = position
+                key_lo = hash_key(self.map[lo : lo + HASH_LENGTH])
+            position = self.lower_bound(digest, lo, max(lo, hi), key_lo, key_hi)
+            counts[digest] = self.count_at(position, digest)
+        return counts
+
+    def check_passwords(self, passwords):
+        """Returns {password: breach count} for every password given."""
+        digests = {password: sha1_hex(password) for password in passwords}
+        counts = self.lookup_many(digests.values())
+        return {password: counts[digest] for password, digest in digests.items()}
+
+
+def generate_unbreached(dump, n, **options):
+    """Generates ``n`` passwords, redrawing any candidate found in the dump."""
+    passwords = []
+    while len(passwords) < n:
+        candidates = generate_passwords(n - len(passwords), **options)
+        counts = dump.check_passwords(candidates)
+        passwords.extend(password for password in candidates if not counts[password])
+    return passwords
+
+
+def main(argv=None):
+    """CLI for offline breach checks"""
+    parser = argparse.ArgumentParser(description="SecureSafe offline breach check")
+    parser.add_argument("dump", help="Pwned Passwords SHA-1 file, ordered by hash")
+    parser.add_argument("--file", default="passwords.json", help="vault to check")
+    parser.add_argument(
+        "--build-index", action="store_true", help="write the prefix index and exit"
+    )
+    parser.add_argument(
+        "--generate", type=int, metavar="N", help="print N unbreached passwords"
+    )
+    parser.add_argument("--length", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    with HashDump(args.dump) as dump:
+        if args.build_index:
+            dump.build_index()
+            return
+        if args.generate:
+            for password in generate_unbreached(
+                dump, args.generate, length=args.length
+            ):
+                print(password)
+            return
+        safe = SecureSafe(
+            getpass("Enter your master password: "), file=args.file, lazy=True
+        )
+        breached = safe.breach_check(dump)
+        for website, username, count in breached:
+            print(f"{website}\t{username}\tseen {count} times")
+        print(f"{len(breached)} breached entries", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
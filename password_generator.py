@@ -0,0 +1,125 @@
+import os
+import math
+import string
+
+# Extra random bytes drawn per request on top of the expected need, so one
+# os.urandom call almost always suffices.
+SLACK_BYTES = 64
+# Minimums that fewer than this share of random strings meet would take too many redraws
+MIN_ACCEPTANCE = 1e-3
+
+
+def character_classes(use_symbols=True, use_numbers=True):
+    """The character classes a password may draw from, letters first."""
+    classes = [string.ascii_letters]
+    if use_symbols:
+        classes.append(string.punctuation)
+    if use_numbers:
+        classes.append(string.digits)
+    return classes
+
+
+def translation_table(alphabet):
+    """Maps random bytes onto ``alphabet`` without modulo bias.
+
+    Bytes below the largest multiple of len(alphabet) map to
+    alphabet[byte % len(alphabet)]; the rest are returned for deletion, which
+    is rejection sampling done by bytes.translate in a single C-level pass.
+    """
+    limit = 256 - 256 % len(alphabet)
+    table = bytes(ord(alphabet[byte % len(alphabet)]) for byte in range(limit))
+    return table + bytes(256 - limit), bytes(range(limit, 256))
+
+
+def random_characters(count, alphabet):
+    """Returns ``count`` ASCII bytes drawn uniformly from ``alphabet`` using os.urandom."""
+    table, rejected = translation_table(alphabet)
+    accept = 1 - len(rejected) / 256
+    chunks, have = [], 0
+    while have < count:
+        block = os.urandom(int((count - have) / accept) + SLACK_BYTES)
+        chunk = block.translate(table, rejected)
+        chunks.append(chunk)
+        have += len(chunk)
+    return b"".join(chunks)[:count]
+
+
+def others(members):
+    """Every byte value outside ``members``, for counting members with bytes.translate."""
+    return bytes(set(range(256)) - set(members.encode()))
+
+
+def meets_minimums(password, minimums):
+    return all(
+        len(password.translate(None, rest)) >= minimum for rest, minimum in minimums
+    )
+
+
+def generate_passwords(
+    n, length=12, use_symbols=True, use_numbers=True, min_symbols=0, min_digits=0
+):
+    """Generates ``n`` passwords from one batch of OS randomness.
+
+    Candidates missing a required number of symbols or digits are discarded
+    and redrawn, so every password meeting the minimums is equally likely.
+    Minimums that almost no random string meets raise ValueError rather
+    than redrawing for ages.
+    """
+    alphabet = "".join(character_classes(use_symbols, use_numbers))
+    minimums = []
+    if min_symbols:
+        if not use_symbols:
+            raise ValueError("min_symbols requires use_symbols")
+        minimums.append((others(string.punctuation), min_symbols))
+    if min_digits:
+        if not use_numbers:
+            raise ValueError("min_digits requires use_numbers")
+        minimums.append((others(string.digits), min_digits))
+    if min_symbols + min_digits > length:
+        raise ValueError("The minimums do not fit in the password length")
+    if length == 0:
+        return [""] * n
+    # Share of candidates that meet the minimums, to draw enough of them per round
+    accept = 1.0
+    if minimums:
+        accept = 2 ** (
+            password_entropy(length, use_symbols, use_numbers, min_symbols, min_digits)
+            - length * math.log2(len(alphabet))
+        )
+        if accept < MIN_ACCEPTANCE:
+            raise ValueError(
+                "The minimums leave too few passwords of this length; "
+                "lower them or use a longer password"
+            )
+    passwords = []
+    while len(passwords) < n:
+        candidates = math.ceil((n - len(passwords)) / accept)
+        pool = random_characters(candidates * length, alphabet)
+        for start in range(0, len(pool), length):
+            password = pool[start : start + length]
+            if not minimums or meets_minimums(password, minimums):
+                passwords.append(password.decode("ascii"))
+    return passwords[:n]
+
+
+def password_entropy(
+    length=12, use_symbols=True, use_numbers=True, min_symbols=0, min_digits=0
+):
+    """Entropy in bits of one generate_passwords() password with these settings.
+
+    This is log2 of the number of equally likely passwords, counted exactly
+    when minimums rule some strings out.
+    """
+    classes = character_classes(use_symbols, use_numbers)
+    minimum = {string.punctuation: min_symbols, string.digits: min_digits}
+    # ways[k]: strings of length k over the classes so far that meet their minimums
+    ways = [1] + [0] * length
+    for members in classes:
+        combined = [0] * (length + 1)
+        for used, count in enumerate(ways):
+            if not count:
+                continue
+            for k in range(minimum.get(members, 0), length - used + 1):
+                combined[used + k] += count * math.comb(used + k, k) * len(members) ** k
+        ways = combined
+    return math.log2(ways[length]) if ways[length] else 0.0
@@ -0,0 +1,161 @@
+import bisect
+from collections import Counter, defaultdict, namedtuple
+
+# One ranked hit: lower scores rank first.
+Match = namedtuple("Match", "website username score")
+
+# Ranks of the ways a term can match a query, best first.
+EXACT, PREFIX, SUBSTRING, FUZZY = range(4)
+# Fuzzy search only computes edit distances for this many best-overlapping terms.
+FUZZY_CANDIDATES = 64
+
+
+def normalize(text):
+    return text.strip().lower()
+
+
+def trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def padded_trigrams(term):
+    """Trigrams of a term with boundary markers, so short terms still have some."""
+    return trigrams(f"\x02\x02{term}\x03")
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` if it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class SearchIndex:
+    """Prefix, substring and typo-tolerant lookup over websites, usernames and tags.
+
+    Every distinct lower-cased website, username and tag is a term. Terms are
+    kept in a sorted list for prefix queries and in a trigram inverted index
+    for substring and fuzzy queries. Each term points at the (website,
+    username) pairs of the entries that contain it, counted so entries can be
+    added and removed one at a time.
+    """
+
+    def __init__(self, passwords=None):
+        self.terms = []  # sorted
+        self.refs = {}  # term -> Counter of (website, username)
+        self.grams = defaultdict(set)  # trigram -> terms
+        for website, entries in (passwords or {}).items():
+            for entry in entries:
+                self.add(website, entry)
+
+    def entry_terms(self, website, entry):
+        terms = {normalize(website), normalize(entry["username"])}
+        terms.update(normalize(tag) for tag in entry.get("tags") or ())
+        terms.discard("")
+        return terms
+
+    def add(self, website, entry):
+        """Indexes one entry stored under ``website``."""
+        ref = (website, entry["username"])
+        for term in self.entry_terms(website, entry):
+            if term not in self.refs:
+                self.refs[term] = Counter()
+                bisect.insort(self.terms, term)
+                for gram in padded_trigrams(term):
+                    self.grams[gram].add(term)
+            self.refs[term][ref] += 1
+
+    def remove(self, website, entry):
+        """Forgets one entry previously passed to add."""
+        ref = (website, entry["username"])
+        for term in self.entry_terms(website, entry):
+            refs = self.refs.get(term)
+            if refs is None or not refs[ref]:
+                continue
+            refs[ref] -= 1
+            if refs[ref] <= 0:
+                del refs[ref]
+            if not refs:
+                del self.refs[term]
+                del self.terms[bisect.bisect_left(self.terms, term)]
+                for gram in padded_trigrams(term):
+                    self.grams[gram].discard(term)
+                    if not self.grams[gram]:
+                        del self.grams[gram]
+
+    def prefix_terms(self, query):
+        for position in range(bisect.bisect_left(self.terms, query), len(self.terms)):
+            term = self.terms[position]
+            if not term.startswith(query):
+                break
+            yield term
+
+    def substring_terms(self, query):
+        if len(query) < 3:
+            return [term for term in self.terms if query in term]
+        postings = sorted(
+            (self.grams.get(gram, set()) for gram in trigrams(query)), key=len
+        )
+        candidates = set.intersection(*postings) if postings else set()
+        return [term for term in candidates if query in term]
+
+    def fuzzy_terms(self, query, max_distance):
+        """Yields (term, distance) for terms within ``max_distance`` edits of ``query``."""
+        overlap = Counter()
+        for gram in padded_trigrams(query):
+            for term in self.grams.get(gram, ()):
+                overlap[term] += 1
+        for term, _ in overlap.most_common(FUZZY_CANDIDATES):
+            distance = edit_distance(query, term, max_distance)
+            if distance <= max_distance:
+                yield term, distance
+
+    def search(self, query, mode="auto", limit=20, max_distance=None):
+        """Returns up to ``limit`` Match tuples ranked best first.
+
+        ``mode`` is "prefix", "substring", "fuzzy" or "auto", which tries all
+        three and ranks exact, then prefix, then substring, then fuzzy hits.
+        Within a rank, shorter terms (closer matches) come first.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        if max_distance is None:
+            max_distance = max(1, len(query) // 4)
+        scored = {}
+
+        def hit(term, rank, extra=0):
+            score = rank * 1000 + extra * 100 + len(term) - len(query)
+            for website, username in self.refs[term]:
+                key = (website, username)
+                if key not in scored or score < scored[key]:
+                    scored[key] = score
+
+        if mode in ("auto", "prefix"):
+            for term in self.prefix_terms(query):
+                hit(term, EXACT if term == query else PREFIX)
+        if mode in ("auto", "substring"):
+            for term in self.substring_terms(query):
+                hit(term, EXACT if term == query else SUBSTRING)
+        if mode in ("auto", "fuzzy"):
+            for term, distance in self.fuzzy_terms(query, max_distance):
+                hit(term, EXACT if distance == 0 else FUZZY, distance)
+        ranked = sorted(scored.items(), key=lambda item: (item[1], item[0]))
+        return [
+            Match(website, username, score)
+            for (website, username), score in ranked[:limit]
+        ]
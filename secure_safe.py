@@ -1,119 +1,1281 @@
 import os
+import sys
 import json
 import base64
-import random
-import string
-from Crypto.Cipher import AES
+import hashlib
+import hmac
+import copy
+import math
+import time
+import atexit
+import weakref
+import argparse
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache, partial
+from Crypto.Cipher import AES, ChaCha20_Poly1305
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import PBKDF2, scrypt
 from Crypto.Util.Padding import pad, unpad
 from getpass import getpass
+from password_generator import generate_passwords
+from search_index import SearchIndex
+from vault_audit import MAX_AGE_DAYS, AuditIndex
+from vault_format import (
+    BinaryVault,
+    JsonVault,
+    ShardedVault,
+    fsync_directory,
+    read_meta,
+    storage_class,
+    vault_lock,
+)
+from vault_stats import Profiler
+from vault_sync import (
+    SyncReport,
+    changed_websites,
+    leaf_digest,
+    load_sync_state,
+    merge_entries,
+    save_sync_state,
+    sync_state_path,
+)
+from write_behind import FLUSH_CHANGES, WriteBehind
+
+# Compact the journal into a fresh snapshot once it grows past this many bytes.
+JOURNAL_LIMIT = 1024 * 1024
+# Vaults with fewer websites than this are always encrypted and decrypted serially.
+PARALLEL_THRESHOLD = 2048
+# Key derivation cost for new vaults unless calibrate() picked something else.
+DEFAULT_KDF = {"name": "scrypt", "n": 2**15, "r": 8, "p": 1}
+# Record ciphers; vaults that name none predate authenticated encryption and use CBC.
+CIPHER_CBC = "aes-cbc"
+CIPHER_XCHACHA = "xchacha20-poly1305"
+# 192-bit random nonces never repeat in practice, however many records a key seals
+NONCE_SIZE = 24
+TAG_SIZE = 16
+
+
+def legacy_key(password):
+    """Key used by vaults written before key derivation settings were stored."""
+    return base64.urlsafe_b64encode(password.ljust(16).encode()[:16])
+
+
+def kdf_cost(kdf):
+    """The cost parameters of a KDF settings dict, as a hashable tuple."""
+    if kdf["name"] == "scrypt":
+        return (kdf["n"], kdf["r"], kdf["p"])
+    if kdf["name"] == "pbkdf2":
+        return (kdf["iterations"],)
+    raise ValueError(f"Unknown key derivation function: {kdf['name']}")
+
+
+@lru_cache(maxsize=8)
+def derive_cached(password, name, salt, cost):
+    """Runs the KDF once per (password, salt, parameters) in this process."""
+    if name == "scrypt":
+        n, r, p = cost
+        return scrypt(password, salt, 32, N=n, r=r, p=p)
+    (iterations,) = cost
+    return PBKDF2(password, salt, 32, count=iterations, hmac_hash_module=SHA256)
+
+
+def key_check(key):
+    """An HMAC of the vault key, stored in the metadata to recognize the right master password."""
+    return base64.b64encode(
+        hmac.new(key, b"secure-safe key check", hashlib.sha256).digest()
+    ).decode()
+
+
+def calibrate(target_seconds=0.25, name="scrypt"):
+    """Picks KDF settings that take about ``target_seconds`` on this machine."""
+    if name == "scrypt":
+        kdf = {"name": "scrypt", "n": 2**12, "r": 8, "p": 1}
+    else:
+        kdf = {"name": "pbkdf2", "iterations": 10000}
+    start = time.perf_counter()
+    derive_cached.__wrapped__("calibration", name, os.urandom(16), kdf_cost(kdf))
+    elapsed = time.perf_counter() - start
+    if name == "scrypt":
+        # scrypt needs 1 KiB per unit of n at r=8, so step in powers of two up to 256 MiB
+        doublings = max(0, round(math.log2(target_seconds / elapsed)))
+        kdf["n"] = min(kdf["n"] << doublings, 2**18)
+    else:
+        kdf["iterations"] = max(10000, int(10000 * target_seconds / elapsed))
+    return kdf
+
+
+def close_at_exit(ref):
+    """atexit hook: flushes a write-behind safe that is still open at shutdown."""
+    safe = ref()
+    if safe is not None:
+        safe.close()
+
+
+def worker_safe(state):
+    """Builds a bare SecureSafe that can only encrypt and decrypt, for pool workers."""
+    safe = SecureSafe.__new__(SecureSafe)
+    safe.__dict__.update(state)
+    return safe
+
+
+def decrypt_chunk(state, items):
+    """Pool task: decrypts a chunk of (website, ciphertext) pairs into entry lists."""
+    safe = worker_safe(state)
+    return [safe.decrypt_entries(blob, website) for website, blob in items]
+
+
+def encrypt_chunk(state, items):
+    """Pool task: encrypts a chunk of (website, entries) pairs into website ciphertexts."""
+    safe = worker_safe(state)
+    return [safe.encrypt_entries(entries, website) for website, entries in items]
+
+
+class Entry:
+    """One stored credential, kept compact for vaults with millions of entries.
+
+    Slots instead of a per-entry dict, interned usernames and tags, and
+    optional created/updated Unix timestamps. Entries still answer
+    ``entry["username"]`` and ``entry.get("tags")`` like the dicts they
+    replace, compare equal to the dict retrieve_password hands out, and
+    ignore timestamps when compared.
+    """
+
+    __slots__ = ("username", "password", "tags", "created", "updated")
+    FIELDS = ("username", "password", "tags")
+
+    def __init__(self, username, password, tags=None, created=None, updated=None):
+        self.username = sys.intern(username)
+        self.password = password
+        self.tags = tuple(sys.intern(tag) for tag in tags) if tags else None
+        self.created = created
+        self.updated = created if updated is None else updated
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["username"],
+            data["password"],
+            data.get("tags"),
+            data.get("created"),
+            data.get("updated"),
+        )
+
+    def as_dict(self):
+        """The entry as retrieve_password returns it."""
+        data = {"username": self.username, "password": self.password}
+        if self.tags:
+            data["tags"] = list(self.tags)
+        return data
+
+    def to_json(self):
+        """The entry as it is encrypted into the vault, timestamps included."""
+        data = self.as_dict()
+        if self.created is not None:
+            data["created"] = self.created
+            data["updated"] = self.updated
+        return data
+
+    def __getitem__(self, key):
+        value = getattr(self, key) if key in self.FIELDS else None
+        if value is None:
+            raise KeyError(key)
+        return list(value) if key == "tags" else value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other):
+        if isinstance(other, Entry):
+            return (self.username, self.password, self.tags) == (
+                other.username,
+                other.password,
+                other.tags,
+            )
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def clear(self):
+        """Drops the references to the decrypted fields."""
+        self.username = self.password = ""
+        self.tags = None
+
+    def __repr__(self):
+        return f"Entry({self.username!r}, tags={self.tags!r}, created={self.created!r})"
+
+
+def load_entries(entries):
+    """Turns one website's decoded JSON into a list of Entry objects."""
+    if isinstance(entries, dict):  # If a single entry exists, convert to list
+        entries = [entries]
+    return [
+        Entry.from_dict(entry) if isinstance(entry, dict) else entry
+        for entry in entries
+    ]
+
+
+def dump_json(value):
+    """json.dumps that also serializes Entry objects."""
+    return json.dumps(value, default=Entry.to_json)
+
+
+class LazyPasswords(MutableMapping):
+    """Website -> entries mapping that decrypts websites on first access.
+
+    Only the ciphertext map is held up front. Decrypted websites live in an
+    LRU bounded by ``maxsize`` entries and a sliding ``ttl`` in seconds; evicted
+    entries are cleared so the plaintext is dropped as soon as possible.
+    Websites changed since the last save are pinned in ``live`` until the
+    safe has re-encrypted them.
+    """
+
+    def __init__(self, safe, maxsize=128, ttl=300):
+        self.safe = safe
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.cache = OrderedDict()  # website -> (entries, expires_at)
+        self.live = {}
+        self.removed = set()
+
+    def __getitem__(self, website):
+        if website in self.live:
+            return self.live[website]
+        if website in self.removed:
+            raise KeyError(website)
+        self.purge_expired()
+        if website in self.cache:
+            entries, _ = self.cache.pop(website)
+        else:
+            entries = self.safe.decrypt_entries(self.safe.ciphertexts[website], website)
+        self.cache[website] = (entries, time.monotonic() + self.ttl)
+        while len(self.cache) > self.maxsize:
+            self.evict(next(iter(self.cache)))
+        return entries
+
+    def __setitem__(self, website, entries):
+        cached = self.cache.pop(website, None)
+        if cached is not None and cached[0] is not entries:
+            # Entries carried over into the new list, as delete_password does, stay intact
+            self.wipe(cached[0], keep=entries)
+        self.removed.discard(website)
+        self.live[website] = entries
+
+    def __delitem__(self, website):
+        if website not in self:
+            raise KeyError(website)
+        self.live.pop(website, None)
+        if website in self.cache:
+            self.evict(website)
+        self.removed.add(website)
+
+    def __contains__(self, website):
+        return website in self.live or (
+            website in self.safe.ciphertexts and website not in self.removed
+        )
+
+    def __iter__(self):
+        yield from self.live
+        for website in self.safe.ciphertexts:
+            if website not in self.live and website not in self.removed:
+                yield website
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def pin(self, website):
+        """Keeps a website's decrypted entries in memory until the next save."""
+        if website in self.cache:
+            self.live[website] = self.cache.pop(website)[0]
+
+    def settle(self):
+        """Releases pinned websites back into the LRU once they are encrypted."""
+        live, self.live = self.live, {}
+        self.removed.clear()
+        for website, entries in live.items():
+            self.cache[website] = (entries, time.monotonic() + self.ttl)
+        while len(self.cache) > self.maxsize:
+            self.evict(next(iter(self.cache)))
+
+    def evict(self, website):
+        """Drops a website from the cache and wipes its decrypted entries."""
+        self.wipe(self.cache.pop(website)[0])
+
+    @staticmethod
+    def wipe(entries, keep=()):
+        """Clears a list of decrypted entries, except those in ``keep`` (by identity)."""
+        kept = set(map(id, keep))
+        for entry in entries:
+            if isinstance(entry, (dict, Entry)) and id(entry) not in kept:
+                entry.clear()
+        entries.clear()
+
+    def purge_expired(self):
+        """Evicts every cached website whose TTL has elapsed."""
+        now = time.monotonic()
+        # The cache is ordered by last access, so expired websites sit at the front
+        while self.cache:
+            website, (_, expires_at) = next(iter(self.cache.items()))
+            if expires_at > now:
+                break
+            self.evict(website)
+
+    def clear_cache(self):
+        """Wipes every decrypted website that is not pinned."""
+        for website in list(self.cache):
+            self.evict(website)
 
 
 class SecureSafe:
-    def __init__(self, master_password):
-        self.file = "passwords.json"
-        self.key = self.derive_key(master_password)
-        self.passwords = self.load_passwords()
+    # Overridden from the vault metadata; only vaults that predate it lack one
+    cipher = CIPHER_CBC
+
+    def __init__(
+        self,
+        master_password,
+        file="passwords.json",
+        journal_limit=JOURNAL_LIMIT,
+        lazy=False,
+        cache_size=128,
+        cache_ttl=300,
+        workers=None,
+        executor="thread",
+        chunk_size=256,
+        parallel_threshold=PARALLEL_THRESHOLD,
+        kdf=None,
+        profile=None,
+        stream=None,
+        flush_delay=None,
+        flush_changes=FLUSH_CHANGES,
+        key=None,
+    ):
+        self.file = file
+        self.journal_file = file + ".journal"
+        # The vault_format.VaultStorage class the file's format is stored with
+        self.storage = storage_class(file)
+        # Binary vaults keep raw IV + ciphertext records in a memory-mapped file
+        self.binary = self.storage is BinaryVault
+        # Sharded vaults spread websites over shard files named after a manifest
+        self.sharded = self.storage is ShardedVault
+        self.journal_limit = journal_limit  # None disables the journal
+        # Lazy mode decrypts websites on demand through a bounded LRU
+        self.lazy = lazy
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        # Spread per-website crypto across a "thread" or "process" pool; None stays serial
+        self.workers = workers
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.parallel_threshold = parallel_threshold
+        # Open batch() contexts and the pre-batch state of websites they touched
+        self.batch_depth = 0
+        self.undo = {}
+        # Search and audit indexes, built on first use and kept current by store/delete
+        self.index = None
+        self.audit_index = None
+        # KDF settings for new vaults and for upgrading legacy ones
+        self.kdf = kdf or DEFAULT_KDF
+        # Nesting depth of locked(); the exclusive vault lock is held while positive.
+        # The mutex serializes this safe's threads, such as the write-behind flusher.
+        self.lock_depth = 0
+        self.mutex = threading.RLock()
+        # Write-behind: websites changed in memory but not yet written by flush()
+        self.pending = set()
+        self.write_behind = None
+        # Hot-path timings; pass profile=True or a vault_stats.Profiler to collect them
+        self.profiler = None
+        if profile:
+            self.enable_profiling(profile if isinstance(profile, Profiler) else None)
+        if stream and self.storage is not JsonVault:
+            raise ValueError("Only JSON vaults can be encrypted as a single stream")
+        with vault_lock(self.file):
+            self.read_vault()
+            legacy = "kdf" not in self.meta and self.vault_exists()
+            if legacy:
+                self.key = legacy_key(master_password)
+            else:
+                self.meta.setdefault("kdf", self.new_kdf())
+                # A key already derived for these KDF settings skips the derivation
+                self.key = key or self.derive_key(master_password)
+                self.verify_key()
+            if not self.vault_exists():
+                self.meta["cipher"] = self.cipher = CIPHER_XCHACHA
+                self.stream = bool(stream)
+            if self.stream:
+                self.lazy = False  # A single stream cannot be decrypted per website
+            self.passwords = self.load_passwords()
+        if legacy:
+            self.change_kdf(master_password)
+        # Older files are upgraded to authenticated encryption on first open
+        if self.cipher != CIPHER_XCHACHA or stream not in (None, self.stream):
+            self.change_cipher(self.stream if stream is None else stream)
+        if flush_delay is not None:
+            self.write_behind = WriteBehind(self.flush, flush_delay, flush_changes)
+            self.exit_hook = partial(close_at_exit, weakref.ref(self))
+            atexit.register(self.exit_hook)
+
+    def enable_profiling(self, profiler=None):
+        """Times derive_key, encrypt, decrypt, load_passwords and save_passwords.
+
+        The timed wrappers are installed on this instance only, so safes that
+        never enable profiling run the plain methods with no overhead.
+        """
+        self.profiler = profiler or Profiler()
+        for operation, name, size in (
+            ("derive_key", "derive_key", None),
+            ("encrypt", "encrypt_bytes", lambda args, result: len(result)),
+            ("decrypt", "decrypt_bytes", lambda args, result: len(args[0])),
+            ("load_passwords", "load_passwords", lambda args, _: self.vault_size()),
+            ("save_passwords", "save_passwords", lambda args, _: self.vault_size()),
+        ):
+            method = getattr(type(self), name).__get__(self)
+            setattr(self, name, self.profiler.wrap(operation, method, size))
+        return self.profiler
+
+    def stats(self):
+        """Per-operation calls, bytes and latency; empty unless profiling is enabled."""
+        return self.profiler.stats() if self.profiler else {}
+
+    def new_kdf(self, kdf=None):
+        """Vault KDF settings with a fresh random salt."""
+        salt = base64.b64encode(os.urandom(16)).decode()
+        return {**(kdf or self.kdf), "salt": salt}
 
     def derive_key(self, password):
-        """Derives a 16-byte AES key from the master password."""
-        return base64.urlsafe_b64encode(password.ljust(16).encode()[:16])
+        """Derives a 32-byte AES key from the master password with the vault's KDF settings."""
+        kdf = self.meta["kdf"]
+        salt = base64.b64decode(kdf["salt"])
+        return derive_cached(password, kdf["name"], salt, kdf_cost(kdf))
 
-    def encrypt(self, plaintext):
-        """Encrypts a given plaintext using AES encryption."""
+    def verify_key(self):
+        """Rejects a wrong master password before anything is loaded or written with it.
+
+        Vaults saved before the key check was recorded are tested by
+        decrypting one record instead, and get the check on their next save.
+        """
+        check = key_check(self.key)
+        if "check" in self.meta:
+            if not hmac.compare_digest(self.meta["check"], check):
+                raise ValueError(f"Cannot open {self.file}: wrong master password")
+            return
+        website = next(iter(self.ciphertexts), None)
+        if website is not None:
+            try:
+                self.decrypt_entries(self.ciphertexts[website], website)
+            except ValueError as e:
+                raise ValueError(
+                    f"Cannot decrypt {self.file}: wrong master password, "
+                    "or the file is corrupted or was tampered with"
+                ) from e
+        self.meta["check"] = check
+
+    def mark_all_dirty(self):
+        """Decrypts every website under the current key and cipher for re-encryption."""
+        for website in list(self.passwords):
+            # Lazy vaults pin the result until saved
+            self.passwords[website] = self.passwords[website]
+            self.dirty.add(website)
+
+    def change_kdf(self, master_password, kdf=None):
+        """Re-keys the vault with a new salt and KDF settings, re-encrypting every website."""
+        with self.writing():
+            self.mark_all_dirty()
+            self.meta["kdf"] = self.new_kdf(kdf)
+            self.key = self.derive_key(master_password)
+            self.meta["check"] = key_check(self.key)
+            self.meta["cipher"] = self.cipher = CIPHER_XCHACHA
+            self.save_passwords()
+
+    def change_cipher(self, stream=False):
+        """Re-encrypts the vault with XChaCha20-Poly1305, per website or as a single stream.
+
+        A stream vault encrypts the whole serialized vault as one message,
+        which loads and saves in a single pass but gives up lazy loading and
+        per-website reuse of unchanged ciphertexts. Only passwords.json
+        vaults can be streamed.
+        """
+        if stream and self.storage is not JsonVault:
+            raise ValueError("Only JSON vaults can be encrypted as a single stream")
+        with self.writing():
+            self.mark_all_dirty()
+            self.meta["cipher"] = self.cipher = CIPHER_XCHACHA
+            if stream and self.lazy:
+                # A stream has no per-website ciphertexts to decrypt on demand
+                self.passwords = dict(self.passwords.items())
+                self.lazy = False
+            self.stream = stream
+            self.save_passwords()
+
+    def encrypt_bytes(self, plaintext, associated=b""):
+        """Encrypts a plaintext with the vault's cipher.
+
+        XChaCha20-Poly1305 returns nonce + ciphertext + tag, with
+        ``associated`` data covered by the tag; legacy CBC vaults get
+        IV + ciphertext.
+        """
+        if self.cipher == CIPHER_XCHACHA:
+            cipher = ChaCha20_Poly1305.new(key=self.key, nonce=os.urandom(NONCE_SIZE))
+            cipher.update(associated)
+            ciphertext, tag = cipher.encrypt_and_digest(plaintext.encode())
+            return cipher.nonce + ciphertext + tag
         cipher = AES.new(self.key, AES.MODE_CBC)
-        encrypted_data = cipher.encrypt(pad(plaintext.encode(), AES.block_size))
-        return base64.b64encode(cipher.iv + encrypted_data).decode()
+        return cipher.iv + cipher.encrypt(pad(plaintext.encode(), AES.block_size))
 
-    def decrypt(self, encrypted_text):
-        """Decrypts a given ciphertext using AES encryption."""
-        encrypted_bytes = base64.b64decode(encrypted_text)
+    def decrypt_bytes(self, encrypted_bytes, associated=b""):
+        """Decrypts the output of encrypt_bytes; raises ValueError if a tagged record was altered."""
+        if self.cipher == CIPHER_XCHACHA:
+            cipher = ChaCha20_Poly1305.new(
+                key=self.key, nonce=encrypted_bytes[:NONCE_SIZE]
+            )
+            cipher.update(associated)
+            return cipher.decrypt_and_verify(
+                encrypted_bytes[NONCE_SIZE:-TAG_SIZE], encrypted_bytes[-TAG_SIZE:]
+            ).decode()
         iv = encrypted_bytes[: AES.block_size]
         cipher = AES.new(self.key, AES.MODE_CBC, iv)
         return unpad(
             cipher.decrypt(encrypted_bytes[AES.block_size :]), AES.block_size
         ).decode()
 
+    def encrypt(self, plaintext, associated=b""):
+        """Encrypts a given plaintext using AES encryption."""
+        return base64.b64encode(self.encrypt_bytes(plaintext, associated)).decode()
+
+    def decrypt(self, encrypted_text, associated=b""):
+        """Decrypts a given ciphertext using AES encryption."""
+        return self.decrypt_bytes(base64.b64decode(encrypted_text), associated)
+
+    def encrypt_entries(self, entries, website=""):
+        """Encrypts one website's entries in the vault file's native form.
+
+        Under XChaCha20-Poly1305 the website name is authenticated with the record, so a
+        ciphertext moved to another website fails to decrypt.
+        """
+        if self.binary:
+            return self.encrypt_bytes(dump_json(entries), website.encode())
+        return self.encrypt(dump_json(entries), website.encode())
+
+    def decrypt_entries(self, encrypted_text, website=""):
+        """Decrypts one website's ciphertext into its list of entries."""
+        if self.binary:
+            entries = json.loads(self.decrypt_bytes(encrypted_text, website.encode()))
+        else:
+            entries = json.loads(self.decrypt(encrypted_text, website.encode()))
+        return load_entries(entries)
+
+    def codec_state(self):
+        """Attributes a pool worker needs to encrypt and decrypt like this safe."""
+        return {"key": self.key, "binary": self.binary, "cipher": self.cipher}
+
+    def map_chunks(self, task, items):
+        """Runs ``task`` over ``items`` in chunks across the worker pool, preserving order."""
+        # Deferred: concurrent.futures is a third of this module's import time
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        chunks = [
+            items[i : i + self.chunk_size]
+            for i in range(0, len(items), self.chunk_size)
+        ]
+        pool_class = (
+            ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+        )
+        state = self.codec_state()
+        with pool_class(max_workers=self.workers) as pool:
+            results = pool.map(task, [state] * len(chunks), chunks)
+            return [item for chunk in results for item in chunk]
+
+    def use_pool(self, count):
+        return bool(self.workers) and count >= self.parallel_threshold
+
+    def decrypt_many(self, items):
+        """Decrypts (website, ciphertext) pairs into entry lists, in parallel for large vaults."""
+        if self.use_pool(len(items)):
+            return self.map_chunks(decrypt_chunk, items)
+        return [self.decrypt_entries(blob, website) for website, blob in items]
+
+    def encrypt_many(self, items):
+        """Encrypts (website, entries) pairs into ciphertexts, in parallel for large vaults."""
+        if self.use_pool(len(items)):
+            return self.map_chunks(encrypt_chunk, items)
+        return [self.encrypt_entries(entries, website) for website, entries in items]
+
+    def vault_exists(self):
+        return os.path.exists(self.file) or os.path.exists(self.journal_file)
+
+    def vault_files(self):
+        """Every file whose change means another process saved the vault."""
+        return self.ciphertexts.files()
+
+    def vault_size(self):
+        return sum(
+            os.path.getsize(path) for path in self.vault_files() if os.path.exists(path)
+        )
+
+    def read_vault(self):
+        """Reads the vault metadata and ciphertexts without decrypting anything."""
+        if getattr(self, "ciphertexts", None) is not None:
+            self.ciphertexts.close()
+        # Last written ciphertext per website, reused on save until the website changes
+        self.ciphertexts = self.storage(self.file)
+        self.meta = self.ciphertexts.meta
+        # Stream vaults hold the whole vault as one ciphertext until load_passwords
+        self.stream = self.ciphertexts.stream is not None
+        self.stream_blob = self.ciphertexts.stream
+        self.cipher = self.meta.get("cipher", CIPHER_CBC)
+        self.stamps = self.ciphertexts.stamp()
+
     def load_passwords(self):
-        """Loads passwords from the JSON file and ensures they are stored as lists."""
-        if os.path.exists(self.file):
-            with open(self.file, "r") as f:
+        """Decrypts the vault read by read_vault and ensures entries are stored as lists."""
+        self.dirty = set()
+        if self.lazy:
+            data = LazyPasswords(self, self.cache_size, self.cache_ttl)
+            self.replay_journal(data)
+            return data
+        data = {}
+        try:
+            if self.stream:
+                if self.stream_blob is not None:
+                    for website, entries in json.loads(
+                        self.decrypt(self.stream_blob)
+                    ).items():
+                        data[website] = load_entries(entries)
+                self.stream_blob = None
+            else:
+                stored = list(self.ciphertexts.stored_items())
+                data.update(
+                    zip((website for website, _ in stored), self.decrypt_many(stored))
+                )
+        except ValueError as e:
+            # Never fall back to an empty vault: the next save would overwrite the file
+            raise ValueError(
+                f"Cannot decrypt {self.file}: wrong master password, "
+                "or the file is corrupted or was tampered with"
+            ) from e
+        self.replay_journal(data)
+        return data
+
+    def replay_journal(self, data, offset=0):
+        """Applies journaled changes from byte ``offset`` on top of the snapshot in ``data``."""
+        # Bytes of the journal applied so far, so refresh() can replay just the tail
+        self.journal_offset = offset
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    record = json.loads(self.decrypt(line.strip()))
+                except ValueError:
+                    if line.endswith(b"\n"):
+                        raise ValueError(
+                            f"{self.journal_file} is corrupted or was tampered with"
+                        ) from None
+                    # A crash mid-append; the next append_journal truncates it
+                    break
+                if record["entries"]:
+                    data[record["website"]] = load_entries(record["entries"])
+                else:
+                    data.pop(record["website"], None)
+                self.dirty.add(record["website"])
+                self.journal_offset += len(line)
+
+    def refresh(self):
+        """Picks up changes other processes made since this safe last read the vault.
+
+        Unchanged files (by inode, mtime, size and, for fresh files, content
+        hash) cost a few stat calls; a grown journal is replayed from where
+        this safe left off; a rewritten vault is read again. Changes still
+        waiting for a write-behind flush are kept on top of what was read.
+        """
+        unflushed = {website: self.passwords.get(website) for website in self.pending}
+        if self.ciphertexts.modified_since(self.stamps):
+            kdf, stream = self.meta.get("kdf"), self.stream
+            if self.lazy:
+                self.passwords.clear_cache()
+            self.read_vault()
+            if self.meta.get("kdf") != kdf:
+                raise ValueError("The vault was re-keyed elsewhere; open it again")
+            if self.stream != stream:
+                raise ValueError("The vault was converted elsewhere; open it again")
+            self.passwords = self.load_passwords()
+        elif (
+            os.path.exists(self.journal_file)
+            and os.path.getsize(self.journal_file) > self.journal_offset
+        ):
+            self.replay_journal(self.passwords, self.journal_offset)
+        else:
+            return
+        for website, entries in unflushed.items():
+            if entries is None:
+                self.passwords.pop(website, None)
+            else:
+                self.passwords[website] = entries
+            self.mark_dirty(website)
+        self.index = self.audit_index = None
+
+    def read_latest(self):
+        """Refreshes under a shared lock unless this safe already holds the vault lock.
+
+        Storages with their own read isolation, such as SQLite in WAL mode,
+        refresh without the lock, so readers never wait for a writer.
+        """
+        with self.mutex:
+            if self.lock_depth:
+                return
+            if self.ciphertexts.concurrent_reads:
+                self.refresh()
+                return
+            with vault_lock(self.file):
+                self.refresh()
+
+    @contextmanager
+    def locked(self):
+        """Holds the exclusive vault lock; nested calls reuse it."""
+        with self.mutex:
+            if self.lock_depth:
+                self.lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self.lock_depth -= 1
+                return
+            with vault_lock(self.file, exclusive=True):
+                self.lock_depth = 1
                 try:
-                    data = json.load(f)
-                    # Ensure that each website entry is stored as a list
-                    for website, entries in data.items():
-                        decrypted_entries = json.loads(self.decrypt(entries))
-                        if isinstance(
-                            decrypted_entries, dict
-                        ):  # If a single entry exists, convert to list
-                            decrypted_entries = [decrypted_entries]
-                        data[website] = decrypted_entries
-                    return data
-                except Exception:
-                    return {}
-        return {}
+                    yield
+                finally:
+                    self.lock_depth = 0
+
+    @contextmanager
+    def writing(self):
+        """Holds the exclusive vault lock, first picking up other processes' changes."""
+        with self.locked():
+            if self.lock_depth == 1:
+                self.refresh()
+            yield
 
     def save_passwords(self):
-        """Encrypts and saves passwords, ensuring list format is maintained."""
-        encrypted_data = {
-            k: self.encrypt(json.dumps(v)) for k, v in self.passwords.items()
-        }
-        with open(self.file, "w") as f:
-            json.dump(encrypted_data, f)
+        """Encrypts changed websites and saves passwords, ensuring list format is maintained."""
+        with self.locked():
+            if self.stream:
+                self.save_stream()
+            else:
+                self.save_records()
+            # The snapshot now contains every journaled change.
+            if os.path.exists(self.journal_file):
+                os.remove(self.journal_file)
+            self.stamps = self.ciphertexts.stamp()
+            self.journal_offset = 0
+            self.pending.clear()
+
+    def save_stream(self):
+        """Writes the whole vault as a single authenticated message."""
+        self.dirty.clear()
+        self.ciphertexts.clear()
+        self.ciphertexts.stream = self.encrypt(dump_json(self.passwords))
+        self.ciphertexts.meta = self.meta
+        self.ciphertexts.flush()
+
+    def save_records(self):
+        """Re-encrypts changed websites and writes one ciphertext per website."""
+        changed = set(self.dirty)
+        if not self.ciphertexts.partial_reads:
+            # Websites added or removed without going through mark_dirty are caught here too;
+            # sharded and SQLite vaults skip this so a save never reads records it does not touch
+            changed |= self.passwords.keys() ^ self.ciphertexts.keys()
+        updated = [website for website in changed if website in self.passwords]
+        encrypted = self.encrypt_many(
+            [(website, self.passwords[website]) for website in updated]
+        )
+        self.ciphertexts.update(zip(updated, encrypted))
+        for website in changed.difference(updated):
+            self.ciphertexts.pop(website, None)
+        if not self.ciphertexts.atomic_flush and len(changed) > 1:
+            # Shards are replaced one at a time; journal the save so a crash midway replays it
+            self.write_journal(sorted(changed), sync=True)
+        self.dirty.clear()
+        if self.lazy:
+            self.passwords.settle()
+        self.ciphertexts.stream = None  # In case the vault is leaving stream mode
+        self.ciphertexts.meta = self.meta
+        self.ciphertexts.flush()
+
+    def append_journal(self, *websites, sync=False):
+        """Appends the current state of each website to the journal, one encrypted record apiece.
+
+        With ``sync`` the journal is fsynced before returning.
+        """
+        with self.locked():
+            self.write_journal(websites, sync)
+            if self.journal_offset > self.journal_limit:
+                self.compact()
+
+    def write_journal(self, websites, sync=False):
+        """Writes journal records for ``websites``; the caller holds the vault lock."""
+        records = "".join(
+            self.encrypt(
+                dump_json({"website": website, "entries": self.passwords.get(website)})
+            )
+            + "\n"
+            for website in websites
+        )
+        self.drop_torn_tail()
+        created = not os.path.exists(self.journal_file)
+        with open(self.journal_file, "a") as f:
+            f.write(records)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        if sync and created:
+            # A new journal's directory entry must survive power loss too
+            fsync_directory(self.journal_file)
+        self.journal_offset = os.path.getsize(self.journal_file)
 
-    def store_password(self, website, username, password):
-        """Ensures passwords are stored as a list per website."""
-        if website not in self.passwords or not isinstance(
-            self.passwords[website], list
+    def drop_torn_tail(self):
+        """Truncates a record half-written by a crash, so the next append starts on its own line.
+
+        Appends run under writing(), which replayed every complete record, so
+        anything past journal_offset without a line break is such a tail.
+        """
+        if (
+            not os.path.exists(self.journal_file)
+            or os.path.getsize(self.journal_file) <= self.journal_offset
         ):
-            self.passwords[website] = (
-                []
-            )  # Initialize as list if it’s missing or corrupted
+            return
+        with open(self.journal_file, "rb+") as f:
+            f.seek(self.journal_offset)
+            if b"\n" not in f.read():
+                f.truncate(self.journal_offset)
+
+    def compact(self):
+        """Folds the journal back into a new snapshot."""
+        with self.writing():
+            self.save_passwords()
+
+    def mark_dirty(self, website):
+        """Flags a website whose entries changed so the next save re-encrypts it."""
+        self.dirty.add(website)
+        if self.lazy:
+            self.passwords.pin(website)
+
+    def persist(self, website):
+        """Persists a change to ``website`` through the journal, or a save if uses_journal() is false.
+
+        In write-behind mode the change is left pending for the flusher instead.
+        """
+        self.mark_dirty(website)
+        if self.batch_depth:
+            return  # Committed together when the outermost batch exits
+        # The first save writes the KDF header the journal's key depends on
+        if self.write_behind is not None and os.path.exists(self.file):
+            self.pending.add(website)
+            self.write_behind.changed()
+        elif self.uses_journal():
+            self.append_journal(website)
+        else:
+            self.save_passwords()
+
+    def uses_journal(self):
+        """Whether changes are appended to the journal rather than saved into the vault.
+
+        Vaults whose storage writes only the changed records, such as SQLite,
+        save directly: a journal would not make those writes any smaller.
+        """
+        return (
+            self.journal_limit is not None
+            and os.path.exists(self.file)
+            and not self.ciphertexts.incremental
+        )
 
-        self.passwords[website].append({"username": username, "password": password})
-        self.save_passwords()
+    @contextmanager
+    def batch(self):
+        """Buffers stores and deletes, committing them with a single atomic write.
+
+        If the block raises, every change made inside it is rolled back.
+        Batches nest; only the outermost one commits or rolls back.
+        """
+        with self.writing():
+            if not self.batch_depth:
+                self.undo = {}
+                dirty_before = set(self.dirty)
+            self.batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.batch_depth -= 1
+                if not self.batch_depth:
+                    self.rollback(dirty_before)
+                raise
+            self.batch_depth -= 1
+            if not self.batch_depth:
+                if self.undo:
+                    self.save_passwords()
+                self.undo = {}
+
+    def remember(self, website):
+        """Records a website's state before its first change inside a batch."""
+        if self.batch_depth and website not in self.undo:
+            self.undo[website] = copy.deepcopy(self.passwords.get(website))
+
+    def rollback(self, dirty_before):
+        """Restores every website touched by the failed batch."""
+        for website, entries in self.undo.items():
+            for index in self.live_indexes():
+                for entry in self.passwords.get(website, []):
+                    index.remove(website, entry)
+                for entry in entries or []:
+                    index.add(website, entry)
+            if entries is None:
+                self.passwords.pop(website, None)
+            else:
+                self.passwords[website] = entries
+        self.dirty = dirty_before
+        self.undo = {}
+
+    def store_many(self, items):
+        """Stores (website, username, password) tuples with a single save."""
+        with self.batch():
+            for website, username, password in items:
+                self.store_password(website, username, password)
+
+    def delete_many(self, items):
+        """Deletes (website, username, password) tuples with a single save."""
+        with self.batch():
+            for website, username, password in items:
+                self.delete_password(website, username, password)
+
+    def store_password(self, website, username, password, tags=None):
+        """Ensures passwords are stored as a list per website, with optional search tags."""
+        with self.writing():
+            self.remember(website)
+            if website not in self.passwords or not isinstance(
+                self.passwords[website], list
+            ):
+                self.passwords[website] = (
+                    []
+                )  # Initialize as list if it’s missing or corrupted
+
+            entry = Entry(username, password, tags, created=int(time.time()))
+            self.passwords[website].append(entry)
+            for index in self.live_indexes():
+                index.add(website, entry)
+            self.persist(website)
 
     def retrieve_password(self, website):
         """Retrieves all stored passwords for a website."""
+        self.read_latest()
         passwords = self.passwords.get(website, [])
 
         # Ensure it's a list (convert single string entries)
         if isinstance(passwords, str):
             passwords = [{"username": "default", "password": passwords}]
+        else:
+            # Plain dict copies: the public shape, and safe from cache eviction
+            passwords = [entry.as_dict() for entry in passwords]
 
         return passwords
 
     def delete_password(self, website, username, password):
         """Deletes a specific password entry for a website while keeping others."""
-        if website in self.passwords:
-            # Filter out only the selected password, keeping others
-            self.passwords[website] = [
-                entry
-                for entry in self.passwords[website]
-                if not (entry["username"] == username and entry["password"] == password)
+        with self.writing():
+            if website in self.passwords:
+                self.remember(website)
+                # Filter out only the selected password, keeping others
+                kept = []
+                for entry in self.passwords[website]:
+                    if entry.username == username and entry.password == password:
+                        for index in self.live_indexes():
+                            index.remove(website, entry)
+                    else:
+                        kept.append(entry)
+                self.passwords[website] = kept
+
+                # If no passwords remain for this website, remove the website entry
+                if not self.passwords[website]:
+                    del self.passwords[website]
+
+                self.persist(website)
+
+    def search(self, query, mode="auto", limit=20):
+        """Ranked prefix/substring/fuzzy lookup over websites, usernames and tags.
+
+        Returns search_index.Match tuples. The index is built from the whole
+        vault on first use (decrypting it if lazy) and afterwards updated by
+        store_password and delete_password.
+        """
+        self.read_latest()
+        if self.index is None:
+            self.index = SearchIndex(self.passwords)
+        return self.index.search(query, mode, limit)
+
+    def audit(self, max_age_days=MAX_AGE_DAYS):
+        """Reports reused, weak and old passwords as a vault_audit.AuditReport.
+
+        The first audit indexes the whole vault in one pass, keyed by an HMAC
+        of each password under a key derived from the vault key; store and
+        delete keep the index current, so later audits are near-instant.
+        """
+        self.read_latest()
+        if self.audit_index is None:
+            self.audit_index = AuditIndex(self.audit_key(), self.passwords)
+        return self.audit_index.report(max_age_days)
+
+    def audit_key(self):
+        """HMAC key for the audit index, separate from the encryption key."""
+        return hmac.digest(self.key, b"SecureSafe audit index", hashlib.sha256)
+
+    def breach_check(self, dump):
+        """Checks every stored password against a breach_check.HashDump.
+
+        Returns (website, username, count) for each breached entry, most
+        breached first. All passwords are looked up in one sorted sweep.
+        """
+        self.read_latest()
+        refs = {}
+        for website in list(self.passwords):
+            for entry in self.passwords[website]:
+                refs.setdefault(entry.password, []).append((website, entry.username))
+        counts = dump.check_passwords(refs)
+        breached = [
+            (website, username, counts[password])
+            for password, entries in refs.items()
+            if counts[password]
+            for website, username in entries
+        ]
+        return sorted(breached, key=lambda row: (-row[2], row[0], row[1]))
+
+    def replace_entries(self, website, entries):
+        """Replaces every entry of a website, deleting the website if ``entries`` is empty."""
+        with self.writing():
+            self.remember(website)
+            # Copies, so entries shared with another safe are never cleared by its cache
+            entries = [copy.copy(entry) for entry in entries]
+            for index in self.live_indexes():
+                for entry in self.passwords.get(website, []):
+                    index.remove(website, entry)
+                for entry in entries:
+                    index.add(website, entry)
+            if entries:
+                self.passwords[website] = entries
+            else:
+                self.passwords.pop(website, None)
+            self.persist(website)
+
+    def sync_key(self):
+        """Key for sync leaf digests, separate from the encryption key."""
+        return hmac.digest(self.key, b"SecureSafe sync", hashlib.sha256)
+
+    def sync_leaves(self, websites=None):
+        """Leaf digest of every saved record, or of just ``websites``, keyed by website.
+
+        Records are re-encrypted exactly when their website changes, so their
+        digests track changes without decrypting anything. Stream vaults
+        have no per-website records and digest the entries instead.
+        """
+        source = self.passwords if self.stream else self.ciphertexts
+        if websites is not None:
+            items = [
+                (website, source[website]) for website in websites if website in source
             ]
+        elif self.stream:
+            items = source.items()
+        else:
+            items = self.ciphertexts.stored_items()
+        key = self.sync_key()
+        return {
+            website: leaf_digest(key, website, dump_json(data) if self.stream else data)
+            for website, data in items
+        }
 
-            # If no passwords remain for this website, remove the website entry
-            if not self.passwords[website]:
-                del self.passwords[website]
+    def sync_record(self, website):
+        """A website's saved record in base64, as the sync state keeps it."""
+        if self.stream:
+            return self.encrypt(dump_json(self.passwords[website]), website.encode())
+        record = self.ciphertexts[website]
+        return base64.b64encode(record).decode() if self.binary else record
 
-            self.save_passwords()
+    def sync(self, other_path, master_password=None):
+        """Three-way merges this vault with another copy of it; returns a vault_sync.SyncReport.
+
+        Websites changed on either side since the last sync with
+        ``other_path`` are found by comparing Merkle trees of record digests;
+        only those are decrypted, merged against their state at the last
+        sync and saved to whichever vault they changed for. Copies of one
+        vault share its key; a vault created separately needs its own
+        ``master_password``.
+        """
+        if not os.path.exists(other_path):
+            raise FileNotFoundError(f"No vault at {other_path}")
+        if master_password is None and read_meta(other_path).get(
+            "kdf"
+        ) != self.meta.get("kdf"):
+            raise ValueError(
+                f"{other_path} has its own master key; pass its master password"
+            )
+        other = SecureSafe(
+            master_password,
+            file=other_path,
+            lazy=True,
+            key=None if master_password else self.key,
+        )
+        state_file = sync_state_path(self.file, other_path)
+        with ExitStack() as stack:
+            # Registered first, so it runs last: after the locks, even on errors
+            stack.callback(other.close)
+            # A fixed lock order, so two processes syncing the same pair cannot deadlock
+            for safe in sorted(
+                (self, other), key=lambda safe: os.path.abspath(safe.file)
+            ):
+                stack.enter_context(safe.writing())
+            for safe in (self, other):
+                # Leaves digest saved records, so journaled and pending changes go in first
+                if safe.dirty or safe.pending or os.path.exists(safe.journal_file):
+                    safe.save_passwords()
+            state = load_sync_state(state_file, self.meta["kdf"], self.cipher)
+            ours, theirs = self.sync_leaves(), other.sync_leaves()
+            changed = changed_websites(state["ours"], ours) | changed_websites(
+                state["theirs"], theirs
+            )
+            pulled, pushed, conflicts = {}, {}, []
+            for website in sorted(changed):
+                base = state["base"].get(website)
+                if base is not None:
+                    base = load_entries(
+                        json.loads(self.decrypt(base, website.encode()))
+                    )
+                # Copies: lazy caches wipe evicted entries before the merge is saved
+                mine = [copy.copy(entry) for entry in self.passwords.get(website, [])]
+                yours = [copy.copy(entry) for entry in other.passwords.get(website, [])]
+                merged, usernames = merge_entries(base or [], mine, yours)
+                conflicts.extend((website, username) for username in usernames)
+                if merged != mine:
+                    pulled[website] = merged
+                if merged != yours:
+                    pushed[website] = merged
+            for safe, updates in ((self, pulled), (other, pushed)):
+                with safe.batch():
+                    for website, entries in updates.items():
+                        safe.replace_entries(website, entries)
+            # Only the merged websites have new records to digest
+            for leaves, safe in ((ours, self), (theirs, other)):
+                for website in changed:
+                    leaves.pop(website, None)
+                leaves.update(safe.sync_leaves(changed))
+            for website in changed:
+                if website in self.passwords:
+                    state["base"][website] = self.sync_record(website)
+                else:
+                    state["base"].pop(website, None)
+            save_sync_state(
+                state_file,
+                self.meta["kdf"],
+                self.cipher,
+                {"ours": ours, "theirs": theirs, "base": state["base"]},
+            )
+        return SyncReport(sorted(pulled), sorted(pushed), conflicts, len(changed))
+
+    def live_indexes(self):
+        """Indexes built so far, which store and delete keep current."""
+        return [index for index in (self.index, self.audit_index) if index is not None]
+
+    def flush(self):
+        """Writes every change still waiting for the write-behind flusher.
+
+        Pending websites go to the journal in one fsynced append, or into a
+        full save when the journal is off, after picking up what other
+        processes saved meanwhile. If the write fails they stay pending for
+        the next flush.
+        """
+        if not self.pending:
+            return
+        with self.writing():
+            if not self.pending:
+                return
+            websites = list(self.pending)
+            if self.uses_journal():
+                self.append_journal(*websites, sync=True)
+                self.pending.difference_update(websites)
+            else:
+                self.save_passwords()
+
+    def close(self):
+        """Stops the write-behind flusher, flushes what it left pending and releases the storage.
+
+        Memory maps and database connections are closed; reopen the vault to
+        use it again.
+        """
+        if self.write_behind is not None:
+            self.write_behind.stop()
+            self.write_behind = None
+            atexit.unregister(self.exit_hook)
+        try:
+            self.flush()
+        finally:
+            self.ciphertexts.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def forget(self):
+        """Drops the key and every decrypted entry; reopen the vault to use it again."""
+        self.close()
+        if self.lazy:
+            self.passwords.clear_cache()
+        self.passwords = {}
+        self.index = self.audit_index = None
+        self.key = None
+        # The KDF cache holds master passwords and the keys derived from them
+        derive_cached.cache_clear()
 
     def generate_password(self, length=12, use_symbols=True, use_numbers=True):
         """Generates a strong random password."""
-        characters = string.ascii_letters
-        if use_symbols:
-            characters += string.punctuation
-        if use_numbers:
-            characters += string.digits
-        return "".join(random.choice(characters) for _ in range(length))
+        return generate_passwords(1, length, use_symbols, use_numbers)[0]
+
+    def generate_passwords(
+        self,
+        n,
+        length=12,
+        use_symbols=True,
+        use_numbers=True,
+        min_symbols=0,
+        min_digits=0,
+    ):
+        """Generates ``n`` passwords at once; see password_generator.generate_passwords."""
+        return generate_passwords(
+            n, length, use_symbols, use_numbers, min_symbols, min_digits
+        )
 
 
-def main_cli():
+def main_cli(argv=None):
     """CLI for SecureSafe"""
+    parser = argparse.ArgumentParser(description="SecureSafe password manager")
+    parser.add_argument("--file", default="passwords.json", help="vault to use")
+    parser.add_argument(
+        "--profile", action="store_true", help="print hot-path timings on exit"
+    )
+    args = parser.parse_args(argv)
     print("Welcome to SecureSafe v2!")
     master_password = getpass("Enter your master password: ")
-    safe = SecureSafe(master_password)
+    safe = SecureSafe(master_password, file=args.file, profile=args.profile)
+    try:
+        menu(safe)
+    finally:
+        if args.profile:
+            print(safe.profiler.report(), file=sys.stderr)
 
+
+def menu(safe):
+    """Interactive store/retrieve/delete/generate loop"""
     while True:
         print("\nOptions:")
         print("1. Store Password")
@@ -125,8 +1287,9 @@ def main_cli():
 
         if choice == "1":
             website = input("Enter website: ")
+            username = input("Enter username: ")
             password = input("Enter password: ")
-            safe.store_password(website, password)
+            safe.store_password(website, username, password)
             print("Password stored securely!")
 
         elif choice == "2":
@@ -139,7 +1302,9 @@ def main_cli():
 
         elif choice == "3":
             website = input("Enter website to delete: ")
-            safe.delete_password(website)
+            username = input("Enter username: ")
+            password = input("Enter password: ")
+            safe.delete_password(website, username, password)
             print("Password deleted!")
 
         elif choice == "4":
@@ -0,0 +1,250 @@
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import socketserver
+from getpass import getpass
+
+# Lock the vault again after this many seconds without a request.
+IDLE_TIMEOUT = 15 * 60
+
+
+def default_socket_path():
+    """Per-user socket path, overridable through SECURESAFE_AGENT_SOCK."""
+    return os.environ.get("SECURESAFE_AGENT_SOCK") or os.path.join(
+        tempfile.gettempdir(), f"securesafe-{os.getuid()}.sock"
+    )
+
+
+class AgentHandler(socketserver.StreamRequestHandler):
+    """Serves newline-delimited JSON requests from one client connection."""
+
+    def handle(self):
+        if not self.server.peer_allowed(self.request):
+            return
+        for line in self.rfile:
+            self.server.touch()
+            try:
+                response = {
+                    "ok": True,
+                    "result": self.server.dispatch(json.loads(line)),
+                }
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Keeps an unlocked SecureSafe in memory and serves it over a Unix socket.
+
+    Each client connection gets its own thread; every call into the safe is
+    serialized by a single lock, so concurrent writers never interleave a
+    journal append or a save. The vault is dropped after ``idle_timeout``
+    seconds without a request.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, safe, socket_path=None, idle_timeout=IDLE_TIMEOUT):
+        self.safe = safe
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.last_request = time.monotonic()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        # Only the owner may connect; the umask covers the window before chmod
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(self.socket_path, AgentHandler)
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.socket_path, 0o600)
+
+    def peer_allowed(self, connection):
+        """Rejects connections from other users where the OS reports peer credentials."""
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        credentials = connection.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, 12  # struct ucred: pid, uid, gid
+        )
+        uid = int.from_bytes(credentials[4:8], sys.byteorder)
+        return uid == os.getuid()
+
+    def touch(self):
+        self.last_request = time.monotonic()
+
+    def dispatch(self, request):
+        """Runs one request against the safe and returns its result."""
+        op = request["op"]
+        with self.lock:
+            if op == "ping":
+                return "pong"
+            if op == "get":
+                return self.safe.retrieve_password(request["website"])
+            if op == "list":
+                self.safe.read_latest()
+                return sorted(self.safe.passwords)
+            if op == "store":
+                self.safe.store_password(
+                    request["website"], request["username"], request["password"]
+                )
+                return None
+            if op == "delete":
+                self.safe.delete_password(
+                    request["website"], request["username"], request["password"]
+                )
+                return None
+            if op == "generate":
+                return self.safe.generate_password(
+                    request.get("length", 12),
+                    request.get("use_symbols", True),
+                    request.get("use_numbers", True),
+                )
+            if op == "stop":
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                return None
+        raise ValueError(f"Unknown operation: {op}")
+
+    def watch_idle(self):
+        """Shuts the server down once it has been idle for ``idle_timeout`` seconds."""
+        while True:
+            remaining = self.last_request + self.idle_timeout - time.monotonic()
+            if remaining <= 0:
+                self.shutdown()
+                return
+            time.sleep(min(remaining, 1.0))
+
+    def serve(self):
+        """Serves until stopped or idle, then forgets the vault."""
+        if self.idle_timeout:
+            threading.Thread(target=self.watch_idle, daemon=True).start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            with self.lock:
+                self.safe.forget()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class AgentClient:
+    """Talks to a running AgentServer over its Unix socket."""
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.sock = None
+        self.reader = None
+
+    def call(self, op, **params):
+        """Sends one request and returns its result, raising on agent errors."""
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(self.socket_path)
+            self.reader = self.sock.makefile("rb")
+        self.sock.sendall(json.dumps({"op": op, **params}).encode() + b"\n")
+        line = self.reader.readline()
+        if not line:
+            self.close()
+            raise ConnectionError("The agent closed the connection")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def close(self):
+        if self.sock is not None:
+            self.reader.close()
+            self.sock.close()
+        self.sock = self.reader = None
+
+    def ping(self):
+        return self.call("ping")
+
+    def get(self, website):
+        return self.call("get", website=website)
+
+    def list(self):
+        return self.call("list")
+
+    def store(self, website, username, password):
+        self.call("store", website=website, username=username, password=password)
+
+    def delete(self, website, username, password):
+        self.call("delete", website=website, username=username, password=password)
+
+    def generate(self, length=12, use_symbols=True, use_numbers=True):
+        return self.call(
+            "generate", length=length, use_symbols=use_symbols, use_numbers=use_numbers
+        )
+
+    def stop(self):
+        self.call("stop")
+
+
+def main(argv=None):
+    """CLI for the SecureSafe agent"""
+    parser = argparse.ArgumentParser(description="SecureSafe unlock agent")
+    parser.add_argument("--socket", help="agent socket path")
+    commands = parser.add_subparsers(dest="command", required=True)
+    start = commands.add_parser("start", help="unlock a vault and serve it")
+    start.add_argument("--file", default="passwords.json")
+    start.add_argument("--idle-timeout", type=int, default=IDLE_TIMEOUT)
+    start.add_argument("--foreground", action="store_true")
+    commands.add_parser("stop", help="stop the agent")
+    commands.add_parser("list", help="list stored websites")
+    get = commands.add_parser("get", help="print the entries for a website")
+    get.add_argument("website")
+    for name in ("store", "delete"):
+        command = commands.add_parser(name, help=f"{name} a password")
+        command.add_argument("website")
+        command.add_argument("username")
+        command.add_argument("password")
+    generate = commands.add_parser("generate", help="generate a password")
+    generate.add_argument("--length", type=int, default=12)
+    args = parser.parse_args(argv)
+
+    if args.command == "start":
+        from secure_safe import SecureSafe
+
+        safe = SecureSafe(getpass("Enter your master password: "), file=args.file)
+        server = AgentServer(safe, args.socket, args.idle_timeout)
+        print(
+            f"SECURESAFE_AGENT_SOCK={server.socket_path}; export SECURESAFE_AGENT_SOCK"
+        )
+        sys.stdout.flush()
+        # Detach like ssh-agent unless asked to stay in the foreground
+        if not args.foreground and os.fork():
+            os._exit(0)
+        server.serve()
+        return
+
+    client = AgentClient(args.socket)
+    if args.command == "get":
+        result = client.get(args.website)
+    elif args.command == "list":
+        result = client.list()
+    elif args.command == "store":
+        result = client.store(args.website, args.username, args.password)
+    elif args.command == "delete":
+        result = client.delete(args.website, args.username, args.password)
+    elif args.command == "generate":
+        result = client.generate(args.length)
+    else:
+        result = client.stop()
+    client.close()
+    if result is not None:
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
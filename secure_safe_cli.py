@@ -0,0 +1,300 @@
+"""Scriptable SecureSafe command line with JSON output.
+
+Only argparse and json are loaded at startup. The vault code, and
+PyCryptodome with it, is imported by the commands that open a vault, so
+``gen`` and ``--help`` start without paying for it.
+
+The master password comes from --password-fd, --password-stdin or the
+SECURESAFE_MASTER_PASSWORD environment variable, in that order, and is
+prompted for only when none is given. When SECURESAFE_AGENT_SOCK names a
+running agent and no --file is given, get, put, rm and ls go through the
+agent instead of unlocking the vault again.
+
+Usage:
+    python secure_safe_cli.py gen --length 20 --count 5
+    python secure_safe_cli.py --password-stdin get github.com < master.txt
+    python secure_safe_cli.py --password-fd 3 put github.com alice 3< master.txt
+    python secure_safe_cli.py --file passwords.json sync /mnt/laptop/passwords.json
+    python secure_safe_cli.py --file passwords.json migrate passwords.db
+"""
+
+import os
+import sys
+import json
+import argparse
+
+PASSWORD_ENV = "SECURESAFE_MASTER_PASSWORD"
+AGENT_ENV = "SECURESAFE_AGENT_SOCK"
+DEFAULT_FILE = "passwords.json"
+
+
+def read_line(f):
+    """One line from ``f`` without its line ending."""
+    return f.readline().rstrip("\r\n")
+
+
+def master_password(args):
+    """Reads the master password from the source chosen on the command line."""
+    if args.password_fd is not None:
+        with os.fdopen(args.password_fd, "r", closefd=False) as f:
+            return read_line(f)
+    if args.password_stdin:
+        return read_line(sys.stdin)
+    if os.environ.get(PASSWORD_ENV):
+        return os.environ[PASSWORD_ENV]
+    from getpass import getpass
+
+    return getpass("Enter your master password: ")
+
+
+class AgentVault:
+    """The SecureSafe calls the commands make, served by a running agent."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def retrieve_password(self, website):
+        return self.client.get(website)
+
+    def websites(self):
+        return self.client.list()
+
+    def store_password(self, website, username, password):
+        self.client.store(website, username, password)
+
+    def delete_many(self, items):
+        for website, username, password in items:
+            self.client.delete(website, username, password)
+
+
+class LocalVault:
+    """The same calls against a SecureSafe unlocked in this process."""
+
+    def __init__(self, safe):
+        self.safe = safe
+        self.retrieve_password = safe.retrieve_password
+        self.store_password = safe.store_password
+        self.delete_many = safe.delete_many
+
+    def websites(self):
+        self.safe.read_latest()
+        return sorted(self.safe.passwords)
+
+
+def open_safe(args):
+    from secure_safe import SecureSafe
+
+    return SecureSafe(master_password(args), file=args.file or DEFAULT_FILE, lazy=True)
+
+
+def open_vault(args):
+    """The running agent if there is one to use, else the vault unlocked here."""
+    socket_path = os.environ.get(AGENT_ENV)
+    if args.file is None and not args.no_agent and socket_path:
+        if os.path.exists(socket_path):
+            from secure_safe_agent import AgentClient
+
+            return AgentVault(AgentClient(socket_path))
+    return LocalVault(open_safe(args))
+
+
+def generate(args):
+    from password_generator import generate_passwords
+
+    return generate_passwords(
+        args.count,
+        args.length,
+        not args.no_symbols,
+        not args.no_numbers,
+        args.min_symbols,
+        args.min_digits,
+    )
+
+
+def get(args):
+    return open_vault(args).retrieve_password(args.website)
+
+
+def put(args):
+    vault = open_vault(args)
+    result = {"website": args.website, "username": args.username}
+    password = args.password
+    if password == "-":
+        password = read_line(sys.stdin)
+    elif password is None:
+        password = result["password"] = generate(args)[0]
+    vault.store_password(args.website, args.username, password)
+    return result
+
+
+def remove(args):
+    """Deletes the matching entries; every entry of the website if no username is given."""
+    vault = open_vault(args)
+    doomed = [
+        (args.website, entry["username"], entry["password"])
+        for entry in vault.retrieve_password(args.website)
+        if args.username in (None, entry["username"])
+        and args.password in (None, entry["password"])
+    ]
+    vault.delete_many(doomed)
+    return {"removed": len(doomed)}
+
+
+def list_websites(args):
+    return [
+        website
+        for website in open_vault(args).websites()
+        if website.startswith(args.prefix)
+    ]
+
+
+def import_rows(args):
+    from vault_io import CHUNK_SIZE, import_csv
+
+    safe = open_safe(args)
+    with open(args.csv, newline="", encoding="utf-8-sig") as f:
+        stats = import_csv(safe, f, args.chunk_size or CHUNK_SIZE)
+    return {
+        "read": stats.read,
+        "imported": stats.imported,
+        "skipped": stats.skipped,
+        "seconds": stats.seconds,
+    }
+
+
+def export_rows(args):
+    from vault_io import export_csv, open_private
+
+    safe = open_safe(args)
+    with open_private(args.csv) as f:
+        return {"exported": export_csv(safe, f)}
+
+
+def sync_vaults(args):
+    """Merges the vault with another copy of it, unlocked with the same master password."""
+    from secure_safe import SecureSafe
+
+    password = master_password(args)
+    safe = SecureSafe(password, file=args.file or DEFAULT_FILE, lazy=True)
+    return safe.sync(args.other, password)._asdict()
+
+
+def migrate(args):
+    """Copies the vault into a new file whose extension picks the format, e.g. vault.db."""
+    from vault_format import convert_vault
+
+    safe = open_safe(args)
+    if os.path.exists(safe.journal_file):
+        safe.compact()  # Records are copied as stored, so fold the journal in first
+    convert_vault(safe.file, args.destination)
+    return {"migrated": len(safe.passwords), "destination": args.destination}
+
+
+def add_generator_options(parser):
+    parser.add_argument("--length", type=int, default=16)
+    parser.add_argument("--no-symbols", action="store_true")
+    parser.add_argument("--no-numbers", action="store_true")
+    parser.add_argument("--min-symbols", type=int, default=0)
+    parser.add_argument("--min-digits", type=int, default=0)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="SecureSafe password manager (JSON output)"
+    )
+    parser.add_argument("--file", help=f"vault to use (default: {DEFAULT_FILE})")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--password-stdin",
+        action="store_true",
+        help="read the master password from the first line of stdin",
+    )
+    source.add_argument(
+        "--password-fd",
+        type=int,
+        metavar="FD",
+        help="read the master password from file descriptor FD",
+    )
+    parser.add_argument("--no-agent", action="store_true", help=f"ignore ${AGENT_ENV}")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("get", help="print the entries for a website")
+    command.add_argument("website")
+    command.set_defaults(run=get)
+
+    command = commands.add_parser(
+        "put", help="store a password, generating one if none is given"
+    )
+    command.add_argument("website")
+    command.add_argument("username")
+    command.add_argument(
+        "password", nargs="?", help="the password, or - to read it from stdin"
+    )
+    add_generator_options(command)
+    command.set_defaults(run=put, count=1)
+
+    command = commands.add_parser("rm", help="delete entries for a website")
+    command.add_argument("website")
+    command.add_argument("username", nargs="?")
+    command.add_argument("--password", help="only delete entries with this password")
+    command.set_defaults(run=remove)
+
+    command = commands.add_parser("gen", help="generate passwords")
+    command.add_argument("--count", type=int, default=1)
+    add_generator_options(command)
+    command.set_defaults(run=generate)
+
+    command = commands.add_parser("ls", help="list stored websites")
+    command.add_argument("prefix", nargs="?", default="")
+    command.set_defaults(run=list_websites)
+
+    command = commands.add_parser("import", help="import a CSV export")
+    command.add_argument("csv")
+    command.add_argument("--chunk-size", type=int)
+    command.set_defaults(run=import_rows)
+
+    command = commands.add_parser("export", help="export the vault as CSV")
+    command.add_argument("csv")
+    command.set_defaults(run=export_rows)
+
+    command = commands.add_parser(
+        "sync", help="merge changes with another copy of the vault"
+    )
+    command.add_argument("other", help="the other vault file")
+    command.set_defaults(run=sync_vaults)
+
+    command = commands.add_parser(
+        "migrate", help="copy the vault into another storage format"
+    )
+    command.add_argument(
+        "destination",
+        help="new vault file; .db is SQLite, .ssv binary, .shards sharded, else JSON",
+    )
+    command.set_defaults(run=migrate)
+    return parser
+
+
+def main(argv=None):
+    """Runs one command and prints its result as JSON; returns the exit status.
+
+    get and rm exit with 1 when nothing matched, and any failure prints
+    {"error": ...} to stderr and exits with 1.
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        result = args.run(args)
+    except Exception as e:
+        json.dump({"error": str(e)}, sys.stderr)
+        sys.stderr.write("\n")
+        return 1
+    json.dump(result, sys.stdout)
+    sys.stdout.write("\n")
+    if args.command == "get" and not result:
+        return 1
+    if args.command == "rm" and not result["removed"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
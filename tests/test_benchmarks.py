@@ -0,0 +1,78 @@
+import os
+import sys
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"
+    ),
+)
+
+from bench_cipher import run as run_cipher  # noqa: E402
+from bench_memory import build  # noqa: E402
+from bench_passwords import run  # noqa: E402
+from bench_storage import run as run_storage  # noqa: E402
+from bench_vault import run_size  # noqa: E402
+
+
+def test_run_size_reports_every_operation(tmp_path):
+    """A tiny benchmark run produces one row per measured operation."""
+    results = run_size(50, operations=20, directory=str(tmp_path))
+
+    operations = [row["operation"] for row in results]
+    assert operations == [
+        "load_passwords",
+        "save_passwords",
+        "save_passwords_full",
+        "store_password",
+        "retrieve_password",
+        "delete_password",
+        "generate_password",
+    ]
+    assert all(row["size"] == 50 and row["peak_rss_kb"] > 0 for row in results)
+
+
+def test_password_benchmark_compares_generators():
+    """The password benchmark times the old loop against the batch generator."""
+    results = run(50, 12)
+
+    assert [row["generator"] for row in results] == [
+        "per_char_random",
+        "per_char_secrets",
+        "generate_passwords",
+        "generate_passwords_min",
+    ]
+    assert all(row["passwords_per_sec"] for row in results)
+
+
+def test_memory_benchmark_builds_both_representations():
+    """Both representations decode to the same entries."""
+    entries = {
+        website: [entry.to_json() for entry in entry_list]
+        for website, entry_list in build("entry", 10).items()
+    }
+    assert entries == build("dict", 10)
+
+
+def test_cipher_benchmark_round_trips_every_mode():
+    """Every mode decrypts back to the vault it encrypted."""
+    results = run_cipher(20)
+
+    assert [row["mode"] for row in results] == [
+        "cbc_records",
+        "aead_records",
+        "aead_stream",
+    ]
+    assert all(row["encrypt_mb_per_sec"] > 0 for row in results)
+
+
+def test_storage_benchmark_covers_every_backend():
+    results = run_storage(20, operations=3)
+
+    assert [row["backend"] for row in results] == [
+        "json",
+        "binary",
+        "sharded",
+        "sqlite",
+    ]
+    assert all(row["store_seconds"] > 0 for row in results)
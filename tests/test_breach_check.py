@@ -0,0 +1,104 @@
+import random
+import hashlib
+import pytest
+from unittest.mock import patch
+from breach_check import HashDump, generate_unbreached, sha1_hex
+from secure_safe import SecureSafe
+
+BREACHED = {"password": 9545824, "123456": 37359195, "letmein!": 12}
+
+
+@pytest.fixture
+def dump_path(tmp_path):
+    """A small dump in the Pwned Passwords layout: sorted "HASH:COUNT" CRLF lines."""
+    rng = random.Random(1234)
+    lines = {
+        hashlib.sha1(rng.randbytes(8)).hexdigest().upper(): rng.randint(1, 500)
+        for _ in range(20000)
+    }
+    for password, count in BREACHED.items():
+        lines[sha1_hex(password).decode()] = count
+    path = str(tmp_path / "pwned.txt")
+    with open(path, "w", newline="") as f:
+        for digest in sorted(lines):
+            f.write(f"{digest}:{lines[digest]}\r\n")
+    return path
+
+
+def all_digests(path):
+    with open(path, "rb") as f:
+        return {line[:40]: int(line[41:]) for line in f}
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_lookup_finds_every_present_hash(dump_path, indexed):
+    """Every hash in the file is found with its count; others report 0."""
+    expected = all_digests(dump_path)
+    with HashDump(dump_path) as dump:
+        if indexed:
+            dump.build_index()
+        for digest in random.Random(1).sample(sorted(expected), 500):
+            assert dump.lookup(digest) == expected[digest]
+        for i in range(200):
+            missing = hashlib.sha1(b"missing%d" % i).hexdigest().upper().encode()
+            assert dump.lookup(missing) == 0
+        assert dump.lookup(min(expected)) == expected[min(expected)]
+        assert dump.lookup(max(expected)) == expected[max(expected)]
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_lookup_many_is_one_forward_sweep(dump_path, indexed):
+    """Batched lookups match single ones and never search backwards."""
+    expected = all_digests(dump_path)
+    digests = random.Random(2).sample(sorted(expected), 300) + [
+        hashlib.sha1(b"missing%d" % i).hexdigest().upper().encode() for i in range(100)
+    ]
+    with HashDump(dump_path) as dump:
+        if indexed:
+            dump.build_index()
+        with patch.object(dump, "lower_bound", wraps=dump.lower_bound) as search:
+            counts = dump.lookup_many(digests)
+
+        starts = [call.args[1] for call in search.call_args_list]
+        assert starts == sorted(starts)
+        assert counts == {digest: expected.get(digest, 0) for digest in digests}
+
+
+def test_stale_index_is_ignored(dump_path):
+    """An index built for a different file size is not used."""
+    with HashDump(dump_path) as dump:
+        dump.build_index()
+    with open(dump_path, "a", newline="") as f:
+        f.write("F" * 40 + ":1\r\n")
+
+    with HashDump(dump_path) as dump:
+        assert dump.index is None
+        assert dump.lookup(b"F" * 40) == 1
+
+
+def test_vault_breach_check(dump_path, tmp_path):
+    """Breached vault entries are reported, most breached first."""
+    safe = SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+    safe.store_many(
+        [
+            ("a.com", "alice", "password"),
+            ("b.com", "bob", "123456"),
+            ("c.com", "carol", "x7#Kq9!vRt2$Lm"),
+            ("d.com", "dave", "password"),
+        ]
+    )
+    with HashDump(dump_path) as dump:
+        assert safe.breach_check(dump) == [
+            ("b.com", "bob", 37359195),
+            ("a.com", "alice", 9545824),
+            ("d.com", "dave", 9545824),
+        ]
+
+
+def test_generated_candidates_are_checked(dump_path):
+    """Candidates found in the dump are redrawn."""
+    batches = [["letmein!", "fresh-one"], ["fresh-two"]]
+    with HashDump(dump_path) as dump, patch(
+        "breach_check.generate_passwords", side_effect=batches
+    ):
+        assert generate_unbreached(dump, 2) == ["fresh-one", "fresh-two"]
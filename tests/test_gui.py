@@ -1,4 +1,6 @@
 import sys
+import time
+import threading
 import unittest
 import tkinter as tk
 from tkinter import TclError
@@ -9,7 +11,11 @@ if sys.platform != "win32":
     from pyvirtualdisplay import Display
 
 # Import your SecureSafeGUI class.
-from SecureSafeGUI import SecureSafeGUI  # Make sure the file is named SecureSafeGUI.py
+from SecureSafeGUI import (  # Make sure the file is named SecureSafeGUI.py
+    VISIBLE_ROWS,
+    EntryIndex,
+    SecureSafeGUI,
+)
 
 
 class TestSecureSafeGUI(unittest.TestCase):
@@ -39,6 +45,14 @@ class TestSecureSafeGUI(unittest.TestCase):
         if hasattr(self, "root"):
             self.root.destroy()
 
+    def wait_for_worker(self, timeout=5):
+        """Pumps the Tk event loop until background vault work has finished."""
+        deadline = time.monotonic() + timeout
+        while self.gui.busy and time.monotonic() < deadline:
+            self.root.update()
+            time.sleep(0.01)
+        self.assertFalse(self.gui.busy, "background work did not finish")
+
     # Update the patch target from "gui.SecureSafe" to "SecureSafeGUI.SecureSafe"
     @patch("SecureSafeGUI.SecureSafe")
     def test_authenticate_load_main_ui(self, mock_secure_safe):
@@ -47,6 +61,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         test_master = "testpassword"
         self.gui.master_entry.insert(0, test_master)
         self.gui.authenticate()
+        self.wait_for_worker()
 
         # Ensure SecureSafe is instantiated with the correct master password.
         mock_secure_safe.assert_called_with(test_master)
@@ -77,6 +92,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         self.gui.password_entry.insert(0, password)
 
         self.gui.store_password()
+        self.wait_for_worker()
 
         # Verify the safe’s store_password was called.
         self.gui.safe.store_password.assert_called_with(website, username, password)
@@ -98,6 +114,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         self.gui.password_entry.insert(0, "pass123")
 
         self.gui.store_password()
+        self.wait_for_worker()
 
         mock_showerror.assert_called_with(
             "Error", "Website, Username, and Password are required."
@@ -122,6 +139,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         self.gui.username_entry.insert(0, "user")
 
         self.gui.retrieve_password()
+        self.wait_for_worker()
 
         mock_pyperclip_copy.assert_called_with("pass123")
         mock_showinfo.assert_called_with("Success", "Password copied to clipboard! ✅")
@@ -151,6 +169,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         mock_askinteger.return_value = 2
 
         self.gui.retrieve_password()
+        self.wait_for_worker()
 
         mock_pyperclip_copy.assert_called_with("pass2")
         mock_showinfo.assert_called_with("Success", "Password copied to clipboard! ✅")
@@ -176,6 +195,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         mock_askinteger.return_value = None
 
         self.gui.retrieve_password()
+        self.wait_for_worker()
 
         mock_showerror.assert_called_with("Error", "Invalid selection.")
 
@@ -188,6 +208,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         self.gui.username_entry.delete(0, tk.END)
 
         self.gui.retrieve_password()
+        self.wait_for_worker()
 
         mock_showerror.assert_called_with(
             "Error", "Please enter both website and username."
@@ -207,6 +228,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         self.gui.username_entry.insert(0, "user")
 
         self.gui.delete_password()
+        self.wait_for_worker()
 
         self.gui.safe.delete_password.assert_called_with(
             "example.com", "user", "pass123"
@@ -239,6 +261,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         mock_askinteger.return_value = 1
 
         self.gui.delete_password()
+        self.wait_for_worker()
 
         self.gui.safe.delete_password.assert_called_with("example.com", "user", "pass1")
         mock_showinfo.assert_called_with(
@@ -266,6 +289,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         mock_askinteger.return_value = 3
 
         self.gui.delete_password()
+        self.wait_for_worker()
 
         mock_showerror.assert_called_with("Error", "Invalid selection.")
 
@@ -280,6 +304,7 @@ class TestSecureSafeGUI(unittest.TestCase):
         self.gui.username_entry.insert(0, "user")
 
         self.gui.delete_password()
+        self.wait_for_worker()
 
         mock_showerror.assert_called_with(
             "Error", "Please enter both website and username."
@@ -296,6 +321,134 @@ class TestSecureSafeGUI(unittest.TestCase):
         # Check that the password_entry now contains the generated password.
         self.assertEqual(self.gui.password_entry.get(), "generatedPass123!")
 
+    def test_buttons_disabled_while_busy(self):
+        """Buttons are disabled and the progress bar shown while work is in flight."""
+        self.gui.safe = MagicMock()
+        release = threading.Event()
+        self.gui.safe.store_password.side_effect = lambda *args: release.wait(5)
+        self.gui.load_main_ui()
+        self.gui.website_entry.insert(0, "example.com")
+        self.gui.username_entry.insert(0, "user")
+        self.gui.password_entry.insert(0, "pass123")
+
+        with patch("tkinter.messagebox.showinfo") as mock_showinfo:
+            self.gui.store_password()
+            self.root.update()
+            self.assertTrue(self.gui.busy)
+            states = {str(button.cget("state")) for button in self.gui.buttons}
+            self.assertEqual(states, {tk.DISABLED})
+
+            release.set()
+            self.wait_for_worker()
+
+        states = {str(button.cget("state")) for button in self.gui.buttons}
+        self.assertEqual(states, {tk.NORMAL})
+        mock_showinfo.assert_called_with("Success", "Password stored securely!")
+
+    @patch("tkinter.messagebox.showerror")
+    def test_worker_errors_are_reported(self, mock_showerror):
+        """Exceptions raised on the worker thread surface as an error dialog."""
+        self.gui.safe = MagicMock()
+        self.gui.safe.store_password.side_effect = OSError("disk full")
+        self.gui.website_entry.insert(0, "example.com")
+        self.gui.username_entry.insert(0, "user")
+        self.gui.password_entry.insert(0, "pass123")
+
+        self.gui.store_password()
+        self.wait_for_worker()
+
+        mock_showerror.assert_called_with("Error", "disk full")
+
+    def test_browser_renders_only_visible_rows(self):
+        """The browser list holds one screenful of rows however large the vault is."""
+        self.gui.safe = MagicMock()
+        self.gui.index = EntryIndex(
+            {
+                f"site{i}.com": [{"username": f"user{i}", "password": "p"}]
+                for i in range(500)
+            }
+        )
+        self.gui.load_main_ui()
+
+        self.assertEqual(self.gui.listbox.size(), VISIBLE_ROWS)
+        self.gui.scroll_browser("moveto", "0.5")
+        self.assertEqual(self.gui.offset, 250)
+        self.assertEqual(self.gui.listbox.size(), VISIBLE_ROWS)
+
+    def test_browser_search_and_select(self):
+        """Typing filters the browser and selecting a row fills the form."""
+        self.gui.safe = MagicMock()
+        self.gui.index = EntryIndex(
+            {
+                "example.com": [{"username": "alice", "password": "p"}],
+                "other.org": [{"username": "bob", "password": "p"}],
+            }
+        )
+        self.gui.load_main_ui()
+        self.gui.search_entry.insert(0, "bob")
+        self.gui.run_search()
+
+        self.assertEqual(self.gui.listbox.get(0, tk.END), ("other.org — bob",))
+        self.gui.listbox.selection_set(0)
+        self.gui.select_row()
+        self.assertEqual(self.gui.website_entry.get(), "other.org")
+        self.assertEqual(self.gui.username_entry.get(), "bob")
+
+
+class TestEntryIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = EntryIndex(
+            {
+                "example.com": [
+                    {"username": "alice", "password": "p1"},
+                    {"username": "bob", "password": "p2"},
+                ],
+                "Mail.Example.org": [{"username": "carol", "password": "p3"}],
+            }
+        )
+
+    def labels(self, rows):
+        return [self.index.rows[row] for row in rows]
+
+    def test_search_matches_website_and_username(self):
+        """Queries match either field, case-insensitively."""
+        self.assertEqual(
+            self.labels(self.index.search("EXAMPLE")),
+            [
+                ("Mail.Example.org", "carol"),
+                ("example.com", "alice"),
+                ("example.com", "bob"),
+            ],
+        )
+        self.assertEqual(self.labels(self.index.search("bo")), [("example.com", "bob")])
+        self.assertEqual(len(self.index.search("")), 3)
+        self.assertEqual(self.index.search("nothing"), [])
+
+    def test_search_narrows_previous_matches(self):
+        """An extended query only rechecks the rows the previous query matched."""
+        self.index.search("bob")
+        self.index.keys[0] = "bobby"  # Only a full scan would find this row
+        self.assertEqual(self.index.search("bobb"), [])
+        self.index.add("b.com", "dave")  # Changes reset the narrowing
+        self.assertEqual(
+            self.labels(self.index.search("bobb")), [("Mail.Example.org", "carol")]
+        )
+
+    def test_add_and_remove_keep_rows_sorted(self):
+        """Incremental updates keep the index consistent with the vault."""
+        self.index.add("b.com", "dave")
+        self.index.remove("example.com", "alice")
+
+        self.assertEqual(
+            self.index.rows,
+            [
+                ("Mail.Example.org", "carol"),
+                ("b.com", "dave"),
+                ("example.com", "bob"),
+            ],
+        )
+        self.assertEqual(self.labels(self.index.search("dave")), [("b.com", "dave")])
+
 
 if __name__ == "__main__":
     unittest.main()
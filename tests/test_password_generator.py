@@ -0,0 +1,84 @@
+import math
+import string
+import pytest
+from collections import Counter
+from unittest.mock import patch
+from password_generator import (
+    generate_passwords,
+    password_entropy,
+    random_characters,
+    translation_table,
+)
+from secure_safe import SecureSafe
+
+ALPHABET = string.ascii_letters + string.punctuation + string.digits
+
+
+def test_generate_passwords_shape():
+    """Each password has the requested length and only allowed characters."""
+    passwords = generate_passwords(500, 20, use_symbols=False)
+
+    assert len(passwords) == 500
+    assert all(len(password) == 20 for password in passwords)
+    assert set("".join(passwords)) <= set(string.ascii_letters + string.digits)
+
+
+def test_minimums_are_met():
+    """Every password carries at least the required symbols and digits."""
+    for password in generate_passwords(500, 8, min_symbols=2, min_digits=3):
+        assert sum(char in string.punctuation for char in password) >= 2
+        assert sum(char in string.digits for char in password) >= 3
+
+
+def test_impossible_minimums_raise():
+    with pytest.raises(ValueError):
+        generate_passwords(1, 4, min_symbols=3, min_digits=2)
+    with pytest.raises(ValueError):
+        generate_passwords(1, 12, use_numbers=False, min_digits=1)
+
+
+def test_zero_length_passwords_are_empty(tmp_path):
+    safe = SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+    assert generate_passwords(3, 0) == ["", "", ""]
+    assert safe.generate_password(0) == ""
+
+
+def test_minimums_that_almost_never_hold_raise():
+    """Minimums nearly filling the length are rejected instead of redrawn forever."""
+    with pytest.raises(ValueError, match="too few"):
+        generate_passwords(1, 12, min_symbols=11)
+    assert len(generate_passwords(5, 12, min_symbols=6)) == 5
+
+
+def test_rejection_sampling_drops_biased_bytes():
+    """Bytes past the last full multiple of the alphabet size are rejected."""
+    table, rejected = translation_table(ALPHABET)
+
+    assert len(ALPHABET) == 94
+    assert rejected == bytes(range(188, 256))
+    assert bytes(range(256)).translate(table, rejected) == (ALPHABET * 2).encode()
+
+
+def test_characters_are_uniform():
+    """No character is noticeably favoured over a large sample."""
+    counts = Counter(random_characters(94 * 2000, ALPHABET))
+
+    assert len(counts) == 94
+    assert all(1600 < count < 2400 for count in counts.values())
+
+
+def test_entropy():
+    """Entropy is log2 of the number of possible passwords."""
+    assert password_entropy(12) == pytest.approx(12 * math.log2(94))
+    assert password_entropy(2, use_symbols=False, min_digits=1) == pytest.approx(
+        math.log2(62**2 - 52**2)
+    )
+    assert password_entropy(12, min_symbols=1, min_digits=1) < password_entropy(12)
+
+
+def test_secure_safe_uses_csprng(tmp_path):
+    """SecureSafe's generators no longer touch the random module."""
+    safe = SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+    with patch("random.choice", side_effect=AssertionError):
+        assert len(safe.generate_password(16)) == 16
+        assert len(safe.generate_passwords(10, 16, min_digits=2)) == 10
@@ -0,0 +1,121 @@
+import pytest
+from unittest.mock import patch
+from search_index import SearchIndex, edit_distance
+from secure_safe import SecureSafe
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(
+        {
+            "github.com": [
+                {"username": "alice", "password": "p1"},
+                {"username": "bob", "password": "p2", "tags": ["Work"]},
+            ],
+            "gitlab.com": [{"username": "alice", "password": "p3"}],
+            "mail.google.com": [{"username": "carol", "password": "p4"}],
+        }
+    )
+
+
+def pairs(matches):
+    return [(match.website, match.username) for match in matches]
+
+
+def test_prefix(index):
+    """Prefix queries match the start of any term."""
+    assert pairs(index.search("git", mode="prefix")) == [
+        ("github.com", "alice"),
+        ("github.com", "bob"),
+        ("gitlab.com", "alice"),
+    ]
+    assert pairs(index.search("ali", mode="prefix")) == [
+        ("github.com", "alice"),
+        ("gitlab.com", "alice"),
+    ]
+
+
+def test_substring(index):
+    """Substring queries match anywhere, including short queries."""
+    assert pairs(index.search("google", mode="substring")) == [
+        ("mail.google.com", "carol")
+    ]
+    assert pairs(index.search("ob", mode="substring")) == [("github.com", "bob")]
+
+
+def test_fuzzy(index):
+    """Typo-tolerant queries find terms within a few edits."""
+    assert pairs(index.search("gihub.com", mode="fuzzy")) == [
+        ("github.com", "alice"),
+        ("github.com", "bob"),
+    ]
+    assert pairs(index.search("carl", mode="fuzzy")) == [("mail.google.com", "carol")]
+
+
+def test_tags_are_searchable(index):
+    """Tags are indexed like websites and usernames, case-insensitively."""
+    assert pairs(index.search("work")) == [("github.com", "bob")]
+
+
+def test_auto_ranks_exact_then_prefix_then_fuzzy(index):
+    """Exact matches outrank prefix matches, which outrank fuzzy ones."""
+    index.add("alicex.net", {"username": "dave", "password": "p"})
+    index.add("erin.org", {"username": "alize", "password": "p"})
+
+    assert pairs(index.search("alice")) == [
+        ("github.com", "alice"),
+        ("gitlab.com", "alice"),
+        ("alicex.net", "dave"),
+        ("erin.org", "alize"),
+    ]
+
+
+def test_remove(index):
+    """Removing the last entry for a term drops the term entirely."""
+    index.remove("mail.google.com", {"username": "carol", "password": "p4"})
+
+    assert index.search("carol") == []
+    assert "carol" not in index.terms
+    assert all("carol" not in terms for terms in index.grams.values())
+
+
+def test_remove_keeps_terms_shared_with_other_entries(index):
+    """A term survives while another entry still refers to it."""
+    index.remove("github.com", {"username": "alice", "password": "p1"})
+
+    assert pairs(index.search("alice", mode="prefix")) == [("gitlab.com", "alice")]
+
+
+def test_edit_distance():
+    assert edit_distance("kitten", "sitting", 5) == 3
+    assert edit_distance("kitten", "sitting", 1) == 2
+
+
+def test_secure_safe_search_is_incremental(tmp_path):
+    """The vault index is built once and then updated by store and delete."""
+    safe = SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+    safe.store_password("github.com", "alice", "p1", tags=["work"])
+    assert pairs(safe.search("git")) == [("github.com", "alice")]
+
+    with patch("secure_safe.SearchIndex") as rebuild:
+        safe.store_password("gitlab.com", "bob", "p2")
+        safe.delete_password("github.com", "alice", "p1")
+        assert pairs(safe.search("git")) == [("gitlab.com", "bob")]
+        assert safe.search("work") == []
+
+    rebuild.assert_not_called()
+
+
+def test_secure_safe_search_after_rollback(tmp_path):
+    """A rolled-back batch leaves the index matching the vault."""
+    safe = SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+    safe.store_password("github.com", "alice", "p1")
+    safe.search("git")
+
+    with pytest.raises(RuntimeError):
+        with safe.batch():
+            safe.store_password("gitlab.com", "bob", "p2")
+            safe.delete_password("github.com", "alice", "p1")
+            raise RuntimeError("abort")
+
+    assert pairs(safe.search("git")) == [("github.com", "alice")]
@@ -1,6 +1,23 @@
 import pytest
+import base64
+import copy
+import json
 import os
-from secure_safe import SecureSafe
+import sys
+import time
+import subprocess
+from unittest.mock import patch
+from secure_safe import (
+    CIPHER_CBC,
+    CIPHER_XCHACHA,
+    DEFAULT_KDF,
+    Entry,
+    SecureSafe,
+    calibrate,
+    kdf_cost,
+    legacy_key,
+    worker_safe,
+)
 
 
 @pytest.fixture
@@ -9,8 +26,15 @@ def secure_safe():
     test_instance = SecureSafe("TestMasterKey")
     yield test_instance
     # Cleanup: Remove the test password file after tests
-    if os.path.exists("passwords.json"):
-        os.remove("passwords.json")
+    for path in ("passwords.json", "passwords.json.journal", "passwords.json.lock"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest.fixture
+def vault_path(tmp_path):
+    """Path to a vault file inside a per-test temporary directory."""
+    return str(tmp_path / "passwords.json")
 
 
 def test_store_password(secure_safe):
@@ -54,3 +78,664 @@ def test_delete_non_existent_password(secure_safe):
 
     retrieved_passwords = secure_safe.retrieve_password("test.com")
     assert len(retrieved_passwords) == 1  # Password should remain unchanged
+
+
+def test_store_appends_to_journal(vault_path):
+    """Stores are appended to the journal instead of rewriting the snapshot."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("test.com", "user1", "Test@123")  # Creates the snapshot
+    with open(vault_path) as f:
+        snapshot = f.read()
+
+    safe.store_password("test.com", "user2", "Pass@456")
+    safe.store_password("other.com", "user3", "Other@789")
+
+    with open(vault_path) as f:
+        assert f.read() == snapshot
+    with open(safe.journal_file) as f:
+        assert len(f.readlines()) == 2
+
+
+def test_load_replays_journal(vault_path):
+    """A reopened vault sees the snapshot plus every journaled change."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("test.com", "user1", "Test@123")
+    safe.compact()
+    safe.store_password("test.com", "user2", "Pass@456")
+    safe.store_password("other.com", "user3", "Other@789")
+    safe.delete_password("other.com", "user3", "Other@789")
+
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    assert reopened.passwords == safe.passwords
+    assert len(reopened.retrieve_password("test.com")) == 2
+    assert reopened.retrieve_password("other.com") == []
+
+
+def test_journal_ignores_torn_tail(vault_path):
+    """A partially written record at the end of the journal is skipped."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("test.com", "user1", "Test@123")
+    with open(safe.journal_file, "a") as f:
+        f.write("not-a-complete-rec")
+
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    assert reopened.retrieve_password("test.com") == [
+        {"username": "user1", "password": "Test@123"}
+    ]
+    # The next append replaces the torn record instead of being glued onto it
+    reopened.store_password("next.com", "user1", "Test@456")
+    assert SecureSafe("TestMasterKey", file=vault_path).retrieve_password(
+        "next.com"
+    ) == [{"username": "user1", "password": "Test@456"}]
+
+
+def test_journal_compacts_past_limit(vault_path):
+    """The journal is folded into a snapshot once it exceeds the size limit."""
+    safe = SecureSafe("TestMasterKey", file=vault_path, journal_limit=200)
+    for i in range(5):
+        safe.store_password(f"site{i}.com", "user", "Test@123")
+
+    assert os.path.exists(vault_path)
+    if os.path.exists(safe.journal_file):
+        assert os.path.getsize(safe.journal_file) <= 200
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    assert reopened.passwords == safe.passwords
+
+
+def test_journal_disabled_saves_snapshot(vault_path):
+    """With the journal disabled every change rewrites the snapshot."""
+    safe = SecureSafe("TestMasterKey", file=vault_path, journal_limit=None)
+    safe.store_password("test.com", "user1", "Test@123")
+
+    assert os.path.exists(vault_path)
+    assert not os.path.exists(safe.journal_file)
+
+
+def test_save_reencrypts_only_dirty_websites(vault_path):
+    """Unchanged websites keep their ciphertext; only touched ones are re-encrypted."""
+    safe = SecureSafe("TestMasterKey", file=vault_path, journal_limit=None)
+    for i in range(10):
+        safe.store_password(f"site{i}.com", "user", "Test@123")
+    before = dict(safe.ciphertexts)
+
+    with patch.object(safe, "encrypt", wraps=safe.encrypt) as encrypt:
+        safe.store_password("site3.com", "user2", "Pass@456")
+        safe.delete_password("site7.com", "user", "Test@123")
+
+    assert encrypt.call_count == 1
+    assert "site7.com" not in safe.ciphertexts
+    assert safe.ciphertexts["site3.com"] != before["site3.com"]
+    assert all(
+        safe.ciphertexts[k] == before[k]
+        for k in before
+        if k not in {"site3.com", "site7.com"}
+    )
+
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    assert reopened.passwords == safe.passwords
+
+
+def test_compaction_reencrypts_only_journaled_websites(vault_path):
+    """Compacting the journal re-encrypts just the websites it touched."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    for i in range(10):
+        safe.store_password(f"site{i}.com", "user", "Test@123")
+    safe.compact()
+
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    reopened.store_password("site1.com", "user2", "Pass@456")
+    with patch.object(reopened, "encrypt", wraps=reopened.encrypt) as encrypt:
+        reopened.compact()
+
+    assert encrypt.call_count == 1
+
+
+@pytest.fixture
+def populated_vault(vault_path):
+    """A saved vault with ten websites, one entry each."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    for i in range(10):
+        safe.store_password(f"site{i}.com", "user", f"Pass{i}")
+    safe.compact()
+    return vault_path
+
+
+def test_lazy_load_decrypts_nothing(populated_vault):
+    """Opening a vault lazily keeps only the ciphertext map."""
+    with patch.object(SecureSafe, "decrypt", autospec=True) as decrypt:
+        safe = SecureSafe("TestMasterKey", file=populated_vault, lazy=True)
+        assert len(safe.passwords) == 10
+        assert "site3.com" in safe.passwords
+
+    decrypt.assert_not_called()
+
+
+def test_lazy_retrieve_decrypts_once(populated_vault):
+    """A website is decrypted on first access and then served from the cache."""
+    safe = SecureSafe("TestMasterKey", file=populated_vault, lazy=True)
+    with patch.object(safe, "decrypt", wraps=safe.decrypt) as decrypt:
+        assert safe.retrieve_password("site3.com") == [
+            {"username": "user", "password": "Pass3"}
+        ]
+        safe.retrieve_password("site3.com")
+
+    assert decrypt.call_count == 1
+    assert safe.retrieve_password("missing.com") == []
+
+
+def test_lazy_cache_evicts_and_wipes(populated_vault):
+    """The LRU is bounded and evicted entries are cleared."""
+    safe = SecureSafe("TestMasterKey", file=populated_vault, lazy=True, cache_size=2)
+    first = safe.passwords["site0.com"]
+    safe.retrieve_password("site1.com")
+    safe.retrieve_password("site2.com")
+
+    assert list(safe.passwords.cache) == ["site1.com", "site2.com"]
+    assert first == []
+    assert safe.retrieve_password("site0.com")[0]["password"] == "Pass0"
+
+
+def test_lazy_cache_expires(populated_vault):
+    """Entries older than the TTL are evicted on the next access."""
+    safe = SecureSafe("TestMasterKey", file=populated_vault, lazy=True, cache_ttl=60)
+    safe.retrieve_password("site0.com")
+    with patch("secure_safe.time.monotonic", return_value=time.monotonic() + 61):
+        safe.retrieve_password("site1.com")
+
+    assert list(safe.passwords.cache) == ["site1.com"]
+
+
+def test_lazy_changes_survive_eviction(populated_vault):
+    """Changed websites stay pinned until saved even with a tiny cache."""
+    safe = SecureSafe("TestMasterKey", file=populated_vault, lazy=True, cache_size=1)
+    safe.store_password("site0.com", "user2", "New0")
+    safe.delete_password("site1.com", "user", "Pass1")
+    for i in range(2, 10):
+        safe.retrieve_password(f"site{i}.com")
+    safe.compact()
+
+    reopened = SecureSafe("TestMasterKey", file=populated_vault)
+    assert len(reopened.retrieve_password("site0.com")) == 2
+    assert "site1.com" not in reopened.passwords
+    assert len(reopened.passwords) == 9
+
+
+def test_lazy_delete_keeps_other_entries(vault_path):
+    """Deleting one of a cached website's entries leaves the others intact."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("a.com", "u1", "p1")
+    safe.store_password("a.com", "u2", "p2")
+    safe.compact()
+
+    lazy = SecureSafe("TestMasterKey", file=vault_path, lazy=True)
+    lazy.delete_password("a.com", "u1", "p1")
+    expected = [{"username": "u2", "password": "p2"}]
+    assert lazy.retrieve_password("a.com") == expected
+    assert SecureSafe("TestMasterKey", file=vault_path).retrieve_password("a.com") == (
+        expected
+    )
+
+
+def test_store_many_saves_once(vault_path):
+    """Bulk stores are committed with one snapshot write and no journal."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    items = [(f"site{i}.com", "user", f"Pass{i}") for i in range(100)]
+    with patch.object(safe, "save_passwords", wraps=safe.save_passwords) as save:
+        safe.store_many(items)
+
+    assert save.call_count == 1
+    assert not os.path.exists(safe.journal_file)
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    assert len(reopened.passwords) == 100
+
+
+def test_delete_many(vault_path):
+    """Bulk deletes remove every listed entry."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    items = [(f"site{i}.com", "user", f"Pass{i}") for i in range(10)]
+    safe.store_many(items)
+    safe.delete_many(items[:7])
+
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    assert sorted(reopened.passwords) == ["site7.com", "site8.com", "site9.com"]
+
+
+def test_batch_rolls_back_on_error(populated_vault):
+    """An exception inside a batch discards all of its changes."""
+    safe = SecureSafe("TestMasterKey", file=populated_vault)
+    before = copy.deepcopy(safe.passwords)
+    with open(populated_vault) as f:
+        on_disk = f.read()
+
+    with pytest.raises(RuntimeError):
+        with safe.batch():
+            safe.store_password("site0.com", "user2", "New0")
+            safe.store_password("new.com", "user", "Pass")
+            safe.delete_password("site1.com", "user", "Pass1")
+            raise RuntimeError("abort")
+
+    assert safe.passwords == before
+    with open(populated_vault) as f:
+        assert f.read() == on_disk
+    assert not os.path.exists(safe.journal_file)
+
+
+def test_nested_batches_commit_once(vault_path):
+    """Only the outermost batch writes to disk."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    with safe.batch():
+        safe.store_password("a.com", "user", "Pass")
+        with safe.batch():
+            safe.store_password("b.com", "user", "Pass")
+        assert not os.path.exists(vault_path)
+
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    assert sorted(reopened.passwords) == ["a.com", "b.com"]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parallel_matches_serial(vault_path, executor):
+    """Pooled encryption and decryption produce the same vault as the serial path."""
+    items = [(f"site{i}.com", f"user{i}", f"Pass{i}") for i in range(300)]
+    options = dict(workers=4, executor=executor, chunk_size=16, parallel_threshold=100)
+    safe = SecureSafe("TestMasterKey", file=vault_path, **options)
+    safe.store_many(items)
+
+    serial = SecureSafe("TestMasterKey", file=vault_path)
+    parallel = SecureSafe("TestMasterKey", file=vault_path, **options)
+    assert parallel.passwords == serial.passwords == safe.passwords
+    assert list(parallel.passwords) == list(serial.passwords)
+
+
+def test_parallel_threshold_stays_serial(vault_path):
+    """Vaults below the threshold never start a pool."""
+    safe = SecureSafe("TestMasterKey", file=vault_path, workers=4)
+    with patch.object(safe, "map_chunks") as map_chunks:
+        safe.store_many([(f"site{i}.com", "user", "Pass") for i in range(10)])
+
+    map_chunks.assert_not_called()
+
+
+def test_kdf_settings_stored_in_header(vault_path):
+    """New vaults record their salt and KDF cost alongside the entries."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("test.com", "user1", "Test@123")
+
+    with open(vault_path) as f:
+        data = json.load(f)
+    assert data["version"] == 2
+    assert data["kdf"]["name"] == "scrypt"
+    assert data["kdf"]["n"] == DEFAULT_KDF["n"]
+    assert len(base64.b64decode(data["kdf"]["salt"])) == 16
+    assert list(data["entries"]) == ["test.com"]
+    assert len(safe.key) == 32
+
+
+def test_key_derivation_is_cached(vault_path):
+    """Reopening a vault in the same process does not derive the key again."""
+    SecureSafe("TestMasterKey", file=vault_path).store_password("a.com", "u", "p")
+
+    with patch("secure_safe.scrypt") as kdf:
+        reopened = SecureSafe("TestMasterKey", file=vault_path)
+
+    kdf.assert_not_called()
+    assert reopened.retrieve_password("a.com")[0]["password"] == "p"
+
+
+def test_pbkdf2_vault(vault_path):
+    """PBKDF2 settings are honoured and persisted."""
+    kdf = {"name": "pbkdf2", "iterations": 1000}
+    safe = SecureSafe("TestMasterKey", file=vault_path, kdf=kdf)
+    safe.store_password("test.com", "user1", "Test@123")
+
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    assert reopened.meta["kdf"]["name"] == "pbkdf2"
+    assert reopened.passwords == safe.passwords
+
+
+def test_legacy_vault_is_upgraded(vault_path):
+    """Vaults keyed by the old padded password are re-keyed on open."""
+    legacy = worker_safe({"key": legacy_key("TestMasterKey"), "binary": False})
+    with open(vault_path, "w") as f:
+        json.dump(
+            {"old.com": legacy.encrypt_entries([{"username": "u", "password": "p"}])}, f
+        )
+    with open(vault_path + ".journal", "w") as f:
+        record = {
+            "website": "new.com",
+            "entries": [{"username": "u2", "password": "p2"}],
+        }
+        f.write(legacy.encrypt(json.dumps(record)) + "\n")
+
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+
+    assert sorted(safe.passwords) == ["new.com", "old.com"]
+    assert safe.key != legacy.key
+    assert not os.path.exists(vault_path + ".journal")
+    with open(vault_path) as f:
+        assert "kdf" in json.load(f)
+    assert SecureSafe("TestMasterKey", file=vault_path).passwords == safe.passwords
+
+
+def test_change_kdf_rekeys_lazy_vault(populated_vault):
+    """change_kdf re-encrypts every website, including ones never accessed."""
+    safe = SecureSafe("TestMasterKey", file=populated_vault, lazy=True)
+    old_key = safe.key
+    safe.change_kdf("TestMasterKey", {"name": "pbkdf2", "iterations": 1000})
+
+    assert safe.key != old_key
+    reopened = SecureSafe("TestMasterKey", file=populated_vault)
+    assert len(reopened.passwords) == 10
+    assert reopened.retrieve_password("site5.com")[0]["password"] == "Pass5"
+
+
+@pytest.mark.parametrize("name", ["scrypt", "pbkdf2"])
+def test_calibrate(name):
+    """Calibration returns usable settings of the requested KDF."""
+    kdf = calibrate(0.01, name)
+
+    assert kdf["name"] == name
+    assert kdf_cost(kdf)
+
+
+def test_other_safe_sees_journaled_change_without_reload(vault_path):
+    """A second safe replays just the new journal tail instead of reloading."""
+    first = SecureSafe("TestMasterKey", file=vault_path)
+    first.store_password("a.com", "user", "Pass1")
+    second = SecureSafe("TestMasterKey", file=vault_path)
+
+    first.store_password("b.com", "user", "Pass2")
+    with patch.object(second, "load_passwords") as reload:
+        assert second.retrieve_password("b.com") == [
+            {"username": "user", "password": "Pass2"}
+        ]
+    reload.assert_not_called()
+
+
+def test_other_safe_reloads_after_save(vault_path):
+    """A rewritten snapshot is read again, and unchanged files are not."""
+    first = SecureSafe("TestMasterKey", file=vault_path)
+    first.store_password("a.com", "user", "Pass1")
+    second = SecureSafe("TestMasterKey", file=vault_path)
+
+    with patch.object(second, "read_vault", wraps=second.read_vault) as read:
+        second.retrieve_password("a.com")
+        assert read.call_count == 0
+        first.store_password("b.com", "user", "Pass2")
+        first.compact()
+        assert second.retrieve_password("b.com")[0]["password"] == "Pass2"
+        assert read.call_count == 1
+
+
+def test_writers_do_not_clobber_each_other(vault_path):
+    """Interleaved writers each build on the other's saved changes."""
+    first = SecureSafe("TestMasterKey", file=vault_path, journal_limit=None)
+    first.store_password("a.com", "user", "Pass1")
+    second = SecureSafe("TestMasterKey", file=vault_path, journal_limit=None)
+
+    first.store_password("b.com", "user", "Pass2")
+    second.store_password("c.com", "user", "Pass3")
+    first.delete_password("a.com", "user", "Pass1")
+
+    assert sorted(SecureSafe("TestMasterKey", file=vault_path).passwords) == [
+        "b.com",
+        "c.com",
+    ]
+
+
+def test_concurrent_processes_keep_every_store(vault_path):
+    """Processes writing to one vault at once lose no entries."""
+    SecureSafe("TestMasterKey", file=vault_path).store_password("seed.com", "u", "p")
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1]);"
+        "from secure_safe import SecureSafe;"
+        "safe = SecureSafe('TestMasterKey', file=sys.argv[2], journal_limit=2048);"
+        "[safe.store_password(f'site{i}.com', sys.argv[3], 'p') for i in range(15)]"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    workers = [
+        subprocess.Popen([sys.executable, "-c", script, root, vault_path, f"user{n}"])
+        for n in range(4)
+    ]
+    assert [worker.wait() for worker in workers] == [0] * 4
+
+    passwords = SecureSafe("TestMasterKey", file=vault_path).passwords
+    assert sum(len(entries) for entries in passwords.values()) == 61
+
+
+def test_rekeyed_elsewhere_raises(vault_path):
+    """A safe refuses to reuse its key after another process re-keyed the vault."""
+    first = SecureSafe("TestMasterKey", file=vault_path)
+    first.store_password("a.com", "user", "Pass1")
+    second = SecureSafe("TestMasterKey", file=vault_path)
+    first.change_kdf("NewMasterKey")
+
+    with pytest.raises(ValueError):
+        second.store_password("b.com", "user", "Pass2")
+
+
+def test_entries_are_compact_records(vault_path):
+    """Stored entries are slotted records carrying timestamps."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    with patch("secure_safe.time.time", return_value=1700000000.5):
+        safe.store_password("a.com", "user", "Pass1", tags=["work"])
+
+    entry = safe.passwords["a.com"][0]
+    assert isinstance(entry, Entry)
+    assert not hasattr(entry, "__dict__")
+    assert (entry.created, entry.updated) == (1700000000, 1700000000)
+    assert entry["username"] == "user"
+    assert entry.get("tags") == ["work"]
+    assert entry.get("missing") is None
+
+
+def test_retrieve_keeps_dict_shape(vault_path):
+    """retrieve_password hands out plain dicts without the timestamps."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("a.com", "user", "Pass1")
+    safe.store_password("a.com", "user2", "Pass2", tags=["work"])
+
+    for opened in (safe, SecureSafe("TestMasterKey", file=vault_path)):
+        assert opened.retrieve_password("a.com") == [
+            {"username": "user", "password": "Pass1"},
+            {"username": "user2", "password": "Pass2", "tags": ["work"]},
+        ]
+
+
+def test_timestamps_and_interning_survive_reload(vault_path):
+    """Timestamps are persisted and equal usernames share one string."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_many([(f"site{i}.com", "shared@example.com", f"P{i}") for i in range(3)])
+    created = safe.passwords["site0.com"][0].created
+
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    entries = [reopened.passwords[f"site{i}.com"][0] for i in range(3)]
+    assert entries[0].created == created
+    assert entries[0].username is entries[1].username is entries[2].username
+
+
+def test_entries_without_timestamps_load(vault_path):
+    """Entries written before timestamps existed load with created=None."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.passwords["old.com"] = [{"username": "user", "password": "Pass"}]
+    safe.save_passwords()
+
+    entry = SecureSafe("TestMasterKey", file=vault_path).passwords["old.com"][0]
+    assert entry == {"username": "user", "password": "Pass"}
+    assert entry.created is None
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def test_new_vaults_use_authenticated_records(vault_path):
+    """New vaults record their cipher and seal each website with a tag."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("a.com", "user", "Pass1")
+
+    data = read_json(vault_path)
+    assert data["cipher"] == CIPHER_XCHACHA
+    blob = base64.b64decode(data["entries"]["a.com"])
+    assert (
+        len(blob) == 24 + len(json.dumps(safe.passwords["a.com"][0].to_json())) + 2 + 16
+    )
+
+
+def test_tampered_record_raises_instead_of_wiping(vault_path):
+    """A flipped ciphertext bit is reported and the vault file is left alone."""
+    SecureSafe("TestMasterKey", file=vault_path).store_many(
+        [("a.com", "user", "Pass1"), ("b.com", "user", "Pass2")]
+    )
+    data = read_json(vault_path)
+    blob = bytearray(base64.b64decode(data["entries"]["a.com"]))
+    blob[30] ^= 1
+    data["entries"]["a.com"] = base64.b64encode(blob).decode()
+    write_json(vault_path, data)
+
+    with pytest.raises(ValueError, match="tampered"):
+        SecureSafe("TestMasterKey", file=vault_path)
+    assert read_json(vault_path) == data
+
+
+def test_swapped_records_fail_authentication(vault_path):
+    """A ciphertext moved to another website does not decrypt there."""
+    SecureSafe("TestMasterKey", file=vault_path).store_many(
+        [("a.com", "user", "Pass1"), ("b.com", "user", "Pass2")]
+    )
+    data = read_json(vault_path)
+    entries = data["entries"]
+    entries["a.com"], entries["b.com"] = entries["b.com"], entries["a.com"]
+    write_json(vault_path, data)
+
+    with pytest.raises(ValueError):
+        SecureSafe("TestMasterKey", file=vault_path)
+    with pytest.raises(ValueError):
+        SecureSafe("TestMasterKey", file=vault_path, lazy=True).retrieve_password(
+            "a.com"
+        )
+
+
+def test_wrong_master_password_raises(vault_path):
+    SecureSafe("TestMasterKey", file=vault_path).store_password("a.com", "u", "p")
+
+    with pytest.raises(ValueError):
+        SecureSafe("WrongMasterKey", file=vault_path)
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_wrong_master_password_is_caught_before_writing(vault_path, lazy):
+    """Lazy and empty vaults decrypt nothing on open but still reject a wrong key."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("a.com", "u", "p")
+    with pytest.raises(ValueError, match="wrong master password"):
+        SecureSafe("WrongMasterKey", file=vault_path, lazy=lazy)
+
+    safe.delete_password("a.com", "u", "p")
+    safe.compact()
+    with pytest.raises(ValueError, match="wrong master password"):
+        SecureSafe("WrongMasterKey", file=vault_path, lazy=lazy)
+    assert not os.path.exists(vault_path + ".journal")
+
+
+def test_vault_without_key_check_gets_one(vault_path):
+    """Vaults saved before the key check are verified by a record, then recorded."""
+    SecureSafe("TestMasterKey", file=vault_path).store_password("a.com", "u", "p")
+    data = read_json(vault_path)
+    del data["check"]
+    write_json(vault_path, data)
+
+    with pytest.raises(ValueError, match="wrong master password"):
+        SecureSafe("WrongMasterKey", file=vault_path, lazy=True)
+    SecureSafe("TestMasterKey", file=vault_path, lazy=True).compact()
+    assert "check" in read_json(vault_path)
+
+
+def test_tampered_journal_record_raises(vault_path):
+    """Only an unterminated last line counts as a torn write."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("a.com", "user", "Pass1")
+    safe.store_password("b.com", "user", "Pass2")
+    safe.store_password("c.com", "user", "Pass3")
+    with open(vault_path + ".journal") as f:
+        lines = f.readlines()
+    lines[0] = lines[0][:10] + ("A" if lines[0][10] != "A" else "B") + lines[0][11:]
+    with open(vault_path + ".journal", "w") as f:
+        f.writelines(lines)
+
+    with pytest.raises(ValueError, match="journal"):
+        SecureSafe("TestMasterKey", file=vault_path)
+
+
+def test_crash_mid_append_stays_recoverable(vault_path):
+    """Strict journal checks still let a vault recover from an append cut short."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("a.com", "user", "Pass1")
+    safe.store_password("b.com", "user", "Pass2")
+    os.truncate(safe.journal_file, os.path.getsize(safe.journal_file) - 10)
+
+    lazy = SecureSafe("TestMasterKey", file=vault_path, lazy=True)
+    assert sorted(lazy.passwords) == ["a.com"]
+    lazy.store_password("c.com", "user", "Pass3")
+    assert sorted(SecureSafe("TestMasterKey", file=vault_path).passwords) == [
+        "a.com",
+        "c.com",
+    ]
+
+
+def test_cbc_vault_is_upgraded(vault_path):
+    """Vaults written before authenticated encryption are re-encrypted on open."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(5)])
+    # Rewrite it the way older versions did: CBC records and no cipher field
+    del safe.meta["cipher"]
+    safe.cipher = CIPHER_CBC
+    safe.mark_all_dirty()
+    safe.save_passwords()
+    assert "cipher" not in read_json(vault_path)
+
+    upgraded = SecureSafe("TestMasterKey", file=vault_path, lazy=True)
+
+    assert upgraded.cipher == CIPHER_XCHACHA
+    assert read_json(vault_path)["cipher"] == CIPHER_XCHACHA
+    assert SecureSafe("TestMasterKey", file=vault_path).passwords == safe.passwords
+
+
+def test_stream_vault(vault_path):
+    """A stream vault is one ciphertext, replays its journal and opens lazily."""
+    safe = SecureSafe("TestMasterKey", file=vault_path, stream=True)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(20)])
+    safe.store_password("site0.com", "user2", "New0")
+    safe.delete_password("site1.com", "user", "Pass1")
+
+    assert isinstance(read_json(vault_path)["entries"], str)
+    reopened = SecureSafe("TestMasterKey", file=vault_path, lazy=True)
+    assert reopened.stream and not reopened.lazy
+    assert reopened.passwords == safe.passwords
+    reopened.compact()
+    assert SecureSafe("TestMasterKey", file=vault_path).passwords == safe.passwords
+
+
+def test_switching_stream_mode(vault_path):
+    """stream=True or False converts an existing vault on open."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(5)])
+
+    SecureSafe("TestMasterKey", file=vault_path, lazy=True, stream=True)
+    assert isinstance(read_json(vault_path)["entries"], str)
+
+    records = SecureSafe("TestMasterKey", file=vault_path, stream=False)
+    assert not records.stream
+    assert sorted(read_json(vault_path)["entries"]) == sorted(safe.passwords)
+    assert records.passwords == safe.passwords
+
+
+def test_stream_requires_json_vault(tmp_path):
+    with pytest.raises(ValueError):
+        SecureSafe("TestMasterKey", file=str(tmp_path / "vault.ssv"), stream=True)
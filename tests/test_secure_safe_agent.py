@@ -0,0 +1,100 @@
+import os
+import pytest
+import threading
+from secure_safe import SecureSafe, derive_cached
+from secure_safe_agent import AgentClient, AgentServer
+
+
+@pytest.fixture
+def agent(tmp_path):
+    """Serves a fresh vault from a background thread for the duration of a test."""
+    safe = SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+    server = AgentServer(safe, str(tmp_path / "agent.sock"), idle_timeout=None)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join(5)
+
+
+def test_store_get_delete(agent):
+    """Requests are served from the unlocked vault and persisted."""
+    client = AgentClient(agent.socket_path)
+    client.store("test.com", "user1", "Test@123")
+    client.store("test.com", "user2", "Pass@456")
+    client.delete("test.com", "user1", "Test@123")
+
+    assert client.ping() == "pong"
+    assert client.get("test.com") == [{"username": "user2", "password": "Pass@456"}]
+    assert client.list() == ["test.com"]
+    reopened = SecureSafe("TestMasterKey", file=agent.safe.file)
+    assert reopened.passwords == agent.safe.passwords
+    client.close()
+
+
+def test_list_sees_other_processes_changes(agent):
+    client = AgentClient(agent.socket_path)
+    client.store("a.com", "user", "p")
+    SecureSafe("TestMasterKey", file=agent.safe.file).store_password("b.com", "u", "p")
+
+    assert client.list() == ["a.com", "b.com"]
+    client.close()
+
+
+def test_generate(agent):
+    """Password generation is served without touching the vault."""
+    client = AgentClient(agent.socket_path)
+
+    assert len(client.generate(20)) == 20
+    client.close()
+
+
+def test_unknown_operation_reports_error(agent):
+    """Errors come back to the client instead of killing the connection."""
+    client = AgentClient(agent.socket_path)
+    with pytest.raises(RuntimeError):
+        client.call("explode")
+
+    assert client.ping() == "pong"
+    client.close()
+
+
+def test_concurrent_clients(agent):
+    """Writes from many clients at once are serialized and all persisted."""
+
+    def worker(number):
+        client = AgentClient(agent.socket_path)
+        for i in range(20):
+            client.store(f"site{i}.com", f"user{number}", f"Pass{number}-{i}")
+        client.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reopened = SecureSafe("TestMasterKey", file=agent.safe.file)
+    assert len(reopened.passwords) == 20
+    assert all(len(entries) == 5 for entries in reopened.passwords.values())
+
+
+def test_socket_is_private(agent):
+    """Only the owner can open the socket."""
+    assert os.stat(agent.socket_path).st_mode & 0o777 == 0o600
+
+
+def test_idle_timeout_locks_vault(tmp_path):
+    """An idle agent stops, removes its socket and forgets the vault."""
+    safe = SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+    safe.store_password("test.com", "user1", "Test@123")
+    server = AgentServer(safe, str(tmp_path / "agent.sock"), idle_timeout=0.2)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert not os.path.exists(server.socket_path)
+    assert safe.passwords == {}
+    assert safe.key is None
+    assert derive_cached.cache_info().currsize == 0
@@ -0,0 +1,210 @@
+import io
+import os
+import sys
+import json
+import time
+import pytest
+import threading
+import subprocess
+from secure_safe import SecureSafe, menu
+from secure_safe_agent import AgentServer
+from secure_safe_cli import AGENT_ENV, PASSWORD_ENV, main
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "secure_safe_cli.py")
+
+
+@pytest.fixture
+def vault_path(tmp_path, monkeypatch):
+    """A fresh vault path, with the master password supplied through the environment."""
+    monkeypatch.setenv(PASSWORD_ENV, "TestMasterKey")
+    monkeypatch.delenv(AGENT_ENV, raising=False)
+    return str(tmp_path / "passwords.json")
+
+
+def run(capsys, *argv):
+    """Runs the CLI in-process; returns (exit status, parsed JSON output)."""
+    status = main(list(argv))
+    out = capsys.readouterr().out
+    return status, json.loads(out) if out else None
+
+
+def test_put_get_ls_rm(vault_path, capsys):
+    """Entries round-trip through the subcommands as JSON."""
+    assert run(capsys, "--file", vault_path, "put", "a.com", "alice", "p1") == (
+        0,
+        {"website": "a.com", "username": "alice"},
+    )
+    status, generated = run(
+        capsys, "--file", vault_path, "put", "a.com", "bob", "--length", "24"
+    )
+    assert status == 0 and len(generated["password"]) == 24
+    run(capsys, "--file", vault_path, "put", "b.org", "carol", "p3")
+
+    assert run(capsys, "--file", vault_path, "get", "a.com")[1] == [
+        {"username": "alice", "password": "p1"},
+        {"username": "bob", "password": generated["password"]},
+    ]
+    assert run(capsys, "--file", vault_path, "ls") == (0, ["a.com", "b.org"])
+    assert run(capsys, "--file", vault_path, "ls", "b")[1] == ["b.org"]
+
+    assert run(capsys, "--file", vault_path, "rm", "a.com", "alice") == (
+        0,
+        {"removed": 1},
+    )
+    assert run(capsys, "--file", vault_path, "rm", "a.com", "alice")[0] == 1
+    assert run(capsys, "--file", vault_path, "rm", "b.org") == (0, {"removed": 1})
+    assert SecureSafe("TestMasterKey", file=vault_path).passwords == {
+        "a.com": [{"username": "bob", "password": generated["password"]}]
+    }
+
+
+def test_get_missing_exits_nonzero(vault_path, capsys):
+    assert run(capsys, "--file", vault_path, "get", "nowhere.com") == (1, [])
+
+
+def test_password_from_stdin(vault_path, capsys, monkeypatch):
+    """The master password and then the entry password are read as stdin lines."""
+    monkeypatch.delenv(PASSWORD_ENV)
+    monkeypatch.setattr(sys, "stdin", io.StringIO("TestMasterKey\nsecret\n"))
+    run(capsys, "--file", vault_path, "--password-stdin", "put", "a.com", "u", "-")
+
+    assert SecureSafe("TestMasterKey", file=vault_path).retrieve_password("a.com") == [
+        {"username": "u", "password": "secret"}
+    ]
+
+
+def test_password_from_fd(vault_path, capsys, monkeypatch):
+    monkeypatch.delenv(PASSWORD_ENV)
+    SecureSafe("TestMasterKey", file=vault_path).store_password("a.com", "u", "p")
+    read_end, write_end = os.pipe()
+    os.write(write_end, b"TestMasterKey\n")
+    os.close(write_end)
+    try:
+        status, entries = run(
+            capsys, "--file", vault_path, "--password-fd", str(read_end), "get", "a.com"
+        )
+    finally:
+        os.close(read_end)
+
+    assert entries == [{"username": "u", "password": "p"}]
+
+
+def test_wrong_password_reports_json_error(vault_path, capsys, monkeypatch):
+    SecureSafe("TestMasterKey", file=vault_path).store_password("a.com", "u", "p")
+    monkeypatch.setenv(PASSWORD_ENV, "WrongKey")
+
+    assert main(["--file", vault_path, "get", "a.com"]) == 1
+    assert "error" in json.loads(capsys.readouterr().err)
+
+
+def test_import_export(vault_path, tmp_path, capsys):
+    source = tmp_path / "in.csv"
+    source.write_text("url,username,password\nhttps://a.com/login,alice,p1\n")
+    assert run(capsys, "--file", vault_path, "import", str(source))[1]["imported"] == 1
+
+    target = str(tmp_path / "out.csv")
+    assert run(capsys, "--file", vault_path, "export", target) == (0, {"exported": 1})
+    assert "a.com,alice,p1" in open(target).read()
+
+
+def test_gen(capsys):
+    status, passwords = run(
+        capsys, "gen", "--count", "3", "--length", "20", "--no-symbols"
+    )
+    assert status == 0 and len(passwords) == 3
+    assert all(len(p) == 20 and p.isalnum() for p in passwords)
+
+
+def test_commands_go_through_running_agent(tmp_path, capsys, monkeypatch):
+    """With an agent advertised and no --file, no master password is needed."""
+    safe = SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+    server = AgentServer(safe, str(tmp_path / "agent.sock"), idle_timeout=None)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    monkeypatch.delenv(PASSWORD_ENV, raising=False)
+    monkeypatch.setenv(AGENT_ENV, server.socket_path)
+    try:
+        run(capsys, "put", "a.com", "u", "p")
+        assert run(capsys, "ls") == (0, ["a.com"])
+        assert run(capsys, "rm", "a.com") == (0, {"removed": 1})
+    finally:
+        server.shutdown()
+        thread.join(5)
+
+    assert safe.passwords == {}
+
+
+def best_time(argv, runs=5):
+    """Fastest wall time of ``runs`` fresh interpreters running ``argv``."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *argv], cwd=ROOT, stdout=subprocess.DEVNULL, check=True
+        )
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_gen_and_help_start_fast():
+    """gen and --help add well under 50 ms on top of a bare interpreter."""
+    baseline = best_time(["-c", "pass"])
+    for argv in ([CLI, "gen"], [CLI, "--help"]):
+        assert best_time(argv) - baseline < 0.05, argv
+
+
+def test_gen_skips_heavy_imports():
+    code = (
+        "import sys, secure_safe_cli;"
+        "secure_safe_cli.main(['gen']);"
+        "print(sorted({'Crypto', 'secure_safe', 'tkinter', 'pyperclip',"
+        " 'concurrent.futures'} & set(sys.modules)))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True
+    ).stdout
+    assert out.splitlines()[-1] == "[]"
+
+
+def test_menu_store_and_delete(vault_path, monkeypatch):
+    """The interactive menu passes the username and password it asks for."""
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+
+    def answer(*answers):
+        answers = iter(answers)
+        monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+
+    answer("1", "a.com", "alice", "p1", "5")
+    menu(safe)
+    assert safe.retrieve_password("a.com") == [{"username": "alice", "password": "p1"}]
+
+    answer("3", "a.com", "alice", "p1", "5")
+    menu(safe)
+    assert safe.passwords == {}
+
+
+def test_sync(vault_path, tmp_path, capsys):
+    other = str(tmp_path / "other.json")
+    SecureSafe("TestMasterKey", file=vault_path).store_password("a.com", "u", "p")
+    SecureSafe("TestMasterKey", file=other).store_password("b.com", "u", "p")
+
+    status, report = run(capsys, "--file", vault_path, "sync", other)
+    assert status == 0
+    assert (report["pulled"], report["pushed"]) == (["b.com"], ["a.com"])
+    assert run(capsys, "--file", other, "ls")[1] == ["a.com", "b.com"]
+
+
+def test_migrate_to_sqlite(vault_path, tmp_path, capsys):
+    SecureSafe("TestMasterKey", file=vault_path).store_many(
+        [("a.com", "u", "p1"), ("b.com", "u", "p2")]
+    )
+    target = str(tmp_path / "vault.db")
+
+    assert run(capsys, "--file", vault_path, "migrate", target) == (
+        0,
+        {"migrated": 2, "destination": target},
+    )
+    assert run(capsys, "--file", target, "get", "b.com")[1] == [
+        {"username": "u", "password": "p2"}
+    ]
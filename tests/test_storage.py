@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import threading
+import pytest
+from unittest.mock import patch
+from secure_safe import SecureSafe
+from vault_format import (
+    BinaryVault,
+    JsonVault,
+    ShardedVault,
+    SqliteVault,
+    convert_vault,
+    is_sqlite_vault,
+    storage_class,
+)
+
+FAST_KDF = {"name": "pbkdf2", "iterations": 1000}
+BACKENDS = {
+    "passwords.json": JsonVault,
+    "vault.ssv": BinaryVault,
+    "vault.shards": ShardedVault,
+    "vault.db": SqliteVault,
+}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def vault_path(request, tmp_path):
+    """A fresh vault path for each storage backend, chosen by extension."""
+    return str(tmp_path / request.param)
+
+
+def open_safe(path, **options):
+    return SecureSafe("TestMasterKey", file=path, kdf=FAST_KDF, **options)
+
+
+def test_backend_follows_extension(vault_path):
+    assert storage_class(vault_path) is BACKENDS[os.path.basename(vault_path)]
+    open_safe(vault_path).store_password("a.com", "u", "p")
+    assert storage_class(vault_path) is BACKENDS[os.path.basename(vault_path)]
+
+
+def test_round_trip(vault_path):
+    """Stores, deletes, journal replay and re-keying behave alike on every backend."""
+    safe = open_safe(vault_path)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(30)])
+    safe.store_password("site0.com", "user2", "New0")
+    safe.delete_password("site1.com", "user", "Pass1")
+
+    reopened = open_safe(vault_path)
+    assert reopened.passwords == safe.passwords
+    assert "site1.com" not in reopened.passwords
+    reopened.compact()
+    reopened.change_kdf("NewMasterKey", FAST_KDF)
+    rekeyed = SecureSafe("NewMasterKey", file=vault_path, kdf=FAST_KDF)
+    assert rekeyed.passwords == safe.passwords
+
+
+def test_lazy_reads_one_record(vault_path):
+    open_safe(vault_path).store_many(
+        [(f"site{i}.com", "user", f"Pass{i}") for i in range(20)]
+    )
+    lazy = open_safe(vault_path, lazy=True)
+    with patch.object(lazy, "decrypt_bytes", wraps=lazy.decrypt_bytes) as decrypt:
+        assert lazy.retrieve_password("site4.com")[0]["password"] == "Pass4"
+    assert decrypt.call_count == 1
+
+
+def test_other_processes_changes_are_seen(vault_path):
+    safe = open_safe(vault_path, lazy=True)
+    safe.store_password("a.com", "u", "p")
+    open_safe(vault_path).store_password("b.com", "u", "p")
+
+    assert safe.retrieve_password("b.com") == [{"username": "u", "password": "p"}]
+
+
+def test_failed_batch_rolls_back(vault_path):
+    safe = open_safe(vault_path)
+    safe.store_password("a.com", "u", "p")
+    with pytest.raises(RuntimeError):
+        with safe.batch():
+            safe.store_password("b.com", "u", "p")
+            raise RuntimeError
+
+    assert sorted(open_safe(vault_path).passwords) == ["a.com"]
+
+
+@pytest.mark.parametrize("target", sorted(BACKENDS))
+def test_convert_between_backends(vault_path, tmp_path, target):
+    """Any backend migrates to any other without the key."""
+    destination = str(tmp_path / "converted" / target)
+    os.mkdir(os.path.dirname(destination))
+    safe = open_safe(vault_path)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(20)])
+    safe.compact()
+
+    convert_vault(vault_path, destination)
+    assert open_safe(destination).passwords == safe.passwords
+    with pytest.raises(FileExistsError):
+        convert_vault(vault_path, destination)
+
+
+def test_sqlite_store_writes_one_row(tmp_path):
+    """SQLite vaults skip the journal and commit just the changed row."""
+    path = str(tmp_path / "vault.db")
+    safe = open_safe(path)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(50)])
+    with patch.object(safe, "encrypt_bytes", wraps=safe.encrypt_bytes) as encrypt:
+        safe.store_password("site9.com", "user2", "Pass")
+        safe.delete_password("site8.com", "user", "Pass8")
+
+    assert encrypt.call_count == 1
+    assert not os.path.exists(safe.journal_file)
+    assert is_sqlite_vault(path)
+    connection = sqlite3.connect(path)
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert connection.execute("SELECT count(*) FROM records").fetchone() == (49,)
+    connection.close()
+
+
+def test_sqlite_readers_do_not_wait_for_writers(tmp_path):
+    """A reader answers while another safe holds the vault's write lock."""
+    path = str(tmp_path / "vault.db")
+    writer = open_safe(path)
+    writer.store_password("a.com", "u", "p")
+    reader = open_safe(path, lazy=True)
+    answered = threading.Event()
+
+    def read():
+        reader.retrieve_password("a.com")
+        answered.set()
+
+    with writer.batch():
+        writer.store_password("b.com", "u", "p")
+        thread = threading.Thread(target=read)
+        thread.start()
+        assert answered.wait(5)
+    thread.join()
+    assert reader.retrieve_password("b.com")
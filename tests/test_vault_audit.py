@@ -0,0 +1,84 @@
+import time
+import pytest
+from unittest.mock import patch
+from secure_safe import Entry, SecureSafe
+from vault_audit import AuditIndex, estimate_entropy, weakness
+
+STRONG = "x7#Kq9!vRt2$Lm"
+
+
+@pytest.fixture
+def safe(tmp_path):
+    safe = SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+    safe.store_many(
+        [
+            ("a.com", "alice", STRONG),
+            ("b.com", "alice", STRONG),
+            ("c.com", "bob", STRONG),
+            ("d.com", "carol", "password"),
+            ("e.com", "dave", "Zp4!wQ8@nB3#"),
+        ]
+    )
+    return safe
+
+
+def test_weakness():
+    assert weakness("abc") == ("short", "low-entropy")
+    assert weakness("aaaaaaaaaaaaaaaa") == ("low-entropy",)
+    assert weakness(STRONG) == ()
+    assert estimate_entropy("") == 0.0
+
+
+def test_audit_reports_reuse_and_weakness(safe):
+    report = safe.audit()
+
+    assert report.reused == [[("a.com", "alice"), ("b.com", "alice"), ("c.com", "bob")]]
+    assert report.weak == [("d.com", "carol", ("short", "low-entropy"))]
+    assert report.old == []
+    assert report.undated == []
+
+
+def test_audit_reports_old_and_undated_entries(safe):
+    safe.passwords["f.com"] = [Entry("erin", STRONG + "f", created=1000)]
+    safe.passwords["g.com"] = [Entry("frank", STRONG + "g")]
+    safe.save_passwords()
+
+    report = SecureSafe("TestMasterKey", file=safe.file).audit(max_age_days=30)
+
+    assert report.old == [("f.com", "erin", 1000)]
+    assert report.undated == [("g.com", "frank")]
+
+
+def test_audit_index_updates_incrementally(safe):
+    """store and delete update the index; no rebuild happens."""
+    safe.audit()
+    with patch("secure_safe.AuditIndex") as rebuild:
+        safe.delete_password("a.com", "alice", STRONG)
+        safe.delete_password("b.com", "alice", STRONG)
+        safe.store_password("f.com", "erin", "password")
+        report = safe.audit()
+
+    rebuild.assert_not_called()
+    assert report.reused == [[("d.com", "carol"), ("f.com", "erin")]]
+    assert [row[:2] for row in report.weak] == [("d.com", "carol"), ("f.com", "erin")]
+
+
+def test_audit_rollback_restores_index(safe):
+    safe.audit()
+    with pytest.raises(RuntimeError):
+        with safe.batch():
+            safe.delete_password("c.com", "bob", STRONG)
+            safe.store_password("f.com", "erin", "Zp4!wQ8@nB3#")
+            raise RuntimeError("abort")
+
+    report = safe.audit()
+    assert len(report.reused) == 1 and len(report.reused[0]) == 3
+
+
+def test_digests_hide_passwords_and_depend_on_key():
+    entry = Entry("alice", STRONG, created=int(time.time()))
+    first = AuditIndex(b"k" * 32, {"a.com": [entry]})
+    second = AuditIndex(b"j" * 32, {"a.com": [entry]})
+
+    assert STRONG.encode() not in b"".join(first.refs)
+    assert set(first.refs) != set(second.refs)
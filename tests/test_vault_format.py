@@ -0,0 +1,261 @@
+import os
+import pytest
+import vault_format
+from unittest.mock import patch
+from secure_safe import SecureSafe
+from vault_format import (
+    BinaryVault,
+    ShardedVault,
+    atomic_write,
+    convert_json_to_binary,
+    file_changed,
+    file_stamp,
+    is_binary_vault,
+    is_sharded_vault,
+    settle_stamp,
+    shard_of,
+    write_vault,
+)
+
+
+@pytest.fixture
+def binary_path(tmp_path):
+    """Path to a binary vault inside a per-test temporary directory."""
+    return str(tmp_path / "vault.ssv")
+
+
+def test_write_and_lookup(binary_path):
+    """Every record written can be found again through the index."""
+    items = {f"site{i}.com": os.urandom(32 + i) for i in range(50)}
+    write_vault(binary_path, items.items())
+
+    vault = BinaryVault(binary_path)
+    assert len(vault) == 50
+    assert dict(vault.items()) == items
+    assert vault["site17.com"] == items["site17.com"]
+    assert "missing.com" not in vault
+    with pytest.raises(KeyError):
+        vault["missing.com"]
+    vault.close()
+
+
+def test_flush_applies_changes(binary_path):
+    """Pending sets and deletes are written by flush."""
+    write_vault(binary_path, [("a.com", b"aaa"), ("b.com", b"bbb")])
+    vault = BinaryVault(binary_path)
+    vault["c.com"] = b"ccc"
+    vault["a.com"] = b"AAA"
+    del vault["b.com"]
+    vault.flush()
+    vault.close()
+
+    reopened = BinaryVault(binary_path)
+    assert dict(reopened.items()) == {"a.com": b"AAA", "c.com": b"ccc"}
+    reopened.close()
+
+
+def test_is_binary_vault(tmp_path, binary_path):
+    """Existing files are detected by magic; new ones by extension."""
+    json_path = str(tmp_path / "passwords.json")
+    assert is_binary_vault(binary_path)
+    assert not is_binary_vault(json_path)
+
+    write_vault(json_path, [])
+    assert is_binary_vault(json_path)
+
+
+def test_convert_from_json(tmp_path, binary_path):
+    """A JSON vault converts without the key and opens with the same entries."""
+    json_path = str(tmp_path / "passwords.json")
+    safe = SecureSafe("TestMasterKey", file=json_path)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(20)])
+
+    convert_json_to_binary(json_path, binary_path)
+
+    converted = SecureSafe("TestMasterKey", file=binary_path)
+    assert converted.binary
+    assert converted.passwords == safe.passwords
+
+
+def test_convert_refuses_pending_journal(tmp_path, binary_path):
+    """Journaled changes must be compacted before conversion."""
+    json_path = str(tmp_path / "passwords.json")
+    safe = SecureSafe("TestMasterKey", file=json_path)
+    safe.store_password("test.com", "user1", "Test@123")
+    safe.store_password("test.com", "user2", "Pass@456")
+
+    with pytest.raises(ValueError):
+        convert_json_to_binary(json_path, binary_path)
+
+
+def test_secure_safe_binary_round_trip(binary_path):
+    """Stores, deletes and journal replay work on a binary vault."""
+    safe = SecureSafe("TestMasterKey", file=binary_path)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(10)])
+    safe.store_password("site0.com", "user2", "New0")
+    safe.delete_password("site1.com", "user", "Pass1")
+
+    reopened = SecureSafe("TestMasterKey", file=binary_path)
+    assert reopened.passwords == safe.passwords
+    reopened.compact()
+    assert SecureSafe("TestMasterKey", file=binary_path).passwords == safe.passwords
+
+
+def test_lazy_binary_retrieve_reads_one_record(binary_path):
+    """A lazy binary vault decrypts only the website that was asked for."""
+    safe = SecureSafe("TestMasterKey", file=binary_path)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(10)])
+
+    lazy = SecureSafe("TestMasterKey", file=binary_path, lazy=True)
+    with patch.object(lazy, "decrypt_bytes", wraps=lazy.decrypt_bytes) as decrypt:
+        assert lazy.retrieve_password("site4.com")[0]["password"] == "Pass4"
+
+    assert decrypt.call_count == 1
+
+
+@pytest.fixture
+def sharded_path(tmp_path):
+    """Path to a sharded vault manifest inside a per-test temporary directory."""
+    return str(tmp_path / "vault.shards")
+
+
+def test_sharded_vault_flush_writes_changed_shards(sharded_path):
+    """Only shards holding changed websites are rewritten."""
+    vault = ShardedVault(sharded_path, count=4)
+    for i in range(20):
+        vault[f"site{i}.com"] = f"blob{i}"
+    vault.flush()
+    assert is_sharded_vault(sharded_path)
+
+    vault["site3.com"] = "new"
+    with patch("vault_format.write_json") as write:
+        vault.flush()
+    assert [call.args[0] for call in write.call_args_list] == [
+        vault.shard_path(shard_of("site3.com", 4))
+    ]
+
+    reopened = ShardedVault(sharded_path)
+    assert reopened.count == 4
+    assert reopened["site7.com"] == "blob7"
+    assert len(reopened.shards) == 1
+    assert len(reopened) == 20
+
+
+def test_is_sharded_vault(tmp_path, sharded_path):
+    """Existing manifests are detected by their prefix; new ones by extension."""
+    json_path = str(tmp_path / "passwords.json")
+    assert is_sharded_vault(sharded_path)
+    assert not is_sharded_vault(json_path)
+
+    SecureSafe("TestMasterKey", file=json_path).store_password("a.com", "u", "p")
+    assert not is_sharded_vault(json_path)
+
+
+def test_secure_safe_sharded_round_trip(sharded_path):
+    """Stores, deletes, journal replay and re-keying work on a sharded vault."""
+    safe = SecureSafe("TestMasterKey", file=sharded_path)
+    assert safe.sharded
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(30)])
+    safe.store_password("site0.com", "user2", "New0")
+    safe.delete_password("site1.com", "user", "Pass1")
+
+    reopened = SecureSafe("TestMasterKey", file=sharded_path)
+    assert reopened.passwords == safe.passwords
+    reopened.compact()
+    reopened.change_kdf("NewMasterKey")
+    assert SecureSafe("NewMasterKey", file=sharded_path).passwords == safe.passwords
+
+
+def test_sharded_save_touches_one_shard(sharded_path):
+    """Without a journal, a store rewrites just the website's shard."""
+    safe = SecureSafe("TestMasterKey", file=sharded_path, journal_limit=None)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(50)])
+
+    with patch("vault_format.write_json") as write:
+        safe.store_password("site9.com", "user2", "Pass")
+
+    assert write.call_count == 1
+
+
+def test_interrupted_sharded_batch_is_replayed(sharded_path):
+    """A crash between shard writes leaves a journal that completes the batch."""
+    safe = SecureSafe("TestMasterKey", file=sharded_path, journal_limit=None)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(50)])
+    write_json = vault_format.write_json
+    written = []
+
+    def crash_after_one(path, data):
+        if written:
+            raise OSError("power loss")
+        written.append(path)
+        write_json(path, data)
+
+    with patch("vault_format.write_json", crash_after_one):
+        with pytest.raises(OSError):
+            safe.store_many([(f"site{i}.com", "user2", "New") for i in range(50)])
+
+    reopened = SecureSafe("TestMasterKey", file=sharded_path)
+    assert all(len(entries) == 2 for entries in reopened.passwords.values())
+
+
+def test_lazy_sharded_retrieve_reads_one_shard(sharded_path):
+    """A lazy sharded vault only opens the shard it needs."""
+    safe = SecureSafe("TestMasterKey", file=sharded_path)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(50)])
+
+    lazy = SecureSafe("TestMasterKey", file=sharded_path, lazy=True)
+    assert lazy.retrieve_password("site4.com")[0]["password"] == "Pass4"
+    lazy.store_password("site5.com", "user2", "Pass")
+    lazy.compact()
+
+    assert len(lazy.ciphertexts.shards) <= 2
+    assert SecureSafe("TestMasterKey", file=sharded_path).passwords["site5.com"] == [
+        {"username": "user", "password": "Pass5"},
+        {"username": "user2", "password": "Pass"},
+    ]
+
+
+def test_atomic_write_keeps_old_file_on_failure(tmp_path):
+    """A write that fails part-way leaves the previous file and no temp file."""
+    path = str(tmp_path / "passwords.json")
+    with atomic_write(path) as f:
+        f.write("old")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as f:
+            f.write("new, half written")
+            raise RuntimeError("crash")
+
+    assert open(path).read() == "old"
+    assert os.listdir(tmp_path) == ["passwords.json"]
+
+
+def test_file_changed_catches_racy_rewrite(tmp_path):
+    """Rewrites that keep inode, mtime and size are caught by content hash."""
+    path = str(tmp_path / "vault")
+    with open(path, "w") as f:
+        f.write("aaaa")
+    stamp = file_stamp(path)
+    assert not file_changed(path, stamp)
+
+    with open(path, "r+") as f:
+        f.write("bbbb")
+    os.utime(path, ns=(stamp[1], stamp[1]))
+
+    assert file_changed(path, stamp)
+
+
+def test_aged_stamp_stops_hashing(tmp_path):
+    """A fresh file is hashed on each check only until its mtime leaves the racy window."""
+    path = str(tmp_path / "vault")
+    with open(path, "w") as f:
+        f.write("aaaa")
+    stamp = file_stamp(path)
+    assert settle_stamp(path, stamp) == (False, stamp)
+
+    with patch("vault_format.RACY_NANOSECONDS", 0):
+        changed, settled = settle_stamp(path, stamp)
+        assert not changed and settled == stamp[:3] + (None,)
+        with patch("vault_format.file_digest") as digest:
+            assert not file_changed(path, settled)
+    digest.assert_not_called()
@@ -0,0 +1,136 @@
+import io
+import csv
+import pytest
+from secure_safe import SecureSafe
+from vault_io import export_csv, import_csv, normalize_website
+
+
+@pytest.fixture
+def safe(tmp_path):
+    return SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+
+
+def csv_file(header, rows):
+    f = io.StringIO()
+    writer = csv.writer(f)
+    writer.writerow(header)
+    writer.writerows(rows)
+    f.seek(0)
+    return f
+
+
+def test_normalize_website():
+    assert normalize_website("https://accounts.Example.com:443/login?x=1") == (
+        "accounts.example.com"
+    )
+    assert normalize_website(" GitHub.com ") == "github.com"
+
+
+def test_import_browser_export(safe):
+    """Chrome-style exports map url/username/password onto vault entries."""
+    f = csv_file(
+        ["name", "url", "username", "password"],
+        [
+            ["GitHub", "https://github.com/login", "alice", "p1"],
+            ["GitHub", "https://github.com/session", "bob", "p2"],
+            ["Empty", "https://empty.example.com", "carol", ""],
+        ],
+    )
+    stats = import_csv(safe, f)
+
+    assert (stats.read, stats.imported, stats.skipped) == (3, 2, 1)
+    assert safe.retrieve_password("github.com") == [
+        {"username": "alice", "password": "p1"},
+        {"username": "bob", "password": "p2"},
+    ]
+
+
+def test_import_deduplicates_input_and_vault(safe):
+    """Rows repeated in the file or already in the vault are skipped."""
+    safe.store_password("github.com", "alice", "p1")
+    f = csv_file(
+        ["url", "username", "password"],
+        [
+            ["https://github.com", "alice", "p1"],
+            ["https://gitlab.com", "bob", "p2"],
+            ["https://gitlab.com/", "bob", "p2"],
+        ],
+    )
+    stats = import_csv(safe, f)
+
+    assert (stats.imported, stats.skipped) == (1, 2)
+    assert len(safe.retrieve_password("github.com")) == 1
+    assert len(safe.retrieve_password("gitlab.com")) == 1
+
+
+def test_duplicates_across_chunks_are_caught_by_the_vault(safe, monkeypatch):
+    """Each chunk is checked against the vault once, without a lookup per row."""
+    monkeypatch.setattr(safe, "retrieve_password", None)
+    rows = [[f"site{i % 5}.com", "user", f"p{i % 5}"] for i in range(20)]
+    stats = import_csv(safe, csv_file(["website", "username", "password"], rows), 3)
+
+    assert (stats.imported, stats.skipped) == (5, 15)
+    assert len(safe.passwords) == 5
+
+
+def test_import_commits_in_chunks(safe):
+    """Each chunk is saved once, and input is read only as chunks are needed."""
+    rows = [[f"site{i}.com", "user", f"p{i}"] for i in range(25)]
+    read_at_progress = []
+    consumed = []
+
+    def lines():
+        f = csv_file(["website", "username", "password"], rows)
+        for line in f:
+            consumed.append(line)
+            yield line
+
+    saves = []
+    original_save = safe.save_passwords
+    safe.save_passwords = lambda: saves.append(1) or original_save()
+
+    stats = import_csv(
+        safe,
+        lines(),
+        chunk_size=10,
+        progress=lambda s: read_at_progress.append(len(consumed)),
+    )
+
+    assert stats.imported == 25
+    assert stats.chunks == 3
+    assert len(saves) == 3
+    # The first commit happened long before the whole file was read
+    assert read_at_progress[0] <= 12
+    reopened = SecureSafe("TestMasterKey", file=safe.file)
+    assert len(reopened.passwords) == 25
+
+
+def test_import_lazy_vault_stays_bounded(tmp_path):
+    """A lazy safe keeps only its LRU decrypted after each committed chunk."""
+    safe = SecureSafe(
+        "TestMasterKey", file=str(tmp_path / "passwords.json"), lazy=True, cache_size=8
+    )
+    f = csv_file(
+        ["website", "username", "password"],
+        [[f"site{i}.com", "user", f"p{i}"] for i in range(100)],
+    )
+    import_csv(safe, f, chunk_size=20)
+
+    assert len(safe.passwords) == 100
+    assert len(safe.passwords.live) == 0
+    assert len(safe.passwords.cache) <= 8
+
+
+def test_export_round_trip(safe, tmp_path):
+    """Exported CSV imports back into an empty vault unchanged."""
+    safe.store_password("github.com", "alice", "p,1", tags=["work", "code"])
+    safe.store_password("github.com", "bob", 'p"2')
+    safe.store_password("example.com", "carol", "p3")
+    out = io.StringIO()
+    assert export_csv(safe, out) == 3
+
+    out.seek(0)
+    other = SecureSafe("TestMasterKey", file=str(tmp_path / "other.json"))
+    import_csv(other, out)
+
+    assert other.passwords == safe.passwords
@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import patch
+from secure_safe import SecureSafe, main_cli
+from vault_stats import Profiler
+
+
+def test_profiler_counts_and_percentiles():
+    """Calls, bytes, totals and percentiles are aggregated per operation."""
+    profiler = Profiler()
+    for ms in range(1, 101):
+        profiler.record("decrypt", ms / 1000, 10)
+
+    stats = profiler.stats()["decrypt"]
+    assert stats["calls"] == 100
+    assert stats["bytes"] == 1000
+    assert stats["total_seconds"] == pytest.approx(5.05)
+    assert stats["p50_seconds"] == pytest.approx(0.051)
+    assert stats["p99_seconds"] == pytest.approx(0.100)
+
+
+def test_profiler_forwards_to_hooks():
+    """Every timed call is handed to each registered hook."""
+    seen = []
+    profiler = Profiler(hooks=[lambda *args: seen.append(args)])
+    timed = profiler.wrap("double", lambda x: x * 2, lambda args, result: result)
+
+    assert timed(21) == 42
+    assert seen[0][0] == "double"
+    assert seen[0][2] == 42
+
+
+def test_safe_stats(tmp_path):
+    """A profiled safe times its key derivation, crypto, loads and saves."""
+    path = str(tmp_path / "passwords.json")
+    safe = SecureSafe("TestMasterKey", file=path, profile=True)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(5)])
+    SecureSafe("TestMasterKey", file=path)
+
+    stats = safe.stats()
+    assert set(stats) == {
+        "derive_key",
+        "encrypt",
+        "load_passwords",
+        "save_passwords",
+    }
+    assert stats["encrypt"]["calls"] == 5
+    assert stats["encrypt"]["bytes"] > 0
+    assert stats["save_passwords"]["bytes"] > 0
+
+    safe.compact()
+    reopened = SecureSafe("TestMasterKey", file=path, lazy=True, profile=True)
+    reopened.retrieve_password("site1.com")
+    assert reopened.stats()["decrypt"]["calls"] == 1
+
+
+def test_disabled_profiling_installs_nothing(tmp_path):
+    """Without profiling the hot paths are the plain class methods."""
+    safe = SecureSafe("TestMasterKey", file=str(tmp_path / "passwords.json"))
+
+    assert safe.stats() == {}
+    for name in ("derive_key", "encrypt_bytes", "decrypt_bytes", "save_passwords"):
+        assert name not in vars(safe)
+
+
+def test_cli_profile_prints_report(tmp_path, capsys):
+    """--profile prints the timing table when the CLI exits."""
+    path = str(tmp_path / "passwords.json")
+    with patch("secure_safe.getpass", return_value="TestMasterKey"), patch(
+        "builtins.input", side_effect=["5"]
+    ):
+        main_cli(["--file", path, "--profile"])
+
+    assert "derive_key" in capsys.readouterr().err
@@ -0,0 +1,203 @@
+import shutil
+import pytest
+from vault_format import JsonVault
+from secure_safe import Entry, SecureSafe
+from vault_sync import MerkleTree, changed_websites, merge_entries, tree_depth
+
+FAST_KDF = {"name": "pbkdf2", "iterations": 1000}
+
+
+@pytest.fixture
+def pair(tmp_path):
+    """A vault with a few websites and a file copy of it, as kept on two hosts."""
+    ours = str(tmp_path / "ours.json")
+    theirs = str(tmp_path / "theirs.json")
+    safe = SecureSafe("TestMasterKey", file=ours, kdf=FAST_KDF)
+    safe.store_many([(f"site{i}.com", "user", f"Pass{i}") for i in range(20)])
+    safe.compact()
+    shutil.copy(ours, theirs)
+    return safe, theirs
+
+
+def reopen(path):
+    return SecureSafe("TestMasterKey", file=path, kdf=FAST_KDF)
+
+
+def test_merkle_diff_finds_changed_websites():
+    old = {f"site{i}.com": f"digest{i}" for i in range(5000)}
+    new = dict(old, **{"site7.com": "changed", "added.com": "digest"})
+    del new["site42.com"]
+
+    assert changed_websites(old, new) == {"site7.com", "added.com", "site42.com"}
+    depth = tree_depth(len(old))
+    assert MerkleTree(old, depth).root == MerkleTree(dict(old), depth).root
+    assert not changed_websites(old, dict(old))
+
+
+def test_merge_keeps_both_sides_changes():
+    base = [Entry("alice", "p1"), Entry("bob", "p2")]
+    ours = [Entry("alice", "p1"), Entry("bob", "p2"), Entry("carol", "p3")]
+    theirs = [Entry("alice", "p1")]
+
+    merged, conflicts = merge_entries(base, ours, theirs)
+    assert merged == [Entry("alice", "p1"), Entry("carol", "p3")]
+    assert conflicts == []
+
+
+def test_merge_reports_concurrent_edits():
+    base = [Entry("alice", "old")]
+    merged, conflicts = merge_entries(
+        base, [Entry("alice", "mine")], [Entry("alice", "yours")]
+    )
+    assert merged == [Entry("alice", "mine"), Entry("alice", "yours")]
+    assert conflicts == ["alice"]
+
+    merged, conflicts = merge_entries(
+        base, [Entry("alice", "same")], [Entry("alice", "same")]
+    )
+    assert merged == [Entry("alice", "same")] and conflicts == []
+
+
+def test_identical_copies_need_no_changes(pair):
+    safe, theirs = pair
+    report = safe.sync(theirs)
+    assert (report.pulled, report.pushed, report.conflicts) == ([], [], [])
+
+
+def test_changes_flow_both_ways(pair):
+    safe, theirs = pair
+    safe.sync(theirs)
+    safe.store_password("new.com", "user", "p")
+    other = reopen(theirs)
+    other.delete_password("site3.com", "user", "Pass3")
+    other.store_password("site4.com", "admin", "p")
+
+    report = safe.sync(theirs)
+    assert report.pulled == ["site3.com", "site4.com"]
+    assert report.pushed == ["new.com"]
+    assert report.compared == 3
+    assert sorted(safe.passwords) == sorted(reopen(theirs).passwords)
+    assert "site3.com" not in reopen(safe.file).passwords
+    assert reopen(theirs).retrieve_password("new.com")
+
+
+def test_only_changed_websites_are_decrypted(pair, monkeypatch):
+    """After the first sync, a sync decrypts and encrypts only what changed."""
+    safe, theirs = pair
+    safe.sync(theirs)
+    reopen(theirs).store_password("site5.com", "admin", "p")
+
+    calls = {"decrypt": 0, "encrypt": 0}
+
+    def count(name):
+        method = getattr(SecureSafe, name)
+
+        def counted(self, *args):
+            calls[name.split("_")[0]] += 1
+            return method(self, *args)
+
+        monkeypatch.setattr(SecureSafe, name, counted)
+
+    count("decrypt_bytes")
+    count("encrypt_bytes")
+    report = safe.sync(theirs)
+
+    assert report.pulled == ["site5.com"] and report.compared == 1
+    # The other copy's journal record and the merge base; this vault already holds its own
+    assert calls == {"decrypt": 2, "encrypt": 2}
+
+
+def test_concurrent_edit_is_reported_and_kept(pair):
+    safe, theirs = pair
+    safe.sync(theirs)
+    safe.delete_password("site1.com", "user", "Pass1")
+    safe.store_password("site1.com", "user", "Mine")
+    other = reopen(theirs)
+    other.delete_password("site1.com", "user", "Pass1")
+    other.store_password("site1.com", "user", "Theirs")
+
+    report = safe.sync(theirs)
+    assert report.conflicts == [("site1.com", "user")]
+    expected = [
+        {"username": "user", "password": "Mine"},
+        {"username": "user", "password": "Theirs"},
+    ]
+    assert safe.retrieve_password("site1.com") == expected
+    assert reopen(theirs).retrieve_password("site1.com") == expected
+    assert safe.sync(theirs).compared == 0
+
+
+@pytest.mark.parametrize("extension", ["json", "ssv", "shards"])
+def test_separately_created_vault_needs_its_password(tmp_path, extension):
+    ours = str(tmp_path / f"ours.{extension}")
+    theirs = str(tmp_path / f"theirs.{extension}")
+    safe = SecureSafe("TestMasterKey", file=ours, kdf=FAST_KDF)
+    safe.store_password("a.com", "user", "p")
+    SecureSafe("OtherKey", file=theirs, kdf=FAST_KDF).store_password("b.com", "u", "p")
+
+    with pytest.raises(ValueError, match="master password"):
+        safe.sync(theirs)
+    report = safe.sync(theirs, "OtherKey")
+    assert (report.pulled, report.pushed) == (["b.com"], ["a.com"])
+    assert sorted(SecureSafe("OtherKey", file=theirs, kdf=FAST_KDF).passwords) == [
+        "a.com",
+        "b.com",
+    ]
+
+
+def test_stream_vault_syncs(tmp_path, pair):
+    safe, theirs = pair
+    stream = str(tmp_path / "stream.json")
+    shutil.copy(safe.file, stream)
+    SecureSafe("TestMasterKey", file=stream, kdf=FAST_KDF, stream=True).store_password(
+        "stream.com", "user", "p"
+    )
+
+    safe.sync(stream)
+    reopen(stream).delete_password("site0.com", "user", "Pass0")
+    assert safe.sync(stream).pulled == ["site0.com"]
+    assert "stream.com" in safe.passwords and "site0.com" not in safe.passwords
+
+
+def test_more_changes_than_the_cache_holds(tmp_path):
+    """Merged entries survive lazy cache eviction on both sides."""
+    ours = str(tmp_path / "ours.json")
+    theirs = str(tmp_path / "theirs.json")
+    SecureSafe("TestMasterKey", file=ours, kdf=FAST_KDF).store_many(
+        [(f"site{i}.com", "user", f"Pass{i}") for i in range(150)]
+    )
+    shutil.copy(ours, theirs)
+    safe = SecureSafe("TestMasterKey", file=ours, lazy=True, cache_size=8)
+    safe.sync(theirs)
+    reopen(theirs).store_many([(f"site{i}.com", "admin", "p") for i in range(140)])
+
+    assert len(safe.sync(theirs).pulled) == 140
+    for path in (ours, theirs):
+        passwords = reopen(path).passwords
+        assert all(
+            passwords[f"site{i}.com"]
+            == [Entry("user", f"Pass{i}"), Entry("admin", "p")]
+            for i in range(140)
+        )
+
+
+def test_failed_sync_releases_the_other_vault(pair, monkeypatch):
+    safe, theirs = pair
+    opened, closed = [], []
+    init = JsonVault.__init__
+
+    def track(storage, path):
+        init(storage, path)
+        opened.append(storage)
+
+    monkeypatch.setattr(JsonVault, "__init__", track)
+    monkeypatch.setattr(JsonVault, "close", lambda storage: closed.append(id(storage)))
+
+    def fail(*args):
+        raise RuntimeError("merge failed")
+
+    monkeypatch.setattr("secure_safe.merge_entries", fail)
+    with pytest.raises(RuntimeError):
+        safe.sync(theirs)
+    others = [storage for storage in opened if storage.path == theirs]
+    assert others and all(id(storage) in closed for storage in others)
@@ -0,0 +1,192 @@
+import os
+import sys
+import time
+import signal
+import random
+import threading
+import subprocess
+import pytest
+from unittest.mock import patch
+from secure_safe import SecureSafe
+from write_behind import WriteBehind
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAST_KDF = {"name": "pbkdf2", "iterations": 1000}
+
+
+@pytest.fixture
+def vault_path(tmp_path):
+    """Path to a vault file inside a per-test temporary directory."""
+    return str(tmp_path / "passwords.json")
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_burst_is_coalesced_into_one_flush():
+    """Changes closer together than the delay share a single flush."""
+    flushes = []
+    flusher = WriteBehind(lambda: flushes.append(time.monotonic()), delay=0.05)
+    for _ in range(10):
+        flusher.changed()
+
+    assert wait_for(lambda: flushes)
+    time.sleep(0.1)
+    flusher.stop()
+    assert len(flushes) == 1
+
+
+def test_flushes_once_enough_changes_pile_up():
+    """max_pending changes flush without waiting out the delay."""
+    flushed = threading.Event()
+    flusher = WriteBehind(flushed.set, delay=60, max_pending=5)
+    for _ in range(5):
+        flusher.changed()
+
+    assert flushed.wait(5)
+    flusher.stop()
+    assert not flusher.thread.is_alive()
+
+
+def test_failed_flush_is_remembered():
+    def fail():
+        raise OSError("disk full")
+
+    flusher = WriteBehind(fail, delay=0)
+    flusher.changed()
+
+    assert wait_for(lambda: flusher.error is not None)
+    flusher.stop()
+
+
+def test_changes_wait_for_flush(vault_path):
+    """Stores update memory at once but reach the file only when flushed."""
+    SecureSafe("TestMasterKey", file=vault_path).store_password("a.com", "u", "p")
+    safe = SecureSafe("TestMasterKey", file=vault_path, flush_delay=60)
+    safe.store_password("b.com", "u", "p")
+    safe.delete_password("a.com", "u", "p")
+
+    assert safe.retrieve_password("b.com") == [{"username": "u", "password": "p"}]
+    assert sorted(SecureSafe("TestMasterKey", file=vault_path).passwords) == ["a.com"]
+
+    safe.flush()
+    assert sorted(SecureSafe("TestMasterKey", file=vault_path).passwords) == ["b.com"]
+    safe.close()
+
+
+def test_flush_creating_the_journal_syncs_its_directory(vault_path):
+    SecureSafe("TestMasterKey", file=vault_path).compact()
+    safe = SecureSafe("TestMasterKey", file=vault_path, flush_delay=60)
+    safe.store_password("a.com", "u", "p")
+    with patch("secure_safe.fsync_directory") as fsync_directory:
+        safe.flush()
+        safe.store_password("b.com", "u", "p")
+        safe.flush()
+
+    fsync_directory.assert_called_once_with(safe.journal_file)
+    safe.close()
+
+
+def test_background_flush_after_delay(vault_path):
+    safe = SecureSafe("TestMasterKey", file=vault_path)
+    safe.store_password("a.com", "u", "p")
+    safe = SecureSafe("TestMasterKey", file=vault_path, flush_delay=0.05)
+    safe.store_password("b.com", "u", "p")
+
+    assert wait_for(lambda: not safe.pending)
+    assert "b.com" in SecureSafe("TestMasterKey", file=vault_path).passwords
+    safe.close()
+
+
+def test_context_exit_flushes(vault_path):
+    with SecureSafe("TestMasterKey", file=vault_path, flush_delay=60) as safe:
+        safe.store_password("a.com", "u", "p")
+
+    assert safe.write_behind is None
+    assert "a.com" in SecureSafe("TestMasterKey", file=vault_path).passwords
+
+
+def test_unflushed_changes_survive_refresh(vault_path):
+    """Another process's save does not drop changes still waiting to be flushed."""
+    safe = SecureSafe("TestMasterKey", file=vault_path, flush_delay=60)
+    safe.store_password("a.com", "u", "p")
+    other = SecureSafe("TestMasterKey", file=vault_path)
+    other.store_password("b.com", "u", "p")
+    other.compact()
+
+    assert safe.retrieve_password("b.com")
+    assert safe.retrieve_password("a.com")
+    safe.close()
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    assert sorted(reopened.passwords) == ["a.com", "b.com"]
+
+
+@pytest.mark.parametrize("journal_limit", [1024 * 1024, None, 1])
+def test_flush_keeps_other_processes_saves(vault_path, journal_limit):
+    """A flush picks up what another process saved first, with or without compaction."""
+    SecureSafe("TestMasterKey", file=vault_path, kdf=FAST_KDF).compact()
+    options = {"file": vault_path, "journal_limit": journal_limit}
+    safe = SecureSafe("TestMasterKey", flush_delay=60, **options)
+    safe.store_password("fromA.com", "u", "p")
+    SecureSafe("TestMasterKey", **options).store_password("fromB.com", "u", "p")
+
+    safe.flush()
+    safe.close()
+    reopened = SecureSafe("TestMasterKey", file=vault_path)
+    assert sorted(reopened.passwords) == ["fromA.com", "fromB.com"]
+
+
+def test_interpreter_exit_flushes(vault_path):
+    code = (
+        "from secure_safe import SecureSafe;"
+        f"safe = SecureSafe('TestMasterKey', file={vault_path!r}, flush_delay=60);"
+        "safe.store_password('a.com', 'u', 'p')"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+    assert "a.com" in SecureSafe("TestMasterKey", file=vault_path).passwords
+
+
+WRITER = """
+import sys
+from secure_safe import SecureSafe
+safe = SecureSafe("TestMasterKey", file=sys.argv[1], kdf={kdf!r},
+                  flush_delay=0.005, flush_changes=8, journal_limit=4096)
+start = len(safe.passwords)
+for i in range(start, start + 100000):
+    safe.store_password(f"site{{i}}.com", "user", f"Pass{{i}}")
+    if i % 20 == 0:
+        safe.flush()
+        print(i, flush=True)
+"""
+
+
+def test_kill_between_edits_never_corrupts(vault_path):
+    """SIGKILL at random points leaves a vault holding a gap-free prefix of the edits."""
+    script = WRITER.format(kdf=FAST_KDF)
+    rng = random.Random(1234)
+    for _ in range(5):
+        writer = subprocess.Popen(
+            [sys.executable, "-c", script, vault_path],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(rng.randint(1, 4)):
+            flushed = int(writer.stdout.readline())
+        time.sleep(rng.random() * 0.05)
+        writer.send_signal(signal.SIGKILL)
+        writer.wait()
+        writer.stdout.close()
+
+        safe = SecureSafe("TestMasterKey", file=vault_path, kdf=FAST_KDF)
+        stored = {int(website[4:-4]) for website in safe.passwords}
+        assert stored == set(range(len(stored)))
+        assert flushed in stored
+        assert safe.retrieve_password(f"site{flushed}.com") == [
+            {"username": "user", "password": f"Pass{flushed}"}
+        ]
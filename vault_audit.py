@@ -0,0 +1,150 @@
+import hmac
+import math
+import time
+import bisect
+import string
+from collections import Counter, namedtuple
+
+# Passwords shorter than this are reported as weak.
+MIN_LENGTH = 10
+# Passwords whose estimated entropy falls below this many bits are reported as weak.
+MIN_ENTROPY_BITS = 50
+# Entries not updated for this many days are reported as old.
+MAX_AGE_DAYS = 365
+
+AuditReport = namedtuple("AuditReport", "reused weak old undated")
+AuditReport.__doc__ = """Findings of SecureSafe.audit().
+
+reused: groups of (website, username) sharing one password, largest first
+weak: (website, username, reasons) for short or low-entropy passwords
+old: (website, username, updated) for entries older than the age limit, oldest first
+undated: (website, username) for entries stored before timestamps were kept
+"""
+
+CLASSES = tuple(
+    frozenset(members)
+    for members in (
+        string.ascii_lowercase,
+        string.ascii_uppercase,
+        string.digits,
+        string.punctuation,
+    )
+)
+
+
+def estimate_entropy(password):
+    """Rough entropy in bits: distinct characters times log2 of the classes' size.
+
+    Counting distinct characters rather than length keeps repeats such as
+    "aaaaaaaaaaaa" from looking strong.
+    """
+    pool = sum(len(members) for members in CLASSES if not members.isdisjoint(password))
+    if set(password).difference(*CLASSES):
+        pool += 100  # Anything outside printable ASCII
+    return len(set(password)) * math.log2(pool) if pool else 0.0
+
+
+def weakness(password):
+    """Reasons a password is weak; empty if it passes."""
+    reasons = []
+    if len(password) < MIN_LENGTH:
+        reasons.append("short")
+    if estimate_entropy(password) < MIN_ENTROPY_BITS:
+        reasons.append("low-entropy")
+    return tuple(reasons)
+
+
+class AuditIndex:
+    """Reuse, weakness and age bookkeeping for every entry, kept up to date per change.
+
+    Passwords are only held as HMAC-SHA256 digests under a key derived from
+    the vault key, so equal passwords collide without the index storing or
+    revealing them. Each add or remove costs O(log n); audits then only read
+    the findings.
+    """
+
+    def __init__(self, key, passwords=None):
+        self.key = key
+        self.refs = {}  # digest -> Counter of (website, username)
+        self.counts = Counter()  # digest -> number of entries using it
+        self.reused = set()  # digests shared by two or more entries
+        self.weak = {}  # digest -> reasons, for weak passwords only
+        self.dated = []  # sorted (updated, website, username)
+        self.undated = Counter()  # (website, username)
+        self.bulk = True  # While building, dated is appended to and sorted once
+        for website, entries in (passwords or {}).items():
+            for entry in entries:
+                self.add(website, entry)
+        self.dated.sort()
+        self.bulk = False
+
+    def digest(self, password):
+        return hmac.digest(self.key, password.encode(), "sha256")[:16]
+
+    def add(self, website, entry):
+        """Indexes one entry stored under ``website``."""
+        digest = self.digest(entry.password)
+        ref = (website, entry.username)
+        refs = self.refs.get(digest)
+        if refs is None:
+            refs = self.refs[digest] = Counter()
+            reasons = weakness(entry.password)
+            if reasons:
+                self.weak[digest] = reasons
+        refs[ref] += 1
+        self.counts[digest] += 1
+        if self.counts[digest] > 1:
+            self.reused.add(digest)
+        if entry.updated is None:
+            self.undated[ref] += 1
+        elif self.bulk:
+            self.dated.append((entry.updated, website, entry.username))
+        else:
+            bisect.insort(self.dated, (entry.updated, website, entry.username))
+
+    def remove(self, website, entry):
+        """Forgets one entry previously passed to add."""
+        digest = self.digest(entry.password)
+        ref = (website, entry.username)
+        refs = self.refs.get(digest)
+        if refs is None or not refs[ref]:
+            return
+        refs[ref] -= 1
+        if refs[ref] <= 0:
+            del refs[ref]
+        self.counts[digest] -= 1
+        if self.counts[digest] < 2:
+            self.reused.discard(digest)
+        if not refs:
+            del self.refs[digest]
+            del self.counts[digest]
+            self.weak.pop(digest, None)
+        if entry.updated is None:
+            self.undated[ref] -= 1
+            if self.undated[ref] <= 0:
+                del self.undated[ref]
+        else:
+            stamp = (entry.updated, website, entry.username)
+            position = bisect.bisect_left(self.dated, stamp)
+            if position < len(self.dated) and self.dated[position] == stamp:
+                del self.dated[position]
+
+    def report(self, max_age_days=MAX_AGE_DAYS, now=None):
+        """Returns an AuditReport of the current findings."""
+        reused = sorted(
+            (sorted(self.refs[digest].elements()) for digest in self.reused),
+            key=lambda group: (-len(group), group),
+        )
+        weak = sorted(
+            (website, username, self.weak[digest])
+            for digest in self.weak
+            for website, username in self.refs[digest]
+        )
+        cutoff = (time.time() if now is None else now) - max_age_days * 86400
+        old = [
+            (website, username, updated)
+            for updated, website, username in self.dated[
+                : bisect.bisect_left(self.dated, (cutoff,))
+            ]
+        ]
+        return AuditReport(reused, weak, old, sorted(self.undated))
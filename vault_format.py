@@ -0,0 +1,770 @@
+import os
+import copy
+import json
+import mmap
+import base64
+import struct
+import time
+import sqlite3
+import hashlib
+import argparse
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # No advisory locks on this platform; locking is a no-op
+    fcntl = None
+
+# Layout: header, metadata, index sorted by website hash, then the records it points at.
+#   header: magic, format version, record count, metadata length (version 2+)
+#   metadata: JSON object with vault parameters such as the key derivation settings
+#   index entry: first 16 bytes of SHA-256(website), record offset, record length
+#   record: website length, website (UTF-8), raw IV + ciphertext
+MAGIC = b"SSV1"
+VERSION = 2
+HEADER = struct.Struct("<4sHxxI")
+META_LENGTH = struct.Struct("<I")
+INDEX_ENTRY = struct.Struct("<16sQI")
+NAME_LENGTH = struct.Struct("<H")
+# passwords.json files carrying metadata wrap their entries in a versioned object
+JSON_VERSION = 2
+# Sharded vaults: a JSON manifest (metadata and shard count) that always starts
+# with SHARD_MAGIC, plus shard files "<manifest>.000" ... mapping website -> ciphertext
+SHARD_MAGIC = b'{"format": "sharded"'
+SHARD_COUNT = 16
+# SQLite vaults: one row per website in a WITHOUT ROWID table keyed by website hash
+SQLITE_MAGIC = b"SQLite format 3\x00"
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS records (
+    website_hash BLOB NOT NULL,
+    website TEXT NOT NULL,
+    ciphertext TEXT NOT NULL,
+    PRIMARY KEY (website_hash, website)
+) WITHOUT ROWID;
+"""
+# Files modified more recently than this are also compared by content hash,
+# since a rewrite within the filesystem's timestamp granularity keeps the mtime
+RACY_NANOSECONDS = 2 * 10**9
+
+
+def website_hash(website):
+    """Returns the 16-byte index key for a website."""
+    return hashlib.sha256(website.encode()).digest()[:16]
+
+
+def is_binary_vault(path):
+    """Tells whether ``path`` holds (or, if missing, should hold) a binary vault."""
+    if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    return path.endswith(".ssv")
+
+
+def is_sharded_vault(path):
+    """Tells whether ``path`` is (or, if missing, should be) a sharded vault manifest."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read(len(SHARD_MAGIC)) == SHARD_MAGIC
+    return path.endswith(".shards")
+
+
+def is_sqlite_vault(path):
+    """Tells whether ``path`` is (or, if missing, should be) an SQLite vault."""
+    if os.path.exists(path) and os.path.getsize(path) >= len(SQLITE_MAGIC):
+        with open(path, "rb") as f:
+            return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    return path.endswith(SQLITE_SUFFIXES)
+
+
+def shard_of(website, count):
+    """Index of the shard a website is stored in."""
+    return int.from_bytes(website_hash(website)[:4], "little") % count
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """Yields a sibling temp file that replaces ``path`` once written and synced.
+
+    A crash at any point leaves either the old file or the complete new one.
+    """
+    temp_file = path + ".tmp"
+    try:
+        with open(temp_file, mode) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    # Persist the rename itself
+    fsync_directory(path)
+
+
+def fsync_directory(path):
+    """Fsyncs the directory holding ``path``, persisting its entry after a create or rename."""
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+@contextmanager
+def vault_lock(path, exclusive=False):
+    """Holds an advisory lock for the vault at ``path``: shared for readers, exclusive for writers.
+
+    The lock lives on a "<path>.lock" sidecar because the vault file itself is
+    replaced on every save.
+    """
+    if fcntl is None:
+        yield
+        return
+    descriptor = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(descriptor, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        os.close(descriptor)  # Also releases the lock
+
+
+def file_digest(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.digest()
+
+
+def is_racy(mtime_ns):
+    """Whether a file with this mtime could be rewritten without the mtime changing."""
+    return time.time_ns() - mtime_ns < RACY_NANOSECONDS
+
+
+def file_stamp(path, digest=True):
+    """(inode, mtime, size, digest) of ``path``, or None if it is missing.
+
+    The content digest is only taken while the mtime is too recent to tell
+    two quick rewrites apart; older files are compared by stat alone.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (
+        stat.st_ino,
+        stat.st_mtime_ns,
+        stat.st_size,
+        file_digest(path) if digest and is_racy(stat.st_mtime_ns) else None,
+    )
+
+
+def file_changed(path, stamp):
+    """Tells whether ``path`` differs from when ``stamp`` was taken."""
+    current = file_stamp(path, digest=False)
+    if current is None or stamp is None:
+        return current != stamp
+    if current[:3] != stamp[:3]:
+        return True
+    # Same inode, mtime and size: only the digest can tell a racy rewrite apart
+    return stamp[3] is not None and file_digest(path) != stamp[3]
+
+
+def settle_stamp(path, stamp):
+    """Checks ``path`` against ``stamp`` like file_changed; returns (changed, stamp to keep).
+
+    A digest that still matches after the mtime aged out of the racy window
+    is dropped, so later checks of an unchanged file cost a stat alone.
+    """
+    aged = stamp is not None and stamp[3] is not None and not is_racy(stamp[1])
+    if file_changed(path, stamp):
+        return True, stamp
+    return False, stamp[:3] + (None,) if aged else stamp
+
+
+def write_json(path, data):
+    """Writes ``data`` as JSON to ``path`` atomically."""
+    with atomic_write(path) as f:
+        json.dump(data, f)
+
+
+def write_vault(path, items, meta=None):
+    """Atomically writes (website, raw ciphertext) pairs and metadata as a binary vault."""
+    records = sorted(
+        ((website_hash(website), website.encode(), blob) for website, blob in items),
+        key=lambda record: record[0],
+    )
+    meta = json.dumps(meta or {}).encode()
+    offset = (
+        HEADER.size + META_LENGTH.size + len(meta) + INDEX_ENTRY.size * len(records)
+    )
+    with atomic_write(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        f.write(META_LENGTH.pack(len(meta)))
+        f.write(meta)
+        for digest, name, blob in records:
+            length = NAME_LENGTH.size + len(name) + len(blob)
+            f.write(INDEX_ENTRY.pack(digest, offset, length))
+            offset += length
+        for _, name, blob in records:
+            f.write(NAME_LENGTH.pack(len(name)))
+            f.write(name)
+            f.write(blob)
+
+
+class VaultStorage(MutableMapping):
+    """Website -> ciphertext store behind SecureSafe; each vault format implements one.
+
+    Besides the mapping, a storage holds the vault metadata in ``meta``.
+    Reads may go to disk on demand, but changes stay in memory until
+    ``flush`` persists them together with the metadata.
+    """
+
+    # Ciphertexts are raw bytes rather than base64 text
+    raw = False
+    # Listing every website costs I/O that single-website access avoids
+    partial_reads = False
+    # flush writes only the changed records, so a journal would not save any I/O
+    incremental = False
+    # Reads see committed states only, so readers need not take the vault lock
+    concurrent_reads = False
+    # flush replaces the whole vault at once rather than file by file
+    atomic_flush = True
+    # JSON vaults only: the single ciphertext of a stream vault
+    stream = None
+
+    def stored_items(self):
+        """Every (website, ciphertext) pair; only called with no changes pending."""
+        return self.items()
+
+    def files(self):
+        """Every file whose change means another process saved the vault."""
+        return [self.path]
+
+    def stamp(self):
+        """A token modified_since() compares to tell whether the vault was saved elsewhere."""
+        return [file_stamp(path) for path in self.files()]
+
+    def modified_since(self, stamp):
+        """Tells whether the vault was saved since ``stamp``, settling its racy digests in place."""
+        for position, (path, old) in enumerate(zip(self.files(), stamp)):
+            changed, stamp[position] = settle_stamp(path, old)
+            if changed:
+                return True
+        return False
+
+    def flush(self):
+        raise NotImplementedError
+
+    def close(self):
+        """Releases open files; the storage must not be used afterwards."""
+
+
+class JsonVault(VaultStorage):
+    """passwords.json: the metadata and every website's ciphertext in one JSON object.
+
+    Everything is read on open, and ``flush`` rewrites the whole file
+    atomically. A stream vault holds a single ciphertext in ``stream``
+    instead of per-website records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = {}
+        self.records = {}
+        self.stream = None
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.meta, entries = split_json_vault(json.load(f))
+            if isinstance(entries, str):
+                self.stream = entries
+            else:
+                self.records = entries
+
+    def __getitem__(self, website):
+        return self.records[website]
+
+    def __setitem__(self, website, ciphertext):
+        self.records[website] = ciphertext
+
+    def __delitem__(self, website):
+        del self.records[website]
+
+    def __contains__(self, website):
+        return website in self.records
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def clear(self):
+        self.records.clear()
+
+    def flush(self):
+        """Atomically rewrites the file; a crash mid-save leaves the previous one intact."""
+        entries = self.records if self.stream is None else self.stream
+        with atomic_write(self.path) as f:
+            json.dump(join_json_vault(self.meta, entries), f)
+
+
+class BinaryVault(VaultStorage):
+    """Website -> raw IV + ciphertext mapping backed by a memory-mapped vault.
+
+    Lookups binary-search the on-disk index and copy out a single record, so
+    opening the vault reads nothing but the header. Changes are kept in memory
+    until ``flush`` rewrites the file.
+    """
+
+    raw = True
+
+    def __init__(self, path):
+        self.path = path
+        self.changes = {}
+        self.removed = set()
+        self.file = None
+        self.map = None
+        self.count = 0
+        self.meta = {}
+        self.index_start = HEADER.size
+        self.open()
+
+    def open(self):
+        """Maps the vault file into memory, if it exists."""
+        if not os.path.exists(self.path):
+            return
+        self.file = open(self.path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version > VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not a SecureSafe binary vault")
+        self.meta = {}
+        self.index_start = HEADER.size
+        if version >= 2:
+            (length,) = META_LENGTH.unpack_from(self.map, HEADER.size)
+            start = HEADER.size + META_LENGTH.size
+            self.meta = json.loads(self.map[start : start + length])
+            self.index_start = start + length
+
+    def close(self):
+        """Releases the memory map and the underlying file."""
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+        self.map = self.file = None
+        self.count = 0
+
+    def index_entry(self, position):
+        return INDEX_ENTRY.unpack_from(
+            self.map, self.index_start + position * INDEX_ENTRY.size
+        )
+
+    def record(self, offset, length):
+        """Returns the (website, blob) stored at ``offset``."""
+        (name_length,) = NAME_LENGTH.unpack_from(self.map, offset)
+        start = offset + NAME_LENGTH.size
+        website = self.map[start : start + name_length].decode()
+        return website, self.map[start + name_length : offset + length]
+
+    def lookup(self, website):
+        """Binary-searches the index; returns the stored blob or None."""
+        digest = website_hash(website)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.index_entry(middle)[0] < digest:
+                low = middle + 1
+            else:
+                high = middle
+        # Walk the (vanishingly rare) run of entries sharing this hash
+        while low < self.count:
+            entry_digest, offset, length = self.index_entry(low)
+            if entry_digest != digest:
+                break
+            name, blob = self.record(offset, length)
+            if name == website:
+                return blob
+            low += 1
+        return None
+
+    def stored_items(self):
+        """Yields every (website, blob) pair in the file, ignoring pending changes."""
+        for position in range(self.count):
+            _, offset, length = self.index_entry(position)
+            yield self.record(offset, length)
+
+    def __getitem__(self, website):
+        if website in self.changes:
+            return self.changes[website]
+        blob = None if website in self.removed else self.lookup(website)
+        if blob is None:
+            raise KeyError(website)
+        return blob
+
+    def __setitem__(self, website, blob):
+        self.removed.discard(website)
+        self.changes[website] = blob
+
+    def __delitem__(self, website):
+        if website not in self:
+            raise KeyError(website)
+        self.changes.pop(website, None)
+        self.removed.add(website)
+
+    def __contains__(self, website):
+        if website in self.changes:
+            return True
+        return website not in self.removed and self.lookup(website) is not None
+
+    def __iter__(self):
+        yield from self.changes
+        for website, _ in self.stored_items():
+            if website not in self.changes and website not in self.removed:
+                yield website
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def flush(self):
+        """Writes the vault with pending changes applied and remaps it."""
+        items = [
+            (website, blob)
+            for website, blob in self.stored_items()
+            if website not in self.changes and website not in self.removed
+        ]
+        items.extend(self.changes.items())
+        # Unmap before replacing so the swap also works where mapped files are locked
+        self.close()
+        write_vault(self.path, items, self.meta)
+        self.changes = {}
+        self.removed = set()
+        self.open()
+
+
+class ShardedVault(VaultStorage):
+    """Website -> base64 ciphertext mapping spread over ``count`` shard files.
+
+    Websites are assigned to shards by hash. A shard is read the first time
+    one of its websites is touched, and ``flush`` rewrites only the shards
+    that changed, each one atomically, so a single-website save costs about
+    1/count of the vault. The manifest holds the vault metadata.
+    """
+
+    partial_reads = True
+    atomic_flush = False
+
+    def __init__(self, path, count=SHARD_COUNT):
+        self.path = path
+        self.meta = {}
+        self.count = count
+        self.shards = {}  # index -> website -> ciphertext, for shards read so far
+        self.changed = set()
+        self.written_meta = None
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                manifest = json.load(f)
+            self.count = manifest.pop("shards")
+            del manifest["format"]
+            self.meta = manifest
+            self.written_meta = copy.deepcopy(manifest)
+
+    def shard_path(self, index):
+        return f"{self.path}.{index:03d}"
+
+    def files(self):
+        return [self.path] + [self.shard_path(index) for index in range(self.count)]
+
+    def shard(self, index):
+        """Returns one shard's mapping, reading it from disk on first use."""
+        if index not in self.shards:
+            path = self.shard_path(index)
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    self.shards[index] = json.load(f)
+            else:
+                self.shards[index] = {}
+        return self.shards[index]
+
+    def shard_for(self, website):
+        return self.shard(shard_of(website, self.count))
+
+    def __getitem__(self, website):
+        return self.shard_for(website)[website]
+
+    def __setitem__(self, website, ciphertext):
+        index = shard_of(website, self.count)
+        self.shard(index)[website] = ciphertext
+        self.changed.add(index)
+
+    def __delitem__(self, website):
+        index = shard_of(website, self.count)
+        del self.shard(index)[website]
+        self.changed.add(index)
+
+    def __contains__(self, website):
+        return website in self.shard_for(website)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield from self.shard(index)
+
+    def __len__(self):
+        return sum(len(self.shard(index)) for index in range(self.count))
+
+    def flush(self):
+        """Rewrites the changed shards, then the manifest if the metadata changed.
+
+        Each file is replaced atomically, but a flush touching several shards
+        is not atomic as a whole. SecureSafe journals every website of such a
+        save first and keeps the journal until all shards are written, so an
+        interrupted save is replayed on the next open. Re-keying, which also
+        rewrites the manifest, is not covered.
+        """
+        for index in sorted(self.changed):
+            write_json(self.shard_path(index), self.shards[index])
+        self.changed = set()
+        if self.meta != self.written_meta or not os.path.exists(self.path):
+            write_json(
+                self.path, {"format": "sharded", "shards": self.count, **self.meta}
+            )
+            self.written_meta = copy.deepcopy(self.meta)
+
+
+class SqliteVault(VaultStorage):
+    """Website -> base64 ciphertext rows in an SQLite database in WAL mode.
+
+    Rows live in a WITHOUT ROWID B-tree keyed by website hash, so a lookup,
+    insert or delete touches O(log n) pages and opening the vault reads
+    only the metadata row. Changes are buffered until ``flush`` commits
+    them in a single transaction; WAL lets readers in other processes carry
+    on meanwhile.
+    """
+
+    partial_reads = True
+    incremental = True
+    concurrent_reads = True
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = {}
+        self.changes = {}
+        self.removed = set()
+        self.connection = None
+        if os.path.exists(path):
+            self.connect()
+            row = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'vault'"
+            ).fetchone()
+            if row is not None:
+                self.meta = json.loads(row[0])
+
+    def connect(self):
+        # Autocommit, so each read sees the latest commit; flush opens its own transaction.
+        # Threads share the connection: SecureSafe serializes them with its mutex.
+        self.connection = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        # Sync the WAL on every commit, as atomic_write syncs the other formats
+        self.connection.execute("PRAGMA synchronous = FULL")
+        self.connection.executescript(SQLITE_SCHEMA)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = None
+
+    def lookup(self, website):
+        """The committed ciphertext of ``website``, or None."""
+        if self.connection is None:
+            return None
+        row = self.connection.execute(
+            "SELECT ciphertext FROM records WHERE website_hash = ? AND website = ?",
+            (website_hash(website), website),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def stored_items(self):
+        """Yields every committed (website, ciphertext) pair, ignoring pending changes."""
+        if self.connection is not None:
+            yield from self.connection.execute(
+                "SELECT website, ciphertext FROM records"
+            )
+
+    def __getitem__(self, website):
+        if website in self.changes:
+            return self.changes[website]
+        ciphertext = None if website in self.removed else self.lookup(website)
+        if ciphertext is None:
+            raise KeyError(website)
+        return ciphertext
+
+    def __setitem__(self, website, ciphertext):
+        self.removed.discard(website)
+        self.changes[website] = ciphertext
+
+    def __delitem__(self, website):
+        if website not in self:
+            raise KeyError(website)
+        self.changes.pop(website, None)
+        self.removed.add(website)
+
+    def __contains__(self, website):
+        if website in self.changes:
+            return True
+        return website not in self.removed and self.lookup(website) is not None
+
+    def __iter__(self):
+        yield from self.changes
+        if self.connection is not None:
+            for (website,) in self.connection.execute("SELECT website FROM records"):
+                if website not in self.changes and website not in self.removed:
+                    yield website
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def files(self):
+        return [self.path, self.path + "-wal"]
+
+    def stamp(self):
+        """The database's inode and SQLite's count of commits made by other connections."""
+        if self.connection is None:
+            return (file_stamp(self.path), None)
+        inode = os.stat(self.path).st_ino if os.path.exists(self.path) else None
+        (version,) = self.connection.execute("PRAGMA data_version").fetchone()
+        return (inode, version)
+
+    def modified_since(self, stamp):
+        return self.stamp() != stamp
+
+    def flush(self):
+        """Commits pending changes and the metadata in one transaction."""
+        if self.connection is None:
+            self.connect()
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.executemany(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?)",
+                (
+                    (website_hash(website), website, ciphertext)
+                    for website, ciphertext in self.changes.items()
+                ),
+            )
+            cursor.executemany(
+                "DELETE FROM records WHERE website_hash = ? AND website = ?",
+                ((website_hash(website), website) for website in self.removed),
+            )
+            cursor.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('vault', ?)",
+                (json.dumps(self.meta),),
+            )
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        self.changes = {}
+        self.removed = set()
+
+
+def split_json_vault(data):
+    """Splits a parsed passwords.json into (metadata, website -> ciphertext).
+
+    Stream vaults store a single ciphertext string in place of the mapping.
+    """
+    if data.get("version") == JSON_VERSION and isinstance(
+        data.get("entries"), (dict, str)
+    ):
+        meta = {key: value for key, value in data.items() if key != "entries"}
+        del meta["version"]
+        return meta, data["entries"]
+    # Unversioned vaults are a bare website -> ciphertext object
+    return {}, data
+
+
+def join_json_vault(meta, ciphertexts):
+    """Inverse of split_json_vault."""
+    if not meta:
+        return ciphertexts
+    return {"version": JSON_VERSION, **meta, "entries": ciphertexts}
+
+
+def storage_class(path):
+    """The VaultStorage class for ``path``, by its content or, for new files, extension."""
+    if is_binary_vault(path):
+        return BinaryVault
+    if is_sqlite_vault(path):
+        return SqliteVault
+    if is_sharded_vault(path):
+        return ShardedVault
+    return JsonVault
+
+
+def read_meta(path):
+    """Metadata of the vault at ``path``, in any format, without keeping its records."""
+    storage = storage_class(path)(path)
+    storage.close()
+    return storage.meta
+
+
+def convert_json_to_binary(json_path, binary_path):
+    """Converts a passwords.json vault into the binary format without decrypting it."""
+    if os.path.exists(json_path + ".journal"):
+        raise ValueError("Compact the vault before converting it; a journal is pending")
+    with open(json_path, "r") as f:
+        meta, ciphertexts = split_json_vault(json.load(f))
+    if isinstance(ciphertexts, str):
+        raise ValueError("Stream vaults must be split into records before converting")
+    write_vault(
+        binary_path,
+        ((website, base64.b64decode(blob)) for website, blob in ciphertexts.items()),
+        meta,
+    )
+
+
+def convert_vault(source, destination):
+    """Copies a vault into a new file of another format without decrypting it.
+
+    Each path's format follows from its extension, as for SecureSafe, so
+    ``vault.json`` -> ``vault.db`` migrates a JSON vault to SQLite.
+    """
+    if os.path.exists(source + ".journal"):
+        raise ValueError("Compact the vault before converting it; a journal is pending")
+    if os.path.exists(destination):
+        raise FileExistsError(f"{destination} already exists")
+    reader = storage_class(source)(source)
+    writer = storage_class(destination)(destination)
+    try:
+        if reader.stream is not None:
+            raise ValueError(
+                "Stream vaults must be split into records before converting"
+            )
+        writer.meta = copy.deepcopy(reader.meta)
+        for website, ciphertext in reader.stored_items():
+            if reader.raw and not writer.raw:
+                ciphertext = base64.b64encode(ciphertext).decode()
+            elif writer.raw and not reader.raw:
+                ciphertext = base64.b64decode(ciphertext)
+            writer[website] = ciphertext
+        writer.flush()
+    finally:
+        reader.close()
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SecureSafe vault format tools")
+    parser.add_argument("source", help="existing vault")
+    parser.add_argument(
+        "destination",
+        help="vault to create; .ssv is binary, .shards sharded, .db SQLite, else JSON",
+    )
+    args = parser.parse_args()
+    convert_vault(args.source, args.destination)
@@ -0,0 +1,199 @@
+import os
+import sys
+import csv
+import time
+import hashlib
+import argparse
+from itertools import islice
+from urllib.parse import urlsplit
+from getpass import getpass
+from secure_safe import SecureSafe
+
+# Rows committed per batch; each chunk is encrypted and written with one save.
+CHUNK_SIZE = 5000
+# Header names used by browser and password-manager exports, most specific first.
+WEBSITE_COLUMNS = ("website", "url", "login_uri", "hostname", "origin", "name", "title")
+USERNAME_COLUMNS = ("username", "login_username", "user", "email", "login")
+PASSWORD_COLUMNS = ("password", "login_password")
+TAG_COLUMNS = ("tags", "grouping", "folder")
+EXPORT_COLUMNS = ("website", "username", "password", "tags")
+
+
+class ImportStats:
+    """Running counts for an import, handed to the progress callback after each chunk."""
+
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.skipped = 0
+        self.chunks = 0
+        self.start = time.perf_counter()
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def rows_per_sec(self):
+        return self.read / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.read} rows read, {self.imported} imported, "
+            f"{self.skipped} skipped in {self.seconds:.1f}s "
+            f"({self.rows_per_sec:.0f} rows/s)"
+        )
+
+
+def read_rows(f):
+    """Yields each CSV row as a dict keyed by lower-cased header names."""
+    reader = csv.reader(f)
+    header = [name.strip().lower() for name in next(reader, [])]
+    for values in reader:
+        yield dict(zip(header, values))
+
+
+def first_value(row, columns):
+    for column in columns:
+        value = row.get(column)
+        if value:
+            return value.strip()
+    return ""
+
+
+def normalize_website(value):
+    """Reduces a URL to its host name; bare names are lower-cased."""
+    if "://" in value:
+        return urlsplit(value).hostname or ""
+    return value.strip().lower()
+
+
+def normalize_rows(rows, stats):
+    """Maps raw rows to (website, username, password, tags), skipping unusable ones."""
+    for row in rows:
+        stats.read += 1
+        website = normalize_website(first_value(row, WEBSITE_COLUMNS))
+        password = first_value(row, PASSWORD_COLUMNS)
+        if not website or not password:
+            stats.skipped += 1
+            continue
+        tags = [tag for tag in first_value(row, TAG_COLUMNS).split(";") if tag]
+        yield website, first_value(row, USERNAME_COLUMNS), password, tags
+
+
+def row_digest(website, username, password):
+    """Fixed-size fingerprint of an entry, so the seen-set stays small."""
+    return hashlib.blake2b(
+        "\0".join((website, username, password)).encode(), digest_size=16
+    ).digest()
+
+
+def dedup_rows(rows, safe, stats):
+    """Drops rows repeated in one chunk or already stored in the vault.
+
+    Runs inside the chunk's batch, which already holds the vault lock and
+    refreshed the safe, so entries are read straight from safe.passwords.
+    Repeats across chunks are caught as vault entries once committed.
+    """
+    seen = set()
+    for website, username, password, tags in rows:
+        digest = row_digest(website, username, password)
+        if digest in seen or any(
+            entry["username"] == username and entry["password"] == password
+            for entry in safe.passwords.get(website, ())
+        ):
+            stats.skipped += 1
+            continue
+        seen.add(digest)
+        yield website, username, password, tags
+
+
+def commit_chunks(safe, rows, stats, chunk_size=CHUNK_SIZE, progress=None):
+    """Deduplicates and stores rows in chunks, each committed with a single save."""
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        imported = 0
+        with safe.batch():
+            for website, username, password, tags in dedup_rows(chunk, safe, stats):
+                safe.store_password(website, username, password, tags)
+                imported += 1
+        stats.imported += imported
+        stats.chunks += 1
+        if progress:
+            progress(stats)
+
+
+def import_csv(safe, f, chunk_size=CHUNK_SIZE, progress=None):
+    """Streams a CSV export from file object ``f`` into ``safe``; returns the ImportStats.
+
+    Rows flow through a generator pipeline (parse, normalize, deduplicate,
+    commit), so only one chunk of rows is held at a time. Open the safe with
+    ``lazy=True`` to keep the decrypted vault bounded as well.
+    """
+    stats = ImportStats()
+    rows = normalize_rows(read_rows(f), stats)
+    commit_chunks(safe, rows, stats, chunk_size, progress)
+    return stats
+
+
+def export_csv(safe, f):
+    """Writes every entry in ``safe`` to file object ``f`` as CSV; returns the row count."""
+    writer = csv.writer(f)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for website in list(safe.passwords):
+        for entry in safe.retrieve_password(website):
+            writer.writerow(
+                (
+                    website,
+                    entry["username"],
+                    entry["password"],
+                    ";".join(entry.get("tags") or ()),
+                )
+            )
+            count += 1
+    return count
+
+
+def open_private(path):
+    """Opens ``path`` for writing, readable only by the owner."""
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    return open(descriptor, "w", newline="", encoding="utf-8")
+
+
+def main(argv=None):
+    """CLI for bulk CSV import and export"""
+    parser = argparse.ArgumentParser(description="SecureSafe CSV import/export")
+    parser.add_argument("--file", default="passwords.json", help="vault to use")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="import a CSV export")
+    importer.add_argument("csv")
+    importer.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    exporter = commands.add_parser("export", help="export the vault as CSV")
+    exporter.add_argument("csv")
+    args = parser.parse_args(argv)
+
+    safe = SecureSafe(
+        getpass("Enter your master password: "), file=args.file, lazy=True
+    )
+    if args.command == "import":
+        with open(args.csv, newline="", encoding="utf-8-sig") as f:
+            stats = import_csv(
+                safe,
+                f,
+                args.chunk_size,
+                lambda stats: print(stats, file=sys.stderr),
+            )
+        print(f"Done: {stats}", file=sys.stderr)
+    else:
+        start = time.perf_counter()
+        with open_private(args.csv) as f:
+            count = export_csv(safe, f)
+        seconds = time.perf_counter() - start
+        print(f"Exported {count} entries in {seconds:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import time
+from collections import deque
+
+# Latency percentiles are taken over this many most recent calls per operation.
+SAMPLE_WINDOW = 10000
+
+
+class OperationStats:
+    """Counters and a window of recent latencies for one operation."""
+
+    def __init__(self, window=SAMPLE_WINDOW):
+        self.calls = 0
+        self.bytes = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def percentile(self, fraction):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "bytes": self.bytes,
+            "total_seconds": self.total,
+            "p50_seconds": self.percentile(0.50),
+            "p99_seconds": self.percentile(0.99),
+        }
+
+
+class Profiler:
+    """Collects per-operation timings and forwards each one to pluggable hooks.
+
+    A hook is any callable taking (operation, seconds, nbytes); it runs after
+    every timed call, so keep it cheap or hand the numbers off to a queue.
+    """
+
+    def __init__(self, hooks=(), window=SAMPLE_WINDOW):
+        self.window = window
+        self.hooks = list(hooks)
+        self.operations = {}
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def record(self, operation, seconds, nbytes=0):
+        stats = self.operations.get(operation)
+        if stats is None:
+            stats = self.operations[operation] = OperationStats(self.window)
+        stats.calls += 1
+        stats.bytes += nbytes
+        stats.total += seconds
+        stats.samples.append(seconds)
+        for hook in self.hooks:
+            hook(operation, seconds, nbytes)
+
+    def wrap(self, operation, function, size=None):
+        """Returns ``function`` timed under ``operation``.
+
+        ``size`` maps the call's arguments and result to a byte count.
+        """
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            seconds = time.perf_counter() - start
+            self.record(
+                operation, seconds, size(args, result) if size is not None else 0
+            )
+            return result
+
+        timed.__wrapped__ = function
+        return timed
+
+    def stats(self):
+        """Returns {operation: {calls, bytes, total_seconds, p50_seconds, p99_seconds}}."""
+        return {
+            operation: stats.as_dict()
+            for operation, stats in sorted(self.operations.items())
+        }
+
+    def report(self):
+        """Formats stats() as a table, slowest operation first."""
+        rows = sorted(
+            self.stats().items(),
+            key=lambda item: item[1]["total_seconds"],
+            reverse=True,
+        )
+        lines = [
+            f"{'operation':<16}{'calls':>9}{'bytes':>13}{'total ms':>11}"
+            f"{'p50 ms':>10}{'p99 ms':>10}"
+        ]
+        for operation, row in rows:
+            lines.append(
+                f"{operation:<16}{row['calls']:>9}{row['bytes']:>13}"
+                f"{row['total_seconds'] * 1000:>11.2f}"
+                f"{row['p50_seconds'] * 1000:>10.3f}{row['p99_seconds'] * 1000:>10.3f}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,183 @@
+"""Three-way sync between two copies of a vault, located with Merkle trees.
+
+Every stored record gets a leaf digest: a keyed BLAKE2b of its ciphertext,
+which only changes when the website is re-encrypted, i.e. when it changed.
+Leaves are bucketed into a 16-ary tree by the hex digits of each website's
+hash, and comparing two trees descends only into subtrees whose digests
+differ, so finding c changed websites among n costs O(c log n) node
+comparisons and decrypts nothing.
+
+SecureSafe.sync keeps a state file per peer holding both vaults' leaves
+and the merged records as of the last sync. Websites whose leaves moved
+on either side since then are the only ones decrypted and merged against
+that common base; the first sync has no base and merges everything.
+"""
+
+import os
+import json
+import hashlib
+from collections import namedtuple
+from vault_format import atomic_write, website_hash
+
+# Leaves per bucket the tree depth aims for; each level splits buckets 16 ways.
+BUCKET_SIZE = 16
+HEX_DIGITS = "0123456789abcdef"
+STATE_VERSION = 1
+
+SyncReport = namedtuple("SyncReport", "pulled pushed conflicts compared")
+SyncReport.__doc__ = """Outcome of SecureSafe.sync().
+
+pulled: websites this vault took changes for
+pushed: websites the other vault took changes for
+conflicts: (website, username) changed differently on both sides; both versions are kept
+compared: number of websites that differed and were decrypted and merged
+"""
+
+
+def leaf_digest(key, website, data):
+    """Keyed digest of one website's stored record (ciphertext bytes or text)."""
+    if isinstance(data, str):
+        data = data.encode()
+    h = hashlib.blake2b(key=key, digest_size=16)
+    h.update(website.encode() + b"\0")
+    h.update(data)
+    return h.hexdigest()
+
+
+def tree_depth(count):
+    """Levels below the root needed for about BUCKET_SIZE leaves per bucket."""
+    depth = 1
+    while len(HEX_DIGITS) ** depth * BUCKET_SIZE < count:
+        depth += 1
+    return depth
+
+
+def node_digest(parts):
+    return hashlib.blake2b(b"".join(parts), digest_size=16).digest()
+
+
+class MerkleTree:
+    """Hash tree over website -> leaf digest, 16-ary by the hex digits of website_hash.
+
+    Only non-empty nodes are stored, keyed by their hex prefix ("" is the
+    root); buckets at ``depth`` hold the leaves themselves.
+    """
+
+    def __init__(self, leaves, depth):
+        self.depth = depth
+        self.buckets = {}
+        for website, digest in leaves.items():
+            prefix = website_hash(website).hex()[:depth]
+            self.buckets.setdefault(prefix, {})[website] = digest
+        level = {
+            prefix: node_digest(
+                f"{website}\0{digest}\0".encode()
+                for website, digest in sorted(bucket.items())
+            )
+            for prefix, bucket in self.buckets.items()
+        }
+        self.nodes = dict(level)
+        for _ in range(depth):
+            children = {}
+            for prefix in sorted(level):
+                children.setdefault(prefix[:-1], []).append(
+                    prefix[-1].encode() + level[prefix]
+                )
+            level = {prefix: node_digest(parts) for prefix, parts in children.items()}
+            self.nodes.update(level)
+
+    @property
+    def root(self):
+        return self.nodes.get("")
+
+    def diff(self, other):
+        """Websites whose leaves differ between two trees of the same depth."""
+        changed = set()
+        stack = [""]
+        while stack:
+            prefix = stack.pop()
+            if self.nodes.get(prefix) == other.nodes.get(prefix):
+                continue
+            if len(prefix) < self.depth:
+                stack.extend(prefix + digit for digit in HEX_DIGITS)
+                continue
+            ours = self.buckets.get(prefix, {})
+            theirs = other.buckets.get(prefix, {})
+            changed.update(
+                website
+                for website in ours.keys() | theirs.keys()
+                if ours.get(website) != theirs.get(website)
+            )
+        return changed
+
+
+def changed_websites(old, new):
+    """Websites added, removed or re-encrypted between two leaf mappings."""
+    depth = tree_depth(max(len(old), len(new)))
+    return MerkleTree(old, depth).diff(MerkleTree(new, depth))
+
+
+def entry_key(entry):
+    return (entry.username, entry.password, entry.tags)
+
+
+def merge_entries(base, ours, theirs):
+    """Three-way merges one website's entries; returns (merged, conflicting usernames).
+
+    Entries are matched by username, password and tags. An entry either
+    side added is kept, one either side deleted is dropped. A username
+    both sides changed, to different results, is a conflict: every entry
+    either side added for it is kept so nothing is lost.
+    """
+    base_keys = set(map(entry_key, base))
+    our_keys = set(map(entry_key, ours))
+    their_keys = set(map(entry_key, theirs))
+    merged = [
+        entry
+        for entry in ours
+        if entry_key(entry) in their_keys or entry_key(entry) not in base_keys
+    ]
+    seen = set(map(entry_key, merged))
+    merged += [
+        entry
+        for entry in theirs
+        if entry_key(entry) not in base_keys and entry_key(entry) not in seen
+    ]
+    ours_changed = {key[0] for key in our_keys ^ base_keys}
+    theirs_changed = {key[0] for key in their_keys ^ base_keys}
+    conflicts = sorted(
+        username
+        for username in ours_changed & theirs_changed
+        if {key for key in our_keys if key[0] == username}
+        != {key for key in their_keys if key[0] == username}
+    )
+    return merged, conflicts
+
+
+def sync_state_path(path, other_path):
+    """State file that ``path`` keeps for syncing with ``other_path``."""
+    peer = hashlib.sha256(os.path.abspath(other_path).encode()).hexdigest()[:12]
+    return f"{path}.sync-{peer}"
+
+
+def load_sync_state(path, kdf, cipher):
+    """Reads a sync state, or an empty one if missing or written under another key."""
+    empty = {"ours": {}, "theirs": {}, "base": {}}
+    if not os.path.exists(path):
+        return empty
+    with open(path, "r") as f:
+        state = json.load(f)
+    if (
+        state.get("version") != STATE_VERSION
+        or state.get("kdf") != kdf
+        or state.get("cipher") != cipher
+    ):
+        return empty  # Re-keyed since; the base cannot be decrypted
+    return {key: state[key] for key in empty}
+
+
+def save_sync_state(path, kdf, cipher, state):
+    """Writes a sync state atomically, noting the key settings its base records are under."""
+    state = {"version": STATE_VERSION, "kdf": kdf, "cipher": cipher, **state}
+    with atomic_write(path) as f:
+        f.write(json.dumps(state))  # One C-encoder pass; json.dump encodes in chunks
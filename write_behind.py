@@ -0,0 +1,79 @@
+"""Background flushing for SecureSafe's write-behind mode.
+
+With ``SecureSafe(..., flush_delay=seconds)`` a store or delete only
+updates memory and marks the website pending; a WriteBehind thread then
+calls ``SecureSafe.flush`` once no change has arrived for ``flush_delay``
+seconds, or as soon as ``flush_changes`` changes are pending.
+
+Durability:
+  - Every write is crash-consistent: flushes append whole journal records
+    or atomically replace the vault file, so a killed process leaves
+    either the previous state or the new one, never a corrupt vault.
+  - A change is durable once flush() returns, whether the flusher thread,
+    an explicit flush(), close(), leaving a ``with`` block or interpreter
+    exit ran it. Flushes fsync what they write, so that includes power loss.
+  - Changes made since the last flush are lost if the process is killed
+    or the machine fails before the next one; that window is at most
+    ``flush_delay`` seconds after the last change or ``flush_changes``
+    changes, plus the time one flush takes.
+"""
+
+import time
+import threading
+
+# Flush as soon as this many changes are pending, however recent the last one.
+FLUSH_CHANGES = 64
+
+
+class WriteBehind:
+    """Runs ``flush`` on a daemon thread once changes settle or pile up."""
+
+    def __init__(self, flush, delay, max_pending=FLUSH_CHANGES):
+        self.flush = flush
+        self.delay = delay
+        self.max_pending = max_pending
+        self.condition = threading.Condition()
+        self.pending = 0
+        self.deadline = None
+        self.closed = False
+        self.error = None  # Last failure of a background flush; retried on the next
+        self.thread = threading.Thread(
+            target=self.run, name="SecureSafe write-behind", daemon=True
+        )
+        self.thread.start()
+
+    def changed(self):
+        """Records one change and restarts the debounce interval."""
+        with self.condition:
+            self.pending += 1
+            self.deadline = time.monotonic() + self.delay
+            self.condition.notify()
+
+    def run(self):
+        with self.condition:
+            while not self.closed:
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+                remaining = self.deadline - time.monotonic()
+                if remaining > 0 and self.pending < self.max_pending:
+                    self.condition.wait(remaining)
+                    continue
+                self.pending = 0
+                # Flush without holding the condition so changes can keep arriving
+                self.condition.release()
+                try:
+                    self.flush()
+                    self.error = None
+                except Exception as e:
+                    self.error = e
+                finally:
+                    self.condition.acquire()
+
+    def stop(self):
+        """Stops the thread after any flush in progress; pending changes are left to the caller."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not threading.current_thread():
+            self.thread.join()